@@ -1,30 +1,49 @@
 from flask import Flask
 from flask_jwt_extended import JWTManager # type: ignore
-from flask_pymongo import PyMongo # type: ignore
 import os
-from dotenv import load_dotenv # type: ignore
 from flask_cors import CORS # type: ignore
+from .config import Config
+from .db.db_setup import mongo, init_mongo
+from .utils.uploads import UploadRequest
 
 jwt = JWTManager()
-mongo = PyMongo()  # Add this line
 
 def create_app():
     app = Flask(__name__)
+    # Streams multipart uploads to disk with size limits (see utils/uploads.py)
+    app.request_class = UploadRequest
+    app.config.from_object(Config)
     app.config["JWT_SECRET_KEY"] = "super-secret"
+    from .utils.log import configure_logging
+    configure_logging(app.config)
     jwt.init_app(app)
 
-    load_dotenv()
+    # .env is loaded into os.environ by config.py
     app.config["MONGO_URI"] = os.getenv("MONGO_URI")
     
-    # 🔧 FIX: Initialize PyMongo
-    mongo.init_app(app)
+    # One shared client and connection pool for the whole process
+    init_mongo(app)
+    # After init_mongo, which installs its own JSON provider
+    from .utils.json_provider import init_json
+    from .utils.compression import compressor
+    from .utils import metrics
+    init_json(app)
+    metrics.init_app(app)
+    compressor.init_app(app)
+
+    from .db.commands import db_cli
+    app.cli.add_command(db_cli)
+    if app.config["MONGO_SYNC_INDEXES_ON_STARTUP"]:
+        from .db.indexes import sync_indexes
+        sync_indexes(mongo.db)
     
     # CORS configuration
     CORS(app, resources={
         r"/*": {
             "origins": ["http://localhost:5173"],
-            "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-            "allow_headers": ["Content-Type", "Authorization"]
+            "methods": ["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
+            "allow_headers": ["Content-Type", "Authorization"],
+            "expose_headers": ["X-Next-Cursor", "X-Total-Count", "Link", "ETag"]
         }
     })
 
@@ -34,6 +53,8 @@ def create_app():
     from .routes.todos import todos
     from .services.summariser import summarise_bp
     from .services.whisper import whisperer_bp
+    from .routes.jobs import job_routes
+    from .utils.job_queue import jobs
 
     app.register_blueprint(main)
     app.register_blueprint(auth)
@@ -41,6 +62,20 @@ def create_app():
     app.register_blueprint(todos)
     app.register_blueprint(summarise_bp)
     app.register_blueprint(whisperer_bp)   
+    app.register_blueprint(job_routes)
+
+    jobs.init_app(app)
+
+    from .utils.revocation_cache import revocation_cache
+    from .utils.summary_cache import summary_cache
+    from .utils.note_cache import note_list_cache
+    from .utils.password_hasher import password_hasher
+    from .utils.llm_client import llm_client
+    revocation_cache.configure(app.config)
+    summary_cache.configure(app.config)
+    note_list_cache.configure(app.config)
+    password_hasher.configure(app.config)
+    llm_client.configure(app.config)
 
     # Register JWT blacklist loader
     @jwt.token_in_blocklist_loader
@@ -0,0 +1,60 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+"""
+    Worker cold-start benchmark: boots app.wsgi in fresh interpreters and
+    reports how long the import and create_app() take, the first request
+    after that, and which heavy libraries were imported on the way.
+    Nothing connects to MongoDB, so no server is needed:
+
+        cd backend
+        python -m app.bench.coldstart --runs 5
+"""
+
+# Libraries that should only be imported by the requests that use them
+HEAVY_MODULES = ("openai", "httpx", "assemblyai", "PyPDF2", "numpy")
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import app.wsgi
+booted = time.perf_counter()
+app.wsgi.app.test_client().get('/')
+first = time.perf_counter()
+print(json.dumps({"boot_ms": (booted - started) * 1000, "first_request_ms": (first - booted) * 1000,
+                  "heavy_modules": sorted(name for name in %r if name in sys.modules)}))
+""" % (HEAVY_MODULES,)
+
+
+def probe(backend_dir):
+    environment = dict(os.environ, PYTHONPATH=backend_dir)
+    environment.setdefault("MONGO_URI", "mongodb://localhost:27017/studivio_bench")
+    output = subprocess.run([sys.executable, "-c", PROBE], cwd=backend_dir, env=environment,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Worker cold-start benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+    results = [probe(backend_dir) for _ in range(args.runs)]
+    report = {
+        "runs": args.runs,
+        "boot_ms_median": round(statistics.median(result["boot_ms"] for result in results), 1),
+        "boot_ms_max": round(max(result["boot_ms"] for result in results), 1),
+        "first_request_ms_median": round(statistics.median(result["first_request_ms"] for result in results), 1),
+        "heavy_modules": results[-1]["heavy_modules"],
+    }
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+import io
+import random
+import wave
+from datetime import date, timedelta
+
+"""
+    Synthetic but realistically shaped data for the benchmarks: study notes,
+    long lecture transcripts, multi-page PDFs and users that own them.
+    Everything is generated from a seeded Random, so two runs with the same
+    arguments see the same dataset.
+"""
+
+VOCABULARY = (
+    "algorithm analysis array binary cache calculus cell chemistry complexity compound "
+    "derivative differential dynamic economics electron energy entropy enzyme equation "
+    "equilibrium evolution exam function gradient graph history hypothesis integral "
+    "kinetic lecture linear matrix memory metabolism molecule momentum network neuron "
+    "osmosis photosynthesis pointer polymer probability protein quantum reaction "
+    "recursion revolution sequence statistics structure theorem thermodynamics tree "
+    "variable vector velocity wavelength definition example summary overview concept"
+).split()
+
+PRIORITIES = ["urgent", "high", "normal", "low"]
+STATUSES = ["pending", "in_progress", "completed"]
+
+_random = random.Random(2024)
+
+
+def reseed(seed):
+    _random.seed(seed)
+
+
+def make_words(count):
+    return " ".join(_random.choice(VOCABULARY) for _ in range(count))
+
+
+def make_paragraphs(paragraphs, words_per_paragraph=80):
+    return "\n\n".join(make_words(words_per_paragraph).capitalize() + "." for _ in range(paragraphs))
+
+
+def make_summary(words=300):
+    return "## Overview\n" + make_words(words)
+
+
+def make_transcript(minutes=30, words_per_minute=150):
+    """About what one speaker says in that many minutes"""
+    return make_paragraphs(max(1, minutes * words_per_minute // 100), 100)
+
+
+def make_note(user_id=None, paragraphs=4):
+    note = {
+        "title": make_words(_random.randint(2, 6)).title(),
+        "content": make_paragraphs(paragraphs),
+        "tags": _random.sample(VOCABULARY, 3),
+    }
+    if user_id is not None:
+        note["user_id"] = user_id
+    return note
+
+
+def make_todo(user_id=None, today=None):
+    today = today or date.today()
+    todo = {
+        "title": make_words(4).capitalize(),
+        "description": make_words(20),
+        "due_date": (today + timedelta(days=_random.randint(-10, 60))).isoformat(),
+        "priority": _random.choice(PRIORITIES),
+        "status": _random.choice(STATUSES),
+    }
+    if user_id is not None:
+        todo["user_id"] = user_id
+    return todo
+
+
+def _pdf_escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_pdf(pages=50, lines_per_page=45, words_per_line=12):
+    """A plain text PDF that PyPDF2 can extract, built by hand to avoid a writer dependency"""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in once the page object numbers are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_refs = []
+    for _ in range(pages):
+        lines = [f"({_pdf_escape(make_words(words_per_line))}) '" for _ in range(lines_per_page)]
+        stream = ("BT /F1 10 Tf 14 TL 40 800 Td\n" + "\n".join(lines) + "\nET").encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_ref = len(objects)
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_ref)
+        page_refs.append(len(objects))
+    kids = b" ".join(b"%d 0 R" % ref for ref in page_refs)
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, pages)
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
+
+
+def make_wav(seconds=60, rate=16000):
+    """Mono 16-bit silence; the fake transcriber never listens to it, but the upload size is real"""
+    out = io.BytesIO()
+    with wave.open(out, "wb") as recording:
+        recording.setnchannels(1)
+        recording.setsampwidth(2)
+        recording.setframerate(rate)
+        recording.writeframes(b"\x00\x00" * rate * seconds)
+    return out.getvalue()
+
+
+def seed_dataset(app, users=1000, notes_per_user=5, todos_per_user=5, password="benchpass", batch=500):
+    """
+        Load users, notes and todos straight through the models, returns the usernames.
+        Every user shares one password hash, so seeding does not pay for thousands of hashes.
+    """
+    from app.db.db_setup import get_collection
+    from app.models.note import NoteModel
+    from app.models.todo import priority_rank
+    from app.utils.password_hasher import password_hasher
+
+    note_model = NoteModel(app)
+    user_collection = get_collection(app, "users")
+    todo_collection = get_collection(app, "todos")
+    hashed = password_hasher.hash(password)
+
+    usernames = [f"bench-user-{number:05d}" for number in range(users)]
+    for start in range(0, users, batch):
+        user_collection.insert_many([{"username": name, "password": hashed}
+                                     for name in usernames[start:start + batch]])
+
+    for username in usernames:
+        if notes_per_user:
+            note_model.bulk_apply(username, [{"op": "create", "note": make_note()}
+                                             for _ in range(notes_per_user)], ordered=False)
+        if todos_per_user:
+            todos = [make_todo(username) for _ in range(todos_per_user)]
+            for todo in todos:
+                todo["priority_rank"] = priority_rank(todo["priority"])
+            todo_collection.insert_many(todos)
+    return usernames
@@ -0,0 +1,104 @@
+import os
+import time
+from contextlib import ExitStack
+from types import SimpleNamespace
+from unittest import mock
+import flask_pymongo # type: ignore
+
+try:
+    import mongomock # type: ignore
+except ImportError:
+    mongomock = None
+
+from app.bench.datasets import make_summary, make_transcript
+
+"""
+    Stand-ins for everything the app talks to over the network, so the
+    benchmarks run offline and the numbers measure our code, not OpenAI's.
+    Latencies are configurable, the defaults are roughly what the real
+    services answer in.
+"""
+
+BENCH_MONGO_URI = "mongodb://localhost:27017/studivio_bench"
+
+
+def use_memory_mongo():
+    """
+        Point create_app() at one in-memory mongomock client. Good for comparing
+        runs with each other; for absolute numbers use a local mongod instead.
+    """
+    if mongomock is None:
+        raise RuntimeError("The in-memory Mongo needs mongomock (pip install mongomock), "
+                           "or pass --mongo-uri to benchmark against a local mongod")
+    client = mongomock.MongoClient(BENCH_MONGO_URI)
+    flask_pymongo.MongoClient = lambda *args, **kwargs: client
+    _allow_update_sort()
+    os.environ["MONGO_URI"] = BENCH_MONGO_URI
+    return client
+
+
+def _allow_update_sort():
+    # pymongo 4.11+ passes sort= with every UpdateOne in a bulk_write, mongomock does not take it
+    builder = mongomock.collection.BulkOperationBuilder
+    if getattr(builder.add_update, "accepts_sort", False):
+        return
+    original = builder.add_update
+
+    def add_update(self, *args, sort=None, **kwargs):
+        return original(self, *args, **kwargs)
+
+    add_update.accepts_sort = True
+    builder.add_update = add_update
+
+
+class FakeOpenAI:
+    """chat.completions.create with a first-token delay and a steady token rate"""
+
+    def __init__(self, latency_ms=400, tokens_per_second=80, summary_words=300):
+        self.latency = latency_ms / 1000.0
+        self.token_delay = 1.0 / tokens_per_second if tokens_per_second else 0
+        self.summary_words = summary_words
+        self.calls = 0
+
+    def create(self, model=None, messages=None, max_tokens=None, stream=False, **kwargs):
+        self.calls += 1
+        time.sleep(self.latency)
+        words = make_summary(self.summary_words).split(" ")
+        if stream:
+            return self._stream(words)
+        # Non-streamed calls still wait for the whole answer to be generated
+        time.sleep(self.token_delay * len(words))
+        message = SimpleNamespace(content=" ".join(words))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    def _stream(self, words):
+        for index, word in enumerate(words):
+            time.sleep(self.token_delay)
+            text = word if index == 0 else " " + word
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+
+class FakeTranscriber:
+    """aai.Transcriber double: waits, then returns a long transcript"""
+
+    latency = 2.0
+    minutes = 30
+
+    def transcribe(self, path):
+        time.sleep(self.latency)
+        return SimpleNamespace(status="completed", text=make_transcript(self.minutes))
+
+
+def fake_backends(llm_latency_ms=400, llm_tokens_per_second=80, transcribe_latency_ms=2000,
+                  transcript_minutes=30):
+    """Context manager that swaps in FakeOpenAI and FakeTranscriber, returns the ExitStack"""
+    llm = FakeOpenAI(llm_latency_ms, llm_tokens_per_second)
+    transcriber = type("BenchTranscriber", (FakeTranscriber,), {
+        "latency": transcribe_latency_ms / 1000.0,
+        "minutes": transcript_minutes,
+    })
+    stack = ExitStack()
+    stack.enter_context(mock.patch("openai.chat.completions.create", side_effect=llm.create))
+    stack.enter_context(mock.patch("assemblyai.Transcriber", transcriber))
+    stack.llm = llm
+    return stack
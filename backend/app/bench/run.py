@@ -0,0 +1,379 @@
+import argparse
+import io
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from app.bench import datasets
+from app.bench.fakes import use_memory_mongo, fake_backends
+
+"""
+    Offline benchmarks for every blueprint.
+    Starts create_app() against an in-memory Mongo (or a local mongod with
+    --mongo-uri), with fake OpenAI and AssemblyAI backends, seeds a dataset,
+    then drives each route from a pool of threads and reports throughput and
+    p50/p95/p99 latency. Compare with (or write) a JSON baseline:
+
+        cd backend
+        python -m app.bench.run --quick
+        python -m app.bench.run --only notes. --baseline app/bench/baseline.json
+        python -m app.bench.run --write-baseline app/bench/baseline.json
+
+    The process exits with 1 when a scenario regressed past --tolerance.
+    The in-memory double scans every document for every query, so routes
+    that hit search_postings (notes.update, notes.search) are far slower
+    there than on a real mongod; compare such runs with each other only.
+"""
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# build(bench, worker_random) returns the test client request for one call
+Scenario = namedtuple("Scenario", ["name", "build", "expect"])
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values) - 1e-9))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarise_timings(latencies, errors, wall_seconds):
+    ordered = sorted(latencies)
+    milliseconds = lambda seconds: round(seconds * 1000, 2)
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "throughput_rps": round(len(ordered) / wall_seconds, 2) if wall_seconds else 0.0,
+        "mean_ms": milliseconds(sum(ordered) / len(ordered)) if ordered else 0.0,
+        "p50_ms": milliseconds(percentile(ordered, 0.50)),
+        "p95_ms": milliseconds(percentile(ordered, 0.95)),
+        "p99_ms": milliseconds(percentile(ordered, 0.99)),
+        "max_ms": milliseconds(ordered[-1]) if ordered else 0.0,
+    }
+
+
+def compare(results, baseline, tolerance=0.2):
+    """Scenarios whose p95 grew, or whose throughput fell, by more than tolerance"""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous:
+            continue
+        if current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {previous['p95_ms']}ms -> {current['p95_ms']}ms")
+        if current["throughput_rps"] < previous["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {previous['throughput_rps']} -> {current['throughput_rps']} req/s")
+        if current["errors"] > previous.get("errors", 0):
+            regressions.append(f"{name}: errors {previous.get('errors', 0)} -> {current['errors']}")
+    return regressions
+
+
+class Bench:
+    """The seeded app plus what the scenarios need to address it"""
+
+    def __init__(self, app, usernames, password, pdf_pages, audio_seconds):
+        self.app = app
+        self.usernames = usernames
+        self.password = password
+        self.pdf_pages = pdf_pages
+        self.audio_seconds = audio_seconds
+        self.tokens = {}
+        self.job_ids = []
+        self._lock = threading.Lock()
+        with app.app_context():
+            from app.db.db_setup import get_collection
+            sample = get_collection(app, "notes").find({"user_id": {"$in": usernames[:200]}},
+                                                       {"user_id": 1}).limit(2000)
+            self.owned_notes = [(note["user_id"], str(note["_id"])) for note in sample]
+
+    def headers(self, username):
+        token = self.tokens.get(username)
+        if token is None:
+            from flask_jwt_extended import create_access_token # type: ignore
+            with self.app.app_context():
+                token = create_access_token(identity=username)
+            with self._lock:
+                self.tokens[username] = token
+        return {"Authorization": f"Bearer {token}", "Accept-Encoding": "gzip"}
+
+    def user(self, rng):
+        return rng.choice(self.usernames)
+
+    def owned_note(self, rng):
+        return rng.choice(self.owned_notes)
+
+
+def _user_request(method, path, **extra):
+    def build(bench, rng):
+        username = bench.user(rng)
+        return dict(extra, method=method, path=path, headers=bench.headers(username))
+    return build
+
+
+def _note_request(method, body=None):
+    def build(bench, rng):
+        username, note_id = bench.owned_note(rng)
+        request = {"method": method, "path": f"/notes/{note_id}", "headers": bench.headers(username)}
+        if body:
+            request["json"] = body()
+        return request
+    return build
+
+
+def _search(bench, rng):
+    query = " ".join(rng.sample(datasets.VOCABULARY, 2))
+    return {"method": "GET", "path": f"/notes/search?q={query}&limit=20", "headers": bench.headers(bench.user(rng))}
+
+
+def _login(bench, rng):
+    return {"method": "POST", "path": "/Login", "json": {"username": bench.user(rng), "password": bench.password}}
+
+
+def _register(bench, rng):
+    return {"method": "POST", "path": "/Register",
+            "json": {"username": f"bench-new-{uuid.uuid4().hex}", "password": bench.password}}
+
+
+def _bulk(bench, rng):
+    operations = [{"op": "create", "note": datasets.make_note()} for _ in range(50)]
+    return {"method": "POST", "path": "/notes/bulk", "headers": bench.headers(bench.user(rng)),
+            "json": {"operations": operations, "ordered": False}}
+
+
+def _upload(path, field_name, filename, make_body, **fields):
+    def build(bench, rng):
+        return {"method": "POST", "path": path, "headers": bench.headers(bench.user(rng)),
+                "data": dict(fields, **{field_name: (io.BytesIO(make_body(bench)), filename)}),
+                "content_type": "multipart/form-data"}
+    return build
+
+
+def _job_status(bench, rng):
+    username, job_id = rng.choice(bench.job_ids)
+    return {"method": "GET", "path": f"/jobs/{job_id}", "headers": bench.headers(username)}
+
+
+SCENARIOS = [
+    Scenario("main.home", lambda bench, rng: {"method": "GET", "path": "/"}, (200,)),
+    Scenario("main.cache_stats", lambda bench, rng: {"method": "GET", "path": "/cache/stats"}, (200,)),
+    Scenario("auth.login", _login, (200,)),
+    Scenario("auth.register", _register, (201,)),
+    Scenario("notes.list", _user_request("GET", "/notes"), (200,)),
+    Scenario("notes.list_page", _user_request("GET", "/notes?limit=20"), (200,)),
+    Scenario("notes.get", _note_request("GET"), (200,)),
+    Scenario("notes.create", _user_request("POST", "/notes", json=None), (201,)),
+    Scenario("notes.update", _note_request("PUT", lambda: {"content": datasets.make_paragraphs(4)}), (200,)),
+    Scenario("notes.search", _search, (200,)),
+    Scenario("notes.bulk", _bulk, (200,)),
+    Scenario("todos.list", _user_request("GET", "/todos?sort=priority"), (200,)),
+    Scenario("todos.agenda", _user_request("GET", "/todos/agenda?days=14"), (200,)),
+    Scenario("todos.create", _user_request("POST", "/todos", json=None), (201,)),
+    Scenario("jobs.status", _job_status, (200,)),
+    Scenario("summariser.pdf_stream",
+             _upload("/summariser/pdf?stream=1", "file", "lecture.pdf",
+                     lambda bench: datasets.make_pdf(bench.pdf_pages)), (200,)),
+    # Same document through the local summariser, no LLM involved
+    Scenario("summariser.pdf_extractive",
+             _upload("/summariser/pdf?stream=1", "file", "lecture.pdf",
+                     lambda bench: datasets.make_pdf(bench.pdf_pages), engine="extractive"), (200,)),
+    Scenario("whisper.audio_stream",
+             _upload("/whisper/audio?stream=1", "file", "lecture.wav",
+                     lambda bench: datasets.make_wav(bench.audio_seconds)), (200,)),
+]
+
+# Bodies that have to be fresh for every request
+_FRESH_BODIES = {
+    "notes.create": datasets.make_note,
+    "todos.create": datasets.make_todo,
+}
+
+
+def _call(client, request):
+    request = dict(request)
+    method = request.pop("method")
+    path = request.pop("path")
+    response = client.open(path, method=method, **request)
+    # Streamed and SSE bodies only count once they have been read to the end
+    response.get_data()
+    response.close()
+    return response
+
+
+def _failed(scenario, response):
+    if response.status_code not in scenario.expect:
+        return True
+    # A stream that ends in an error event still answered 200
+    return response.mimetype == "text/event-stream" and b"event: error" in response.get_data()
+
+
+def run_scenario(bench, scenario, requests, concurrency, warmup=3, seed=0):
+    """Time `requests` calls spread over `concurrency` threads, each with its own test client"""
+    local = threading.local()
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+
+    def one(number):
+        if not hasattr(local, "client"):
+            local.client = bench.app.test_client()
+            local.rng = random.Random(f"{seed}:{scenario.name}:{threading.get_ident()}")
+        request = scenario.build(bench, local.rng)
+        if scenario.name in _FRESH_BODIES:
+            request["json"] = _FRESH_BODIES[scenario.name]()
+        started = time.perf_counter()
+        response = _call(local.client, request)
+        elapsed = time.perf_counter() - started
+        if number < 0:
+            return
+        with lock:
+            latencies.append(elapsed)
+            if _failed(scenario, response):
+                errors[0] += 1
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="bench") as pool:
+        list(pool.map(one, range(-warmup, 0)))
+        started = time.perf_counter()
+        list(pool.map(one, range(requests)))
+        wall = time.perf_counter() - started
+    return summarise_timings(latencies, errors[0], wall)
+
+
+def _submit_jobs(bench, count=10):
+    """A few finished and queued jobs for jobs.status to poll"""
+    client = bench.app.test_client()
+    for number in range(count):
+        username = bench.usernames[number % len(bench.usernames)]
+        response = client.post("/summariser/pdf", headers=bench.headers(username), content_type="multipart/form-data",
+                               data={"file": (io.BytesIO(datasets.make_pdf(2)), "job.pdf")})
+        if response.status_code == 202:
+            bench.job_ids.append((username, response.get_json()["job_id"]))
+
+
+def build_bench(args):
+    if args.mongo_uri:
+        os.environ["MONGO_URI"] = args.mongo_uri
+    else:
+        use_memory_mongo()
+
+    from app import create_app
+    from app.utils.log import configure_logging
+    app = create_app()
+    # The app logs every request; keep that out of the report unless asked for
+    if not args.verbose:
+        app.config["LOG_LEVEL"] = "WARNING"
+        configure_logging(app.config)
+    from app.utils.password_hasher import password_hasher
+    if args.bcrypt_rounds:
+        password_hasher.fixed_rounds = args.bcrypt_rounds
+
+    datasets.reseed(args.seed)
+    started = time.perf_counter()
+    with app.app_context():
+        usernames = datasets.seed_dataset(app, users=args.users, notes_per_user=args.notes_per_user,
+                                          todos_per_user=args.todos_per_user)
+    _progress(f"🌱 Seeded {args.users} users, {args.users * args.notes_per_user} notes and "
+          f"{args.users * args.todos_per_user} todos in {time.perf_counter() - started:.1f}s")
+    return Bench(app, usernames, "benchpass", args.pdf_pages, args.audio_seconds)
+
+
+def print_report(results):
+    columns = ("requests", "errors", "throughput_rps", "p50_ms", "p95_ms", "p99_ms", "max_ms")
+    print(f"{'scenario':<28}" + "".join(f"{column:>16}" for column in columns))
+    for name, result in results.items():
+        print(f"{name:<28}" + "".join(f"{result[column]:>16}" for column in columns))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.bench.run", description="Offline benchmarks for every blueprint")
+    parser.add_argument("--quick", action="store_true", help="Small dataset and few requests, for a smoke run")
+    parser.add_argument("--only", action="append", default=[], help="Run scenarios whose name starts with this (repeatable)")
+    parser.add_argument("--mongo-uri", help="Benchmark against this (local) mongod instead of the in-memory double")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--notes-per-user", type=int, default=5)
+    parser.add_argument("--todos-per-user", type=int, default=5)
+    parser.add_argument("--requests", type=int, default=200, help="Timed requests per scenario")
+    parser.add_argument("--slow-requests", type=int, default=20, help="Timed requests for the upload scenarios")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--pdf-pages", type=int, default=120)
+    parser.add_argument("--audio-seconds", type=int, default=300)
+    parser.add_argument("--llm-latency-ms", type=float, default=400)
+    parser.add_argument("--llm-tokens-per-second", type=float, default=80)
+    parser.add_argument("--transcribe-latency-ms", type=float, default=2000)
+    parser.add_argument("--bcrypt-rounds", type=int, help="Fixed bcrypt cost instead of the calibrated one")
+    parser.add_argument("--seed", type=int, default=2024)
+    parser.add_argument("--baseline", help=f"Compare against this baseline JSON (e.g. {DEFAULT_BASELINE})")
+    parser.add_argument("--write-baseline", help="Write the results to this file as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown before it counts as a regression")
+    parser.add_argument("--verbose", action="store_true", help="Keep the app's own output")
+    args = parser.parse_args(argv)
+    if args.quick:
+        args.users, args.requests, args.slow_requests = 50, 30, 3
+        args.pdf_pages, args.audio_seconds = 10, 30
+        args.llm_latency_ms, args.llm_tokens_per_second, args.transcribe_latency_ms = 20, 2000, 50
+        args.bcrypt_rounds = args.bcrypt_rounds or 8
+    return args
+
+
+def _progress(message):
+    print(message, file=sys.stderr, flush=True)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = _run(args)
+    return _report(args, results)
+
+
+def _run(args):
+    bench = build_bench(args)
+    scenarios = [scenario for scenario in SCENARIOS
+                 if not args.only or any(scenario.name.startswith(prefix) for prefix in args.only)]
+
+    results = {}
+    with fake_backends(args.llm_latency_ms, args.llm_tokens_per_second, args.transcribe_latency_ms):
+        if any(scenario.name == "jobs.status" for scenario in scenarios):
+            _submit_jobs(bench)
+        for scenario in scenarios:
+            slow = scenario.name.startswith(("summariser.", "whisper."))
+            requests = args.slow_requests if slow else args.requests
+            _progress(f"⏱️  {scenario.name}: {requests} requests, concurrency {args.concurrency}")
+            results[scenario.name] = run_scenario(bench, scenario, requests, args.concurrency, seed=args.seed)
+    return results
+
+
+def _report(args, results):
+    print_report(results)
+
+    settings = {key: value for key, value in vars(args).items()
+                if key not in ("baseline", "write_baseline", "only", "tolerance", "mongo_uri", "verbose")}
+    if args.write_baseline:
+        with open(args.write_baseline, "w") as baseline_file:
+            json.dump({"settings": settings, "scenarios": results}, baseline_file, indent=2, sort_keys=True)
+            baseline_file.write("\n")
+        print(f"📝 Baseline written to {args.write_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline.get("settings") != settings:
+            print("⚠️  Baseline was recorded with different settings, the comparison is only indicative")
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"❌ {regression}")
+        if regressions:
+            return 1
+        print("✅ No regressions against the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+import os
+from dotenv import load_dotenv # type: ignore
+
+# The one place the .env file is read; everything else takes its settings from here or os.environ
+load_dotenv()
+
+"""
+    Central place for the backend settings. Every value can be overridden
+    through an environment variable of the same name (or the .env file).
+    create_app() loads this class into app.config.
+"""
+class Config:
+    # MongoDB connection pool
+    MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", 50))
+    MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", 0))
+    MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", 60000))
+    MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", 5000))
+    MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", 5000))
+    MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000))
+    MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", 30000))
+
+    # Connections each worker opens before /ready reports it ready (see app/utils/readiness.py)
+    MONGO_WARM_CONNECTIONS = int(os.getenv("MONGO_WARM_CONNECTIONS", 4))
+    MONGO_WARM_TIMEOUT_SECONDS = float(os.getenv("MONGO_WARM_TIMEOUT_SECONDS", 30))
+
+    # Create/rebuild the declared indexes every time the app starts
+    MONGO_SYNC_INDEXES_ON_STARTUP = os.getenv("MONGO_SYNC_INDEXES_ON_STARTUP", "false").lower() == "true"
+
+    # JWT revocation cache (see app/utils/revocation_cache.py)
+    REVOCATION_REFRESH_SECONDS = float(os.getenv("REVOCATION_REFRESH_SECONDS", 5))
+    REVOCATION_REBUILD_SECONDS = float(os.getenv("REVOCATION_REBUILD_SECONDS", 3600))
+    REVOCATION_LRU_SIZE = int(os.getenv("REVOCATION_LRU_SIZE", 10000))
+    REVOCATION_LRU_TTL_SECONDS = float(os.getenv("REVOCATION_LRU_TTL_SECONDS", 30))
+    REVOCATION_BLOOM_CAPACITY = int(os.getenv("REVOCATION_BLOOM_CAPACITY", 100000))
+    REVOCATION_BLOOM_ERROR_RATE = float(os.getenv("REVOCATION_BLOOM_ERROR_RATE", 0.001))
+
+    # Background jobs for PDF/audio summaries (see app/utils/job_queue.py)
+    JOB_QUEUE_BACKEND = os.getenv("JOB_QUEUE_BACKEND", "local")  # "local" or "mongo"
+    JOB_WORKERS = int(os.getenv("JOB_WORKERS", 2))
+    JOB_MAX_PENDING = int(os.getenv("JOB_MAX_PENDING", 100))
+    JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", 1.0))
+    JOB_STALE_SECONDS = int(os.getenv("JOB_STALE_SECONDS", 900))
+    JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", 2))
+    JOB_HISTORY_LIMIT = int(os.getenv("JOB_HISTORY_LIMIT", 1000))
+    UPLOAD_TMP_DIR = os.getenv("UPLOAD_TMP_DIR")  # defaults to the system temp dir
+
+    # gpt_summarise result cache (see app/utils/summary_cache.py)
+    SUMMARY_CACHE_ENABLED = os.getenv("SUMMARY_CACHE_ENABLED", "true").lower() == "true"
+    SUMMARY_CACHE_LRU_SIZE = int(os.getenv("SUMMARY_CACHE_LRU_SIZE", 256))
+    SUMMARY_CACHE_MAX_BYTES = int(os.getenv("SUMMARY_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+    SUMMARY_CACHE_MAX_AGE_SECONDS = int(os.getenv("SUMMARY_CACHE_MAX_AGE_SECONDS", 30 * 24 * 3600))
+
+    # Note fields (content, transcript) above this size live compressed in note_blobs (see app/utils/note_blobs.py)
+    NOTE_BLOBS_ENABLED = os.getenv("NOTE_BLOBS_ENABLED", "true").lower() == "true"
+    NOTE_BLOB_THRESHOLD_BYTES = int(os.getenv("NOTE_BLOB_THRESHOLD_BYTES", 16 * 1024))
+    NOTE_BLOB_COMPRESSION_LEVEL = int(os.getenv("NOTE_BLOB_COMPRESSION_LEVEL")) if os.getenv("NOTE_BLOB_COMPRESSION_LEVEL") else None
+
+    # Patches kept per note in note_revisions (PATCH /notes/<id>)
+    NOTE_REVISION_LOG_LIMIT = int(os.getenv("NOTE_REVISION_LOG_LIMIT", 100))
+
+    # Serialised GET /notes responses, per user (see app/utils/note_cache.py)
+    NOTE_LIST_CACHE_ENABLED = os.getenv("NOTE_LIST_CACHE_ENABLED", "true").lower() == "true"
+    NOTE_LIST_CACHE_SIZE = int(os.getenv("NOTE_LIST_CACHE_SIZE", 2000))
+    NOTE_LIST_CACHE_TTL_SECONDS = float(os.getenv("NOTE_LIST_CACHE_TTL_SECONDS", 300))
+    # A streamed, unpaginated list bigger than this is not kept
+    NOTE_LIST_CACHE_MAX_BYTES = int(os.getenv("NOTE_LIST_CACHE_MAX_BYTES", 1024 * 1024))
+
+    # Response compression (see app/utils/compression.py), brotli needs the brotli package
+    COMPRESS_ENABLED = os.getenv("COMPRESS_ENABLED", "true").lower() == "true"
+    COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", 1024))
+    COMPRESS_GZIP_LEVEL = int(os.getenv("COMPRESS_GZIP_LEVEL", 6))
+    COMPRESS_BROTLI_QUALITY = int(os.getenv("COMPRESS_BROTLI_QUALITY", 5))
+
+    # Long documents are summarised chunk by chunk, then merged (map-reduce)
+    SUMMARY_CHUNK_TOKENS = int(os.getenv("SUMMARY_CHUNK_TOKENS", 6000))
+    SUMMARY_CHUNK_SUMMARY_TOKENS = int(os.getenv("SUMMARY_CHUNK_SUMMARY_TOKENS", 600))
+    SUMMARY_MAX_FAN_OUT = int(os.getenv("SUMMARY_MAX_FAN_OUT", 4))
+
+    # Local extractive summaries (see app/utils/extractive.py), need numpy
+    # In auto mode, texts up to this many tokens never go to the LLM
+    SUMMARY_LOCAL_MAX_TOKENS = int(os.getenv("SUMMARY_LOCAL_MAX_TOKENS", 300))
+    # ...and a slow, rate limited or failing LLM gets replaced by the local summary
+    SUMMARY_FALLBACK_ENABLED = os.getenv("SUMMARY_FALLBACK_ENABLED", "true").lower() == "true"
+
+    # PDF text extraction (see app/utils/pdf_extract.py)
+    PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", min(4, os.cpu_count() or 1)))
+    PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", 16))
+
+    # Password hashing (see app/utils/password_hasher.py)
+    # A fixed BCRYPT_LOG_ROUNDS wins, otherwise the cost is calibrated to BCRYPT_TARGET_MS per hash
+    BCRYPT_LOG_ROUNDS = int(os.getenv("BCRYPT_LOG_ROUNDS")) if os.getenv("BCRYPT_LOG_ROUNDS") else None
+    BCRYPT_TARGET_MS = float(os.getenv("BCRYPT_TARGET_MS", 250))
+    BCRYPT_MIN_ROUNDS = int(os.getenv("BCRYPT_MIN_ROUNDS", 10))
+    BCRYPT_MAX_ROUNDS = int(os.getenv("BCRYPT_MAX_ROUNDS", 16))
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", min(4, os.cpu_count() or 1)))  # 0: hash inline
+    PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", 64))
+    PASSWORD_HASH_TIMEOUT_SECONDS = float(os.getenv("PASSWORD_HASH_TIMEOUT_SECONDS", 10))
+
+    # Logging (see app/utils/log.py); request-path INFO/DEBUG is kept for LOG_SAMPLE_RATE of requests
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FORMAT = os.getenv("LOG_FORMAT", "json")  # "json" or "text"
+    LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", 0.1))
+
+    # Request and stage latency histograms at /metrics (see app/utils/metrics.py)
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+    # Provider credentials, read here once instead of in every service module
+    OPENAI_API_KEY = os.getenv("STUDIVIO_SECRET_KEY")
+    ASSEMBLY_API_KEY = os.getenv("ASSEMBLY_API_KEY")
+
+    # Audio transcription (see app/utils/audio.py and app/utils/transcription.py)
+    TRANSCRIBER_BACKEND = os.getenv("TRANSCRIBER_BACKEND", "assemblyai")  # or "fake", offline
+    AUDIO_PREPROCESS_ENABLED = os.getenv("AUDIO_PREPROCESS_ENABLED", "true").lower() == "true"
+    AUDIO_SAMPLE_RATE = int(os.getenv("AUDIO_SAMPLE_RATE", 16000))
+    AUDIO_SEGMENT_SECONDS = int(os.getenv("AUDIO_SEGMENT_SECONDS", 300))
+    AUDIO_SEGMENT_SEARCH_SECONDS = int(os.getenv("AUDIO_SEGMENT_SEARCH_SECONDS", 30))
+    AUDIO_SEGMENT_OVERLAP_SECONDS = float(os.getenv("AUDIO_SEGMENT_OVERLAP_SECONDS", 3))
+    AUDIO_FFMPEG_TIMEOUT_SECONDS = int(os.getenv("AUDIO_FFMPEG_TIMEOUT_SECONDS", 300))
+    TRANSCRIBE_CONCURRENCY = int(os.getenv("TRANSCRIBE_CONCURRENCY", 4))
+    TRANSCRIBE_RETRIES = int(os.getenv("TRANSCRIBE_RETRIES", 1))
+
+    # LLM provider calls (see app/utils/llm_client.py)
+    LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 8))
+    LLM_MAX_CONCURRENCY_PER_USER = int(os.getenv("LLM_MAX_CONCURRENCY_PER_USER", 4))
+    LLM_QUEUE_TIMEOUT_SECONDS = float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", 30))
+    LLM_REQUEST_TIMEOUT_SECONDS = float(os.getenv("LLM_REQUEST_TIMEOUT_SECONDS", 120))
+    LLM_SUMMARY_DEADLINE_SECONDS = float(os.getenv("LLM_SUMMARY_DEADLINE_SECONDS", 300))
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 4))
+    LLM_BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", 0.5))
+    LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", 20))
+    LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", 5))
+    LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", 30))
+    LLM_HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", 20))
+    LLM_HTTP_KEEPALIVE = int(os.getenv("LLM_HTTP_KEEPALIVE", 10))
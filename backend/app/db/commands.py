@@ -0,0 +1,60 @@
+import json
+import click # type: ignore
+from flask import current_app
+from flask.cli import AppGroup # type: ignore
+from app.db.db_setup import get_db
+from app.db.indexes import (
+    sync_indexes, index_status, index_build_progress, explain_queries, index_usage, run_migrations
+)
+
+"""
+    Database maintenance commands, e.g.
+        flask --app app db migrate
+        flask --app app db index-status
+"""
+db_cli = AppGroup('db', help='Index and migration management')
+
+
+def _db():
+    return get_db(current_app._get_current_object())
+
+
+@db_cli.command('sync-indexes')
+@click.option('--drop-unknown', is_flag=True, help='Also drop indexes that are not declared')
+def sync_indexes_command(drop_unknown):
+    """Create or rebuild the declared indexes"""
+    sync_indexes(_db(), drop_unknown=drop_unknown, report=click.echo)
+
+
+@db_cli.command('migrate')
+def migrate_command():
+    """Run pending data migrations, then sync indexes"""
+    ran = run_migrations(_db(), current_app._get_current_object(), report=click.echo)
+    click.echo(f"Applied {len(ran)} migration(s)")
+    sync_indexes(_db(), report=click.echo)
+
+
+@db_cli.command('index-status')
+def index_status_command():
+    """Show declared indexes that are missing or outdated"""
+    click.echo(json.dumps(index_status(_db()), indent=2))
+
+
+@db_cli.command('index-progress')
+def index_progress_command():
+    """Show index builds that are still running"""
+    builds = index_build_progress(_db())
+    if not builds:
+        click.echo("No index builds in progress")
+    for build in builds:
+        percent = f"{build['percent']}%" if build['percent'] is not None else "?"
+        click.echo(f"{build['collection']} {', '.join(build['indexes'])}: {percent} {build['message']}")
+
+
+@db_cli.command('explain')
+def explain_command():
+    """Show which index each hot query uses, and how often each index is hit"""
+    click.echo(json.dumps({
+        "queries": explain_queries(_db()),
+        "usage": index_usage(_db()),
+    }, indent=2, default=str))
@@ -1,7 +1,191 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from flask_pymongo import PyMongo # type: ignore
+from flask_pymongo.helpers import BSONObjectIdConverter, BSONProvider # type: ignore
+from pymongo import monitoring # type: ignore
+from app.config import Config
+
+# The one MongoClient (and connection pool) shared by every request in this process.
+mongo = PyMongo()
+
+# Extra clients, only created when an app points at a different MONGO_URI
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """Counts connection pool events so the pool can be sized from real numbers"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.pools = 0
+            self.created = 0
+            self.closed = 0
+            self.checked_out = 0
+            self.checked_in = 0
+            self.checkout_failures = 0
+            self.in_use = 0
+            self.peak_in_use = 0
+
+    def pool_created(self, event):
+        with self._lock:
+            self.pools += 1
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        with self._lock:
+            self.pools = max(0, self.pools - 1)
+
+    def connection_created(self, event):
+        with self._lock:
+            self.created += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.closed += 1
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.checkout_failures += 1
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self.checked_out += 1
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_in += 1
+            self.in_use = max(0, self.in_use - 1)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "pools": self.pools,
+                "connections_open": self.created - self.closed,
+                "connections_created": self.created,
+                "connections_closed": self.closed,
+                "checked_out_total": self.checked_out,
+                "checked_in_total": self.checked_in,
+                "checkout_failures": self.checkout_failures,
+                "in_use": self.in_use,
+                "peak_in_use": self.peak_in_use,
+            }
+
+
+pool_listener = PoolStatsListener()
+
+
+def _setting(app, key):
+    return app.config.get(key, getattr(Config, key))
+
+
+def pool_options(app):
+    """Keyword arguments passed to MongoClient for the shared pool"""
+    return {
+        "maxPoolSize": _setting(app, "MONGO_MAX_POOL_SIZE"),
+        "minPoolSize": _setting(app, "MONGO_MIN_POOL_SIZE"),
+        "maxIdleTimeMS": _setting(app, "MONGO_MAX_IDLE_TIME_MS"),
+        "waitQueueTimeoutMS": _setting(app, "MONGO_WAIT_QUEUE_TIMEOUT_MS"),
+        "connectTimeoutMS": _setting(app, "MONGO_CONNECT_TIMEOUT_MS"),
+        "serverSelectionTimeoutMS": _setting(app, "MONGO_SERVER_SELECTION_TIMEOUT_MS"),
+        "socketTimeoutMS": _setting(app, "MONGO_SOCKET_TIMEOUT_MS"),
+        "event_listeners": [pool_listener],
+        # No monitor threads or sockets until the first operation, so an app
+        # built before a fork (gunicorn preload_app) is safe to fork
+        "connect": False,
+    }
+
 
 def init_mongo(app):
-    # Example: set your MongoDB URI here or in app.config
-    app.config["MONGO_URI"] = "mongodb://localhost:27017/Studivio"
-    mongo = PyMongo(app)
-    return mongo
\ No newline at end of file
+    """
+        Bind the process-wide client to the app. The client is only built once
+        per MONGO_URI, every later app (or test) with the same URI reuses it.
+    """
+    uri = app.config.get("MONGO_URI")
+    with _clients_lock:
+        client = _clients.get(uri)
+        if client is None:
+            client = mongo if mongo.cx is None else PyMongo()
+            client.init_app(app, **pool_options(app))
+            _clients[uri] = client
+        else:
+            # Same wiring init_app would have done, without a new MongoClient
+            app.url_map.converters["ObjectId"] = BSONObjectIdConverter
+            app.json = BSONProvider(app)
+    app.extensions["pymongo"] = client
+    return client
+
+
+def get_mongo(app):
+    if "pymongo" not in app.extensions:
+        init_mongo(app)
+    return app.extensions["pymongo"]
+
+
+def get_db(app):
+    return get_mongo(app).db
+
+
+class LazyCollection:
+    """Collection handle that is only resolved the first time it is used"""
+
+    def __init__(self, app, name):
+        self._app = app
+        self._name = name
+        self._collection = None
+
+    def _resolve(self):
+        if self._collection is None:
+            self._collection = get_db(self._app)[self._name]
+        return self._collection
+
+    def __getattr__(self, attr):
+        return getattr(self._resolve(), attr)
+
+
+def get_collection(app, name):
+    return LazyCollection(app, name)
+
+
+def warm_pool(app, connections=None):
+    """
+        Open the pool's connections now rather than on the first requests:
+        one ping to select the server, then `connections` pings at once so
+        each takes its own connection. Returns the open connection count.
+    """
+    client = get_mongo(app).cx
+    connections = connections or _setting(app, "MONGO_WARM_CONNECTIONS")
+    ping = lambda _: client.admin.command("ping")
+    ping(None)
+    if connections > 1:
+        with ThreadPoolExecutor(max_workers=connections) as executor:
+            list(executor.map(ping, range(connections)))
+    return pool_listener.snapshot()["connections_open"]
+
+
+def pool_stats(app):
+    """Pool configuration plus live counters from the connection pool listener"""
+    options = pool_options(app)
+    options.pop("event_listeners")
+    return {
+        "config": options,
+        "stats": pool_listener.snapshot(),
+        "clients": len(_clients),
+    }
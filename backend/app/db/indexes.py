@@ -0,0 +1,377 @@
+from datetime import datetime, timedelta
+from pymongo import ASCENDING, DESCENDING # type: ignore
+from pymongo.errors import OperationFailure # type: ignore
+from app.config import Config
+
+"""
+    Declarative index definitions for every collection, plus the code that
+    reconciles them against what actually exists in MongoDB.
+    Run it with `flask db sync-indexes` or set MONGO_SYNC_INDEXES_ON_STARTUP.
+"""
+
+# Only these index options are compared when deciding if an index is up to date
+COMPARED_OPTIONS = ("unique", "sparse", "expireAfterSeconds", "partialFilterExpression")
+
+INDEXES = {
+    "notes": [
+        {
+            # _id breaks created_at ties for keyset pagination
+            "name": "user_id_created_at",
+            "keys": [("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+            "options": {},
+        },
+    ],
+    "todos": [
+        {
+            # Agenda and due-date sorting: equality on user, range/sort on due_date
+            "name": "user_id_due_date",
+            "keys": [("user_id", ASCENDING), ("due_date", ASCENDING), ("_id", ASCENDING)],
+            "options": {},
+        },
+        {
+            "name": "user_id_status_due_date",
+            "keys": [("user_id", ASCENDING), ("status", ASCENDING), ("due_date", ASCENDING)],
+            "options": {},
+        },
+        {
+            "name": "user_id_priority_rank_due_date",
+            "keys": [("user_id", ASCENDING), ("priority_rank", ASCENDING), ("due_date", ASCENDING)],
+            "options": {},
+        },
+        {
+            "name": "user_id_created_at",
+            "keys": [("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+            "options": {},
+        },
+    ],
+    "users": [
+        {
+            "name": "username_unique",
+            "keys": [("username", ASCENDING)],
+            "options": {"unique": True},
+        },
+    ],
+    "blacklisted_tokens": [
+        {
+            "name": "jti_unique",
+            "keys": [("jti", ASCENDING)],
+            "options": {"unique": True},
+        },
+        {
+            # Incremental refresh of the revocation cache
+            "name": "revoked_at",
+            "keys": [("revoked_at", ASCENDING)],
+            "options": {},
+        },
+        {
+            # Rows disappear once the token they revoke has expired anyway
+            "name": "expires_at_ttl",
+            "keys": [("expires_at", ASCENDING)],
+            "options": {"expireAfterSeconds": 0},
+        },
+    ],
+    "jobs": [
+        {
+            # Workers claim the oldest queued job
+            "name": "status_created_at",
+            "keys": [("status", ASCENDING), ("created_at", ASCENDING)],
+            "options": {},
+        },
+        {
+            "name": "finished_at_ttl",
+            "keys": [("finished_at", ASCENDING)],
+            "options": {"expireAfterSeconds": 7 * 24 * 3600},
+        },
+    ],
+    "summary_cache": [
+        {
+            "name": "created_at_ttl",
+            "keys": [("created_at", ASCENDING)],
+            "options": {"expireAfterSeconds": Config.SUMMARY_CACHE_MAX_AGE_SECONDS},
+        },
+        {
+            # Size-based trimming drops the least recently used entries first
+            "name": "last_used_at",
+            "keys": [("last_used_at", ASCENDING)],
+            "options": {},
+        },
+    ],
+    "note_blobs": [
+        {
+            # Pruning replaced blobs, and deleting a note's blobs with it
+            "name": "note_id_field",
+            "keys": [("note_id", ASCENDING), ("field", ASCENDING)],
+            "options": {},
+        },
+    ],
+    "note_revisions": [
+        {
+            # A note's patch log in order, trimming its oldest entries, and one entry per revision
+            "name": "note_id_revision",
+            "keys": [("note_id", ASCENDING), ("revision", ASCENDING)],
+            "options": {"unique": True},
+        },
+    ],
+    "search_postings": [
+        {
+            # Term lookups (exact and prefix ranges) within one user's notes
+            "name": "user_id_term",
+            "keys": [("user_id", ASCENDING), ("term", ASCENDING)],
+            "options": {},
+        },
+        {
+            # Reindexing and deleting a single note
+            "name": "note_id_term",
+            "keys": [("note_id", ASCENDING), ("term", ASCENDING)],
+            "options": {"unique": True},
+        },
+    ],
+}
+
+# The hot queries and the index each one is expected to use
+QUERIES = {
+    "notes_by_user": {
+        "collection": "notes",
+        "filter": {"user_id": "<user>"},
+        "sort": [("created_at", DESCENDING), ("_id", DESCENDING)],
+        "expected_index": "user_id_created_at",
+    },
+    "todo_agenda": {
+        "collection": "todos",
+        "filter": {"user_id": "<user>", "due_date": {"$gte": "2025-01-01", "$lte": "2025-01-08"},
+                   "status": {"$ne": "completed"}},
+        "sort": [("due_date", ASCENDING), ("_id", ASCENDING)],
+        "expected_index": "user_id_due_date",
+    },
+    "todos_by_status": {
+        "collection": "todos",
+        "filter": {"user_id": "<user>", "status": "pending"},
+        "sort": [("due_date", ASCENDING)],
+        "expected_index": "user_id_status_due_date",
+    },
+    "user_by_username": {
+        "collection": "users",
+        "filter": {"username": "<user>"},
+        "expected_index": "username_unique",
+    },
+    "blacklisted_jti": {
+        "collection": "blacklisted_tokens",
+        "filter": {"jti": "<jti>"},
+        "expected_index": "jti_unique",
+    },
+    "search_terms": {
+        "collection": "search_postings",
+        "filter": {"user_id": "<user>", "term": {"$gte": "<term>", "$lt": "<term>\uffff"}},
+        "expected_index": "user_id_term",
+    },
+}
+
+
+def _options_of(info):
+    return {key: info[key] for key in COMPARED_OPTIONS if key in info}
+
+
+def _matches(spec, info):
+    return list(info["key"]) == list(spec["keys"]) and _options_of(info) == spec["options"]
+
+
+def sync_collection_indexes(collection, specs, drop_unknown=False, report=print):
+    """Create missing indexes, rebuild changed ones and optionally drop undeclared ones"""
+    actions = []
+    existing = collection.index_information()
+    declared = {spec["name"] for spec in specs}
+
+    for spec in specs:
+        current = existing.get(spec["name"])
+        if current is None:
+            # Same keys under another name would make create_index fail
+            for name, info in existing.items():
+                if name != "_id_" and list(info["key"]) == list(spec["keys"]) and name not in declared:
+                    collection.drop_index(name)
+                    actions.append(("dropped", collection.name, name))
+                    report(f"🗑️ {collection.name}.{name}: dropped, replaced by {spec['name']}")
+        elif _matches(spec, current):
+            actions.append(("ok", collection.name, spec["name"]))
+            continue
+        else:
+            collection.drop_index(spec["name"])
+            report(f"♻️ {collection.name}.{spec['name']}: definition changed, rebuilding")
+
+        report(f"🔨 {collection.name}.{spec['name']}: building")
+        try:
+            collection.create_index(spec["keys"], name=spec["name"], **spec["options"])
+        except OperationFailure as error:
+            # e.g. duplicate usernames already in the collection
+            actions.append(("failed", collection.name, spec["name"]))
+            report(f"❌ {collection.name}.{spec['name']}: {error}")
+            continue
+        actions.append(("created", collection.name, spec["name"]))
+        report(f"✅ {collection.name}.{spec['name']}: ready")
+
+    if drop_unknown:
+        for name in existing:
+            if name != "_id_" and name not in declared:
+                collection.drop_index(name)
+                actions.append(("dropped", collection.name, name))
+                report(f"🗑️ {collection.name}.{name}: not declared, dropped")
+    return actions
+
+
+def sync_indexes(db, drop_unknown=False, report=print):
+    actions = []
+    for collection_name, specs in INDEXES.items():
+        actions.extend(sync_collection_indexes(db[collection_name], specs, drop_unknown, report))
+    return actions
+
+
+def index_status(db):
+    """Declared vs existing indexes per collection"""
+    status = {}
+    for collection_name, specs in INDEXES.items():
+        existing = db[collection_name].index_information()
+        status[collection_name] = {
+            spec["name"]: (
+                "missing" if spec["name"] not in existing
+                else "ok" if _matches(spec, existing[spec["name"]])
+                else "outdated"
+            )
+            for spec in specs
+        }
+    return status
+
+
+def index_build_progress(db):
+    """In-progress index builds as reported by $currentOp"""
+    builds = []
+    pipeline = [
+        {"$currentOp": {"allUsers": True, "idleConnections": False}},
+        {"$match": {"command.createIndexes": {"$exists": True}}},
+    ]
+    for op in db.client.admin.aggregate(pipeline):
+        progress = op.get("progress") or {}
+        done, total = progress.get("done"), progress.get("total")
+        builds.append({
+            "collection": op["command"]["createIndexes"],
+            "indexes": [index.get("name") for index in op["command"].get("indexes", [])],
+            "message": op.get("msg", ""),
+            "percent": round(100.0 * done / total, 1) if done is not None and total else None,
+        })
+    return builds
+
+
+def _winning_index(plan):
+    while plan:
+        if plan.get("indexName"):
+            return plan["indexName"]
+        plan = plan.get("inputStage") or (plan.get("inputStages") or [None])[0]
+    return None
+
+
+def explain_queries(db):
+    """Which index the query planner picks for each hot query"""
+    report = {}
+    for query_name, query in QUERIES.items():
+        cursor = db[query["collection"]].find(query["filter"])
+        if query.get("sort"):
+            cursor = cursor.sort(query["sort"])
+        plan = cursor.explain().get("queryPlanner", {}).get("winningPlan", {})
+        used = _winning_index(plan)
+        report[query_name] = {
+            "collection": query["collection"],
+            "index": used or "COLLSCAN",
+            "expected_index": query["expected_index"],
+            "ok": used == query["expected_index"],
+        }
+    return report
+
+
+def index_usage(db):
+    """Per-index access counters from $indexStats"""
+    usage = {}
+    for collection_name in INDEXES:
+        usage[collection_name] = {
+            stat["name"]: stat["accesses"]["ops"]
+            for stat in db[collection_name].aggregate([{"$indexStats": {}}])
+        }
+    return usage
+
+
+# --- Data migrations ---
+
+def _backfill_blacklist_expiry(db, app):
+    """Old blacklist rows have no expires_at, give them one so the TTL index cleans them up"""
+    expires = app.config.get("JWT_ACCESS_TOKEN_EXPIRES", timedelta(minutes=15))
+    if not isinstance(expires, timedelta):
+        expires = timedelta(minutes=15)
+    result = db.blacklisted_tokens.update_many(
+        {"expires_at": {"$exists": False}},
+        {"$set": {"expires_at": datetime.utcnow() + expires}},
+    )
+    return result.modified_count
+
+
+def _build_search_index(db, app):
+    """Notes written before search existed have no postings yet"""
+    from app.utils.search_index import NoteSearchIndex
+    return NoteSearchIndex(app).rebuild()
+
+
+def _backfill_todo_owner(db, app):
+    """
+        Todos used to be global. Ones that recorded a username go to that user,
+        and every todo gets the priority_rank used for sorting.
+    """
+    from app.models.todo import PRIORITY_RANKS
+    changed = 0
+    for todo in db.todos.find({"$or": [{"user_id": {"$exists": False}, "username": {"$exists": True}},
+                                       {"priority_rank": {"$exists": False}}]}):
+        update = {"priority_rank": PRIORITY_RANKS.get(str(todo.get("priority")).lower(), len(PRIORITY_RANKS))}
+        if "user_id" not in todo and todo.get("username"):
+            update["user_id"] = todo["username"]
+        db.todos.update_one({"_id": todo["_id"]}, {"$set": update})
+        changed += 1
+    return changed
+
+
+def _offload_large_note_fields(db, app):
+    """Move oversize content and transcripts that were stored inline into note_blobs"""
+    from app.utils.note_blobs import NoteBlobStore, OFFLOADED_FIELDS
+    blobs = NoteBlobStore(app)
+    changed = 0
+    projection = {field: 1 for field in OFFLOADED_FIELDS + ("user_id",)}
+    for note in db.notes.find({"blobs": {"$exists": False}}, projection):
+        stored, stubs, documents = blobs.split(note["_id"], note.get("user_id"), note)
+        if not stubs:
+            continue
+        blobs.save(documents)
+        update = {field: stored[field] for field in stubs}
+        update.update({f"blobs.{field}": stub for field, stub in stubs.items()})
+        db.notes.update_one({"_id": note["_id"]}, {"$set": update})
+        changed += 1
+    return changed
+
+
+MIGRATIONS = [
+    ("0001_blacklist_expires_at", _backfill_blacklist_expiry),
+    ("0002_build_search_index", _build_search_index),
+    ("0003_todo_owner_and_priority_rank", _backfill_todo_owner),
+    ("0004_offload_large_note_fields", _offload_large_note_fields),
+]
+
+
+def run_migrations(db, app, report=print):
+    """Apply every migration not yet recorded in schema_migrations, in order"""
+    applied = {doc["_id"] for doc in db.schema_migrations.find({}, {"_id": 1})}
+    ran = []
+    for migration_id, migrate in MIGRATIONS:
+        if migration_id in applied:
+            continue
+        report(f"🚚 Running migration {migration_id}")
+        changed = migrate(db, app)
+        db.schema_migrations.insert_one({
+            "_id": migration_id,
+            "applied_at": datetime.utcnow(),
+            "changed": changed,
+        })
+        ran.append(migration_id)
+    return ran
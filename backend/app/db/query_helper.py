@@ -1,4 +1,14 @@
+from collections import namedtuple
+from bson.errors import InvalidId # type: ignore
 from bson.objectid import ObjectId # type: ignore
+from pymongo import ReturnDocument # type: ignore
+
+"""
+    Small query helpers. The *_owned ones filter on {_id, owner}, so the
+    ownership check and the read or write are one atomic operation and one
+    round trip. Only when nothing matched is a second, cheap lookup made, to
+    tell "no such document" apart from "someone else's document".
+"""
 
 def find_by_id(collection, id):
     return collection.find_one({"_id": ObjectId(id)})
@@ -10,4 +20,73 @@ def update_by_id(collection, id, data):
     return collection.update_one({"_id": ObjectId(id)}, {"$set": data})
 
 def delete_by_id(collection, id):
-    return collection.delete_one({"_id": ObjectId(id)})
\ No newline at end of file
+    return collection.delete_one({"_id": ObjectId(id)})
+
+
+OK = "ok"
+NOT_FOUND = "not_found"
+FORBIDDEN = "forbidden"
+# The document is the owner's, but it did not match the write's extra conditions
+CONFLICT = "conflict"
+
+
+class OwnedResult(namedtuple("OwnedResult", ["status", "document"])):
+    """status is OK, NOT_FOUND, FORBIDDEN or CONFLICT; document is the read or updated one (if any)"""
+
+    @property
+    def ok(self):
+        return self.status == OK
+
+
+def owned_filter(id, owner_id, owner_field="user_id"):
+    """Raises InvalidId for a malformed id"""
+    return {"_id": ObjectId(id), owner_field: owner_id}
+
+
+def _miss(collection, object_id):
+    exists = collection.count_documents({"_id": object_id}, limit=1)
+    return OwnedResult(FORBIDDEN if exists else NOT_FOUND, None)
+
+
+def find_owned(collection, id, owner_id, projection=None, owner_field="user_id"):
+    try:
+        query = owned_filter(id, owner_id, owner_field)
+    except (InvalidId, TypeError):
+        return OwnedResult(NOT_FOUND, None)
+    document = collection.find_one(query, projection)
+    return OwnedResult(OK, document) if document else _miss(collection, query["_id"])
+
+
+def update_owned(collection, id, owner_id, changes, projection=None, owner_field="user_id", unset=(), inc=None,
+                 match=None):
+    """
+        $set changes (and $unset the unset fields, $inc the inc ones) on the
+        owner's document, returns it as it is after the update. With match,
+        the document must also match those conditions, else the result is CONFLICT.
+    """
+    try:
+        query = owned_filter(id, owner_id, owner_field)
+    except (InvalidId, TypeError):
+        return OwnedResult(NOT_FOUND, None)
+    update = {"$set": changes}
+    if unset:
+        update["$unset"] = {field: "" for field in unset}
+    if inc:
+        update["$inc"] = inc
+    document = collection.find_one_and_update(dict(query, **(match or {})), update, projection=projection,
+                                              return_document=ReturnDocument.AFTER)
+    if document:
+        return OwnedResult(OK, document)
+    if match and collection.count_documents(query, limit=1):
+        return OwnedResult(CONFLICT, None)
+    return _miss(collection, query["_id"])
+
+
+def delete_owned(collection, id, owner_id, owner_field="user_id"):
+    try:
+        query = owned_filter(id, owner_id, owner_field)
+    except (InvalidId, TypeError):
+        return OwnedResult(NOT_FOUND, None)
+    if collection.delete_one(query).deleted_count:
+        return OwnedResult(OK, None)
+    return _miss(collection, query["_id"])
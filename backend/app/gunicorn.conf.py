@@ -0,0 +1,53 @@
+import multiprocessing
+import os
+
+"""
+    gunicorn settings for production:
+        cd backend
+        gunicorn -c app/gunicorn.conf.py app.wsgi:app
+    The app is built once in the master (preload_app) and forked into the
+    workers, so a worker starts in milliseconds and shares the imported code.
+    create_app() opens no socket and starts no thread (MongoDB connects on
+    first use, job workers and the hashing pool start on first use, the AI
+    and PDF libraries are imported on first use), which keeps forking safe.
+    Each worker then warms its MongoDB pool, and /ready answers 503 until it has.
+    With more than one worker, jobs have to live in MongoDB so that any
+    worker can answer GET /jobs/<id>: JOB_QUEUE_BACKEND defaults to "mongo"
+    here, and the master refuses to start with the local store.
+    Index sync is best run as `flask db sync-indexes` at deploy time rather
+    than MONGO_SYNC_INDEXES_ON_STARTUP, which would connect in the master
+    before the fork.
+"""
+
+bind = os.getenv("BIND", "0.0.0.0:5000")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() + 1))
+# Set before the app is built (preload_app), Config reads it at import
+if workers > 1:
+    os.environ.setdefault("JOB_QUEUE_BACKEND", "mongo")
+
+# Threads, not processes, for the concurrency inside a worker: most request
+# time is spent waiting on MongoDB or the AI providers, and SSE streams stay open
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", 8))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 120))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", 5))
+# Recycle workers now and then, staggered so they never all restart together
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 5000))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", 500))
+preload_app = True
+# Requests are already logged and timed by the app (app/utils/log.py, app/utils/metrics.py)
+accesslog = None
+
+
+def on_starting(server):
+    # Runs once the preloaded app is built, so this checks the setting the app really uses
+    backend = server.app.wsgi().config.get("JOB_QUEUE_BACKEND")
+    if server.cfg.workers > 1 and backend != "mongo":
+        raise RuntimeError(f"JOB_QUEUE_BACKEND={backend!r} keeps jobs inside one worker; "
+                           f"use JOB_QUEUE_BACKEND=mongo or WEB_CONCURRENCY=1")
+
+
+def post_worker_init(worker):
+    from app.utils.readiness import readiness
+    readiness.start(worker.wsgi)
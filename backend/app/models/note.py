@@ -1,11 +1,48 @@
-from flask_pymongo import PyMongo # type: ignore
 from bson.objectid import ObjectId # type: ignore
-import json
+from bson.errors import InvalidId # type: ignore
+from pymongo import InsertOne, UpdateOne, DeleteOne, ReturnDocument # type: ignore
+from pymongo.errors import BulkWriteError # type: ignore
+from datetime import datetime
+import logging
+from app.db.db_setup import get_collection
+from app.db.query_helper import find_owned, update_owned, delete_owned, OwnedResult, NOT_FOUND, CONFLICT
+from app.utils.pagination import keyset_filter
+from app.utils.search_index import NoteSearchIndex, INDEXED_FIELDS, tokenize
+from app.utils.note_cache import note_list_cache
+from app.utils.note_blobs import NoteBlobStore, OFFLOADED_FIELDS
+from app.utils.note_patch import apply_patch, utf16_length, PatchError
+from app.utils.metrics import stage_timer
+
+logger = logging.getLogger(__name__)
+
+# Kept by the server whatever a client sends: blobs holds the stubs of offloaded fields (see note_blobs)
+SERVER_FIELDS = ('_id', 'user_id', 'revision', 'blobs')
+
+def make_snippet(note, terms, width=160):
+    """A short piece of the note around the first query term found"""
+    for field in ('content', 'transcript', 'title'):
+        text = note.get(field)
+        if not isinstance(text, str) or not text:
+            continue
+        lowered = text.lower()
+        positions = [lowered.find(term) for term in terms if term in lowered]
+        if positions:
+            start = max(0, min(positions) - width // 4)
+            snippet = text[start:start + width].strip()
+            return ('…' if start > 0 else '') + snippet + ('…' if start + width < len(text) else '')
+    content = note.get('content')
+    return content[:width] if isinstance(content, str) else ''
 
 class NoteModel:
     def __init__(self, app):
-        self.mongo = PyMongo(app)
-        self.collection = self.mongo.db.notes
+        # Reuses the process-wide client instead of opening a new pool per request
+        self.collection = get_collection(app, "notes")
+        self.search_index = NoteSearchIndex(app)
+        self.versions = get_collection(app, "note_versions")
+        self.blobs = NoteBlobStore(app)
+        # Compact log of the patches applied by PATCH /notes/<id>, see patch_owned()
+        self.revisions = get_collection(app, "note_revisions")
+        self.revision_log_limit = app.config.get("NOTE_REVISION_LOG_LIMIT", 100)
 
     def create_note(self, data):
         required_fields = ['title', 'content']
@@ -20,34 +57,427 @@ class NoteModel:
         # Set default content type if not specified
         if 'content_type' not in data:
             data['content_type'] = 'manual'
+
+        # Bumped by every write, PATCH checks it (notes from before it count as revision 0)
+        data['revision'] = 0
+        data.pop('blobs', None)
         
-        note_id = self.collection.insert_one(data).inserted_id
+        # Oversize fields go to note_blobs first, the note only points at them
+        note_id = ObjectId()
+        stored, stubs, blobs = self.blobs.split(note_id, data.get('user_id'), data)
+        stored['_id'] = note_id
+        if stubs:
+            stored['blobs'] = stubs
+        self.blobs.save(blobs)
+        try:
+            with stage_timer("db_insert"):
+                note_id = self.collection.insert_one(stored).inserted_id
+        except Exception:
+            self.blobs.discard(blobs)
+            raise
+        data['_id'] = note_id
+        if note_id:
+            self._reindex(note_id, data.get('user_id'), data, new=True)
+            self._touch(data.get('user_id'))
         return str(note_id) if note_id else False  # Return the actual ID as string
 
     def read_note(self, note_id):
         note = self.collection.find_one({'_id': ObjectId(note_id)})
         if note:
-            return note
+            return self.blobs.hydrate(note)
         return None
 
     def update_note(self, note_id, data):
         try:
-            note = self.collection.find_one({'_id': ObjectId(note_id)})
-            if not note:
-                return None
-            
+            data.pop('revision', None)
+            data.pop('blobs', None)
             # Ensure format consistency when updating
             if 'content' in data and 'format' not in data:
                 data['format'] = 'text'
-                
-        except Exception as e:
+            changes, unset, blobs = self._split_changes(note_id, data.get('user_id'), data)
+            self.blobs.save(blobs)
+            update = {'$set': changes, '$inc': {'revision': 1}}
+            if unset:
+                update['$unset'] = {field: '' for field in unset}
+            note = self.collection.find_one_and_update({'_id': ObjectId(note_id)}, update,
+                                                       projection=self._write_projection,
+                                                       return_document=ReturnDocument.AFTER)
+        except Exception:
             return None
-        result = self.collection.update_one({'_id': ObjectId(note_id)}, {'$set': data})
-        return result.modified_count > 0
+        self._settle_blobs(note is not None, note_id, data, blobs)
+        if note:
+            self._after_update(note, data)
+        return note is not None
 
     def delete_note(self, note_id):
-        result = self.collection.delete_one({'_id': ObjectId(note_id)})
-        return result.deleted_count > 0
+        # find_one_and_delete also tells us whose list just changed
+        deleted = self.collection.find_one_and_delete({'_id': ObjectId(note_id)}, {'user_id': 1})
+        if deleted:
+            self._after_delete(deleted['_id'], deleted.get('user_id'))
+        return deleted is not None
+
+    # --- Ownership-scoped access, one round trip each (see app/db/query_helper.py) ---
+
+    # What a write needs back: the owner, and the text (or its blob stubs) to reindex
+    _write_projection = {field: 1 for field in INDEXED_FIELDS + ('user_id', 'blobs', 'revision')}
+
+    def read_owned(self, note_id, user_id):
+        """The user's note with its offloaded fields loaded back"""
+        result = find_owned(self.collection, note_id, user_id)
+        if result.ok:
+            self.blobs.hydrate(result.document)
+        return result
+
+    def update_owned(self, note_id, user_id, data, expected_revision=None):
+        """
+            Apply data to the user's note; .document is the note's owner and
+            text after the update. With expected_revision, only a note still at
+            that revision is written, otherwise the result is CONFLICT.
+        """
+        data = {key: value for key, value in data.items() if key not in SERVER_FIELDS}
+        if 'content' in data and 'format' not in data:
+            data['format'] = 'text'
+        try:
+            changes, unset, blobs = self._split_changes(note_id, user_id, data)
+        except (InvalidId, TypeError):
+            return OwnedResult(NOT_FOUND, None)
+        self.blobs.save(blobs)
+        match = None
+        if expected_revision is not None:
+            # A note written before revisions existed has no field, and counts as 0
+            match = {'revision': {'$in': [0, None]} if expected_revision == 0 else expected_revision}
+        result = update_owned(self.collection, note_id, user_id, changes, projection=self._write_projection,
+                              unset=unset, inc={'revision': 1}, match=match)
+        self._settle_blobs(result.ok, note_id, data, blobs)
+        if result.ok:
+            self._after_update(result.document, data)
+        return result
+
+    def patch_owned(self, note_id, user_id, base_revision, patch_format=None, patch=None, title=None):
+        """
+            Apply a delta or diff (see app/utils/note_patch.py) made against
+            base_revision to the user's note content, and/or set its title.
+            CONFLICT when the note has moved past base_revision, its .document
+            then holds the current revision. Raises PatchError for a patch
+            that does not fit the note.
+        """
+        result = self.read_owned(note_id, user_id)
+        if not result.ok:
+            return result
+        note = result.document
+        current = note.get('revision', 0)
+        if current != base_revision:
+            return OwnedResult(CONFLICT, {'revision': current})
+        data = {'updated_at': datetime.utcnow().isoformat()}
+        if patch_format:
+            content = note.get('content') or ''
+            # Patching the preview of an unreadable blob would save the preview as the note
+            if not isinstance(content, str) or 'content' in (note.get('blobs') or {}):
+                raise PatchError("This note's text cannot be patched, save the whole note instead")
+            data['content'] = apply_patch(content, patch_format, patch)
+        if title is not None:
+            data['title'] = title
+        written = self.update_owned(note_id, user_id, data, expected_revision=base_revision)
+        if written.status == CONFLICT:
+            # Another save got in between the read and the write
+            latest = self.collection.find_one({'_id': ObjectId(note_id)}, {'revision': 1}) or {}
+            return OwnedResult(CONFLICT, {'revision': latest.get('revision', 0)})
+        if written.ok:
+            self._log_revision(written.document, user_id, base_revision, patch_format, patch, data)
+        return written
+
+    def _log_revision(self, note, user_id, base_revision, patch_format, patch, data):
+        """The patch itself, never the text: entries stay as small as the edits"""
+        revision = note.get('revision', base_revision + 1)
+        entry = {'note_id': note['_id'], 'user_id': user_id, 'revision': revision, 'base_revision': base_revision,
+                 'created_at': datetime.utcnow()}
+        if patch_format:
+            entry.update(format=patch_format, patch=patch, length=utf16_length(data['content']))
+        if 'title' in data:
+            entry['title'] = data['title']
+        # The note is already saved, a missing log entry only shortens the history
+        try:
+            self.revisions.insert_one(entry)
+            self.revisions.delete_many({'note_id': note['_id'], 'revision': {'$lte': revision - self.revision_log_limit}})
+        except Exception as e:
+            logger.warning("Error logging note revision", extra={"note_id": str(note['_id']), "error": str(e)})
+
+    def revision_log(self, note_id, limit=None):
+        """Logged patches of a note, oldest first"""
+        cursor = self.revisions.find({'note_id': ObjectId(note_id)}, {'_id': 0}).sort('revision', 1)
+        return list(cursor.limit(limit) if limit else cursor)
+
+    def delete_owned(self, note_id, user_id):
+        result = delete_owned(self.collection, note_id, user_id)
+        if result.ok:
+            self._after_delete(note_id, user_id)
+        return result
+
+    def _split_changes(self, note_id, user_id, data):
+        """$set fields, $unset fields and new blob documents for writing data to a note"""
+        changes, stubs, blobs = self.blobs.split(note_id, user_id, data)
+        for field, stub in stubs.items():
+            changes[f'blobs.{field}'] = stub
+        # A field that is small again lives inline, its stub has to go
+        unset = [f'blobs.{field}' for field in OFFLOADED_FIELDS if field in data and field not in stubs]
+        return changes, unset, blobs
+
+    def _settle_blobs(self, written, note_id, data, blobs):
+        """After an update: drop the blobs it replaced, or the new ones if nothing was written"""
+        if not written:
+            self.blobs.discard(blobs)
+            return
+        fields = [field for field in OFFLOADED_FIELDS if field in data]
+        self.blobs.prune([(note_id, fields)], keep=[blob['_id'] for blob in blobs])
+
+    def _full_text(self, note, data):
+        """The note as the search index has to see it: the written values, other offloaded fields loaded back"""
+        full = dict(note, **{field: data[field] for field in INDEXED_FIELDS if field in data})
+        full['blobs'] = {field: stub for field, stub in (note.get('blobs') or {}).items() if field not in data}
+        return self.blobs.hydrate(full)
+
+    def _after_update(self, note, data):
+        if any(field in data for field in INDEXED_FIELDS):
+            self._reindex(note['_id'], note.get('user_id'), self._full_text(note, data))
+        self._touch(note.get('user_id'))
+
+    def _after_delete(self, note_id, user_id):
+        try:
+            self.search_index.remove_note(note_id)
+            self.blobs.remove_notes([note_id])
+            self.revisions.delete_many({'note_id': ObjectId(note_id)})
+        except Exception as e:
+            logger.warning("Error cleaning up after note delete", extra={"note_id": str(note_id), "error": str(e)})
+        self._touch(user_id)
+
+    def list_version(self, user_id):
+        """(version, last write time) of a user's notes, bumped by every write"""
+        state = self.versions.find_one({'_id': user_id}) or {}
+        return state.get('version', 0), state.get('updated_at')
+
+    def _touch(self, user_id):
+        if user_id is None:
+            return
+        try:
+            self.versions.update_one(
+                {'_id': user_id},
+                {'$inc': {'version': 1}, '$set': {'updated_at': datetime.utcnow()}},
+                upsert=True
+            )
+        except Exception as e:
+            logger.warning("Error bumping note version", extra={"user_id": user_id, "error": str(e)})
+        note_list_cache.invalidate(user_id)
+
+    def bulk_apply(self, user_id, operations, ordered=True):
+        """
+            Run a batch of {"op": "create"|"update"|"delete", "id", "note"}
+            operations for one user: one query checks ownership of every
+            referenced note, one bulk_write runs them. Returns one result per
+            operation, in order: {"index", "op", "status", "note_id"/"message"}.
+            Ordered batches stop at the first failure, the rest are "skipped".
+        """
+        results = [None] * len(operations)
+        requested_ids = {}
+        for index, operation in enumerate(operations):
+            if isinstance(operation, dict) and operation.get('op') in ('update', 'delete'):
+                try:
+                    requested_ids[index] = ObjectId(operation.get('id'))
+                except (InvalidId, TypeError):
+                    pass
+
+        # Ownership (and the searchable fields, for reindexing) for the whole batch
+        projection = self._write_projection
+        existing = {
+            note['_id']: note
+            for note in self.collection.find({'_id': {'$in': list(set(requested_ids.values()))}}, projection)
+        } if requested_ids else {}
+
+        now = datetime.utcnow().isoformat()
+        writes = []     # pymongo requests
+        planned = []    # (operation index, kind, note id, document for reindexing, blobs it wrote)
+        blobs = []      # every new blob, saved before the bulk_write that points at them
+        for index, operation in enumerate(operations):
+            kind = operation.get('op') if isinstance(operation, dict) else None
+            failure = None
+            if kind == 'create':
+                note = operation.get('note')
+                if not isinstance(note, dict) or not str(note.get('title', '')).strip() \
+                        or not str(note.get('content', '')).strip():
+                    failure = (400, "Title and content are required")
+                else:
+                    document = dict({key: value for key, value in note.items() if key not in SERVER_FIELDS},
+                                    _id=ObjectId(), user_id=user_id, created_at=now, updated_at=now, revision=0)
+                    document.setdefault('format', 'text')
+                    document.setdefault('content_type', 'manual')
+                    stored, stubs, note_blobs = self.blobs.split(document['_id'], user_id, document)
+                    if stubs:
+                        stored['blobs'] = stubs
+                    writes.append(InsertOne(stored))
+                    blobs.extend(note_blobs)
+                    planned.append((index, kind, document['_id'], document, note_blobs))
+            elif kind in ('update', 'delete'):
+                note_id = requested_ids.get(index)
+                current = existing.get(note_id)
+                if note_id is None:
+                    failure = (400, "Invalid note id")
+                elif current is None:
+                    failure = (404, "Note not found")
+                elif current.get('user_id') != user_id:
+                    failure = (403, "Unauthorized access")
+                elif kind == 'delete':
+                    writes.append(DeleteOne({'_id': note_id, 'user_id': user_id}))
+                    planned.append((index, kind, note_id, None, []))
+                else:
+                    changes = operation.get('note')
+                    if not isinstance(changes, dict) or not changes:
+                        failure = (400, "No data provided")
+                    else:
+                        changes = {key: value for key, value in changes.items()
+                                   if key not in SERVER_FIELDS}
+                        changes['updated_at'] = now
+                        if 'content' in changes and 'format' not in changes:
+                            changes['format'] = 'text'
+                        stored, unset, note_blobs = self._split_changes(note_id, user_id, changes)
+                        update = {'$set': stored, '$inc': {'revision': 1}}
+                        if unset:
+                            update['$unset'] = {field: '' for field in unset}
+                        writes.append(UpdateOne({'_id': note_id, 'user_id': user_id}, update))
+                        blobs.extend(note_blobs)
+                        touches_text = any(field in changes for field in INDEXED_FIELDS)
+                        planned.append((index, kind, note_id, (current, changes) if touches_text else None,
+                                        note_blobs))
+            else:
+                failure = (400, "op must be create, update or delete")
+
+            if failure:
+                results[index] = {'index': index, 'op': kind, 'status': failure[0], 'message': failure[1]}
+                if ordered:
+                    break
+
+        failed_writes = {}
+        matched = removed = 0
+        self.blobs.save(blobs)
+        if writes:
+            try:
+                with stage_timer("db_bulk_write"):
+                    written = self.collection.bulk_write(writes, ordered=ordered)
+                matched, removed = written.matched_count, written.deleted_count
+            except BulkWriteError as error:
+                for write_error in error.details.get('writeErrors', []):
+                    failed_writes[write_error['index']] = write_error.get('errmsg', 'Write failed')
+                matched, removed = error.details.get('nMatched', 0), error.details.get('nRemoved', 0)
+
+        first_failure = min(failed_writes) if failed_writes else None
+        applied = [(position, kind, note_id) for position, (_, kind, note_id, _, _) in enumerate(planned)
+                   if position not in failed_writes
+                   and not (ordered and first_failure is not None and position > first_failure)]
+        missing = self._unmatched(user_id, applied, matched, removed)
+
+        deleted = []
+        unused_blobs, replaced_blobs = [], []
+        for position, (index, kind, note_id, document, note_blobs) in enumerate(planned):
+            if position in failed_writes or (ordered and first_failure is not None and position > first_failure):
+                unused_blobs.extend(note_blobs)
+                if position in failed_writes:
+                    results[index] = {'index': index, 'op': kind, 'status': 500, 'message': failed_writes[position]}
+                continue
+            if position in missing:
+                unused_blobs.extend(note_blobs)
+                results[index] = {'index': index, 'op': kind, 'status': 404, 'message': "Note not found"}
+                continue
+            results[index] = {'index': index, 'op': kind, 'status': 201 if kind == 'create' else 200,
+                              'note_id': str(note_id)}
+            if kind == 'delete':
+                deleted.append(note_id)
+                continue
+            if kind == 'update':
+                changes = operations[index]['note']
+                replaced_blobs.append((note_id, [field for field in OFFLOADED_FIELDS if field in changes]))
+                if document is not None:
+                    document = self._full_text(*document)
+            if document is not None:
+                self._reindex(note_id, user_id, document, new=kind == 'create')
+        self.blobs.discard(unused_blobs)
+        self.blobs.prune(replaced_blobs, keep=[blob['_id'] for blob in blobs])
+        if deleted:
+            try:
+                self.search_index.remove_notes(deleted)
+                self.blobs.remove_notes(deleted)
+                self.revisions.delete_many({'note_id': {'$in': deleted}})
+            except Exception as e:
+                logger.warning("Error cleaning up deleted notes", extra={"count": len(deleted), "error": str(e)})
+        if any(result is not None and result['status'] < 300 for result in results):
+            self._touch(user_id)
+
+        for index, result in enumerate(results):
+            if result is None:
+                operation = operations[index]
+                results[index] = {'index': index, 'op': operation.get('op') if isinstance(operation, dict) else None,
+                                  'status': 424, 'message': "Skipped after an earlier failure"}
+        return results
+
+    def _unmatched(self, user_id, applied, matched, removed):
+        """
+            Positions of the updates and deletes bulk_write ran that found no
+            note: deleted since the ownership check (another request, or an
+            earlier delete in the same batch). Only looked into when the
+            matched or deleted counts come up short.
+        """
+        updates = [(position, note_id) for position, kind, note_id in applied if kind == 'update']
+        deletes = [(position, note_id) for position, kind, note_id in applied if kind == 'delete']
+        missing = set()
+        if matched < len(updates):
+            present = {note['_id'] for note in self.collection.find(
+                {'_id': {'$in': list({note_id for _, note_id in updates})}, 'user_id': user_id}, {'_id': 1})}
+            missing.update(position for position, note_id in updates if note_id not in present)
+        if removed < len(deletes):
+            if removed == 0:
+                missing.update(position for position, _ in deletes)
+            else:
+                # A note deleted twice in one batch: the first delete took it
+                seen = set()
+                for position, note_id in deletes:
+                    if note_id in seen:
+                        missing.add(position)
+                    seen.add(note_id)
+                if removed != len(seen):
+                    # The counts cannot say which of the others lost a race, those stay reported as deleted
+                    logger.warning("Bulk delete removed fewer notes than requested",
+                                   extra={"requested": len(seen), "removed": removed})
+        return missing
+
+    def _reindex(self, note_id, user_id, note, new=False):
+        # A stale search entry is better than a failed save
+        try:
+            self.search_index.index_note(note_id, user_id, note, new=new)
+        except Exception as e:
+            logger.warning("Error indexing note for search", extra={"note_id": str(note_id), "error": str(e)})
+
+    def search_notes(self, user_id, query, limit=20, offset=0, projection=None):
+        """
+            Ranked full-text search over a user's notes.
+            Returns (notes in rank order, each with score and snippet, total matches).
+        """
+        ranked, total = self.search_index.search(user_id, query, limit=limit, offset=offset)
+        if not ranked:
+            return [], total
+        if projection is not None:
+            projection = dict(projection, **{field: 1 for field in INDEXED_FIELDS})
+        found = {
+            note['_id']: note
+            for note in self.collection.find({'_id': {'$in': [note_id for note_id, _ in ranked]},
+                                              'user_id': user_id}, projection)
+        }
+        terms = tokenize(query)
+        results = []
+        for note_id, score in ranked:
+            note = found.get(note_id)
+            if note is None:
+                continue
+            note['score'] = round(score, 4)
+            note['snippet'] = make_snippet(note, terms)
+            results.append(note)
+        return results, total
 
     def get_all_notes(self):
         return list(self.collection.find())
@@ -55,12 +485,24 @@ class NoteModel:
     def read_all_notes(self):
         return self.get_all_notes()
     
-    def get_notes_by_user(self, user_id):
-        """Get all notes belonging to a specific user"""
+    def get_notes_by_user(self, user_id, limit=None, after=None, projection=None):
+        """
+            Yield a user's notes, newest first, straight from the cursor.
+            limit/after give keyset pagination (after is a cursor token from
+            app.utils.pagination), projection lets list views skip big fields.
+        """
+        query = {"user_id": user_id}
+        if after:
+            query.update(keyset_filter(after))
+        if projection is not None:
+            # The next cursor is built from created_at, so it must come back
+            projection = dict(projection, created_at=1)
         try:
-            # FIX: Use self.collection instead of self.db.notes
-            notes = list(self.collection.find({"user_id": user_id}))
-            return notes
-        except Exception as e:
-            print(f"Error getting notes by user: {e}")
-            return []
\ No newline at end of file
+            cursor = self.collection.find(query, projection).sort([("created_at", -1), ("_id", -1)])
+            if limit:
+                cursor = cursor.limit(limit)
+            for note in cursor:
+                yield note
+        except Exception:
+            logger.exception("Error getting notes by user", extra={"user_id": user_id})
+            return
@@ -1,26 +1,49 @@
-from flask_pymongo import PyMongo # type: ignore
 from bson.objectid import ObjectId  # type: ignore
+from datetime import date, timedelta
+from app.db.db_setup import get_collection
+from app.db.query_helper import find_owned, update_owned, delete_owned
 
 """
     This is a class that implements the Todo Model, it focuses on creating,
     reading, updating and deleting todos.
     This would be then be used in the routes directory where it would be called.
+    Todos belong to a user (user_id), and every per-user query below is
+    served by one of the todos indexes in app/db/indexes.py.
 """
+
+# Stored next to priority so "most urgent first" is an index sort, not a string sort
+PRIORITY_RANKS = {"urgent": 0, "high": 1, "normal": 2, "low": 3}
+
+# ?sort= values and the index-friendly sort each one maps to
+SORTS = {
+    "due_date": [("due_date", 1), ("_id", 1)],
+    "-due_date": [("due_date", -1), ("_id", -1)],
+    "priority": [("priority_rank", 1), ("due_date", 1), ("_id", 1)],
+    "-created_at": [("created_at", -1), ("_id", -1)],
+}
+DEFAULT_SORT = "due_date"
+
+
+def priority_rank(priority):
+    return PRIORITY_RANKS.get(str(priority).lower(), len(PRIORITY_RANKS))
+
+
 class TodoModel:
     def __init__(self, app):
-        self.mongo = PyMongo(app)
-        self.db = self.mongo.db
-        self.collection = self.db.todos
+        self.collection = get_collection(app, "todos")
 
     def create_todo(self, data):
         required_fields = ["title", "description", "due_date", "priority", "status"]
         for field in required_fields:
             if field not in data or not data[field]:
                 return False
+        data["priority_rank"] = priority_rank(data["priority"])
         todo_id = self.collection.insert_one(data).inserted_id
-        return True if todo_id else False
+        return str(todo_id) if todo_id else False
 
-    def read_todo(self, todo_id):
+    def read_todo(self, todo_id, user_id=None):
+        if user_id is not None:
+            return self.read_owned(todo_id, user_id).document
         try:
             obj_id = ObjectId(todo_id)
         except Exception:
@@ -28,15 +51,21 @@ class TodoModel:
         todo = self.collection.find_one({"_id": obj_id})
         return todo
 
-    def update_todo(self, todo_id, data):
+    def update_todo(self, todo_id, data, user_id=None):
+        if user_id is not None:
+            return self.update_owned(todo_id, user_id, data).ok
         try:
             obj_id = ObjectId(todo_id)
         except Exception:
             return None
+        if "priority" in data:
+            data["priority_rank"] = priority_rank(data["priority"])
         result = self.collection.update_one({"_id": obj_id}, {"$set": data})
         return result.modified_count > 0
 
-    def delete_todo(self, todo_id):
+    def delete_todo(self, todo_id, user_id=None):
+        if user_id is not None:
+            return self.delete_owned(todo_id, user_id).ok
         try:
             obj_id = ObjectId(todo_id)
         except Exception:
@@ -44,5 +73,55 @@ class TodoModel:
         result = self.collection.delete_one({"_id": obj_id})
         return result.deleted_count > 0
 
+    # --- Ownership-scoped access, one round trip each (see app/db/query_helper.py) ---
+
+    def read_owned(self, todo_id, user_id):
+        return find_owned(self.collection, todo_id, user_id)
+
+    def update_owned(self, todo_id, user_id, data):
+        data = {key: value for key, value in data.items() if key not in ("_id", "user_id")}
+        if "priority" in data:
+            data["priority_rank"] = priority_rank(data["priority"])
+        return update_owned(self.collection, todo_id, user_id, data, projection={"_id": 1})
+
+    def delete_owned(self, todo_id, user_id):
+        return delete_owned(self.collection, todo_id, user_id)
+
     def get_all_todos(self):
-        return list(self.collection.find())
\ No newline at end of file
+        """Every user's todos, for maintenance scripts. Routes use get_todos_by_user"""
+        return list(self.collection.find())
+
+    def get_todos_by_user(self, user_id, status=None, priority=None, due_from=None, due_to=None,
+                          sort=DEFAULT_SORT, limit=None, offset=0):
+        """
+            Yield one user's todos, filtered and sorted in the database.
+            due_from/due_to are inclusive YYYY-MM-DD bounds on due_date.
+        """
+        query = {"user_id": user_id}
+        if status:
+            query["status"] = status
+        if priority:
+            query["priority_rank"] = priority_rank(priority)
+        if due_from or due_to:
+            query["due_date"] = {}
+            if due_from:
+                query["due_date"]["$gte"] = due_from
+            if due_to:
+                query["due_date"]["$lte"] = due_to
+
+        cursor = self.collection.find(query).sort(SORTS.get(sort, SORTS[DEFAULT_SORT]))
+        if offset:
+            cursor = cursor.skip(offset)
+        if limit:
+            cursor = cursor.limit(limit)
+        for todo in cursor:
+            yield todo
+
+    def get_agenda(self, user_id, days=7, today=None):
+        """Open todos due between today and today + days, soonest first"""
+        today = today or date.today()
+        return list(self.collection.find({
+            "user_id": user_id,
+            "due_date": {"$gte": today.isoformat(), "$lte": (today + timedelta(days=days)).isoformat()},
+            "status": {"$ne": "completed"},
+        }).sort([("due_date", 1), ("_id", 1)]))
@@ -1,18 +1,25 @@
-from flask_pymongo import PyMongo # type: ignore
-from flask_bcrypt import Bcrypt # type: ignore
+import logging
+from pymongo.errors import DuplicateKeyError # type: ignore
+from app.db.db_setup import get_collection
+from app.utils.password_hasher import password_hasher
+
+logger = logging.getLogger(__name__)
 
 class UserModel:
     def __init__(self, app):
-        self.mongo = PyMongo(app)
-        self.bcrypt = Bcrypt(app)
-        self.users = self.mongo.db.users
+        # Hashing goes through the shared, bounded hasher pool (may raise HasherBusy)
+        self.users = get_collection(app, "users")
 
     def create_user(self, username, password):
         if self.users.find_one({"username": username}):
             return False  # User already exists
-        hashing_pw = self.bcrypt.generate_password_hash(password).decode('utf-8')
+        hashing_pw = password_hasher.hash(password)
         user = {"username": username, "password": hashing_pw}
-        self.users.insert_one(user)
+        try:
+            self.users.insert_one(user)
+        except DuplicateKeyError:
+            # Registered by a concurrent request since the check above (username_unique index)
+            return False
         return True  # User created successfully
 
     def find_username(self, username):
@@ -20,6 +27,22 @@ class UserModel:
 
     def check_password(self, username, password):
         user = self.find_username(username)
-        if user and self.bcrypt.check_password_hash(user['password'], password):
+        if user and password_hasher.verify(password, user['password']):
+            self._upgrade_hash(user, password)
             return True
-        return False
\ No newline at end of file
+        return False
+
+    def _upgrade_hash(self, user, password):
+        """Re-hash at today's cost while the plain password is at hand"""
+        if not password_hasher.needs_rehash(user['password']):
+            return
+        try:
+            new_hash = password_hasher.hash(password)
+        except Exception as e:
+            # The login already succeeded, the upgrade can wait for the next one
+            logger.info("Password rehash skipped", extra={"error": str(e)})
+            return
+        # Only replaces the hash we verified, a concurrent password change wins
+        self.users.update_one({"_id": user["_id"], "password": user["password"]},
+                              {"$set": {"password": new_hash}})
+        password_hasher.stats["rehashed"] += 1
@@ -1,27 +1,42 @@
+import logging
 # initializing the UserModel from the model directory
 from app.models.user import UserModel
+from app.db.db_setup import get_collection
+from app.utils.revocation_cache import revocation_cache
+from app.utils.password_hasher import HasherBusy
 from flask import current_app, Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity, get_jwt, JWTManager # type: ignore
+from datetime import datetime
+from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity, get_jwt # type: ignore
 
 auth = Blueprint('auth', __name__)
+logger = logging.getLogger(__name__)
 
 # Helper functions for blacklisting
 
-def add_token_to_blacklist(jti):
-    mongo = current_app.extensions['pymongo']
-    mongo.db.blacklisted_tokens.insert_one({"jti": jti})
+def add_token_to_blacklist(jti, expires_at=None):
+    # expires_at lets the TTL index drop the row once the token is dead anyway
+    blacklist = get_collection(current_app._get_current_object(), "blacklisted_tokens")
+    blacklist.insert_one({"jti": jti, "revoked_at": datetime.utcnow(), "expires_at": expires_at})
+    # Visible to this worker at once, other workers pick it up on their next refresh
+    revocation_cache.add(jti)
 
 def is_token_blacklisted(jti):
     """Check if a JWT token is blacklisted"""
     try:
-        from app import mongo  # Import the mongo instance directly
-        blacklisted_token = mongo.db.blacklisted_tokens.find_one({"jti": jti})
-        return blacklisted_token is not None
+        blacklist = get_collection(current_app._get_current_object(), "blacklisted_tokens")
+        # Most tokens are not revoked, the cache answers those without a query
+        return revocation_cache.is_revoked(jti, blacklist)
     except Exception as e:
-        print(f"Error checking token blacklist: {e}")
+        logger.warning("Error checking token blacklist", extra={"error": str(e)})
         # If there's an error checking, assume token is valid to avoid blocking users
         return False
 
+def _busy():
+    # Every password hashing slot is taken, ask the client to come back shortly
+    response = jsonify({"message": "Too many sign-ins right now, please try again shortly"})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
 # --- Auth routes ---
 
 @auth.route('/Login', methods=['POST'])
@@ -29,8 +44,13 @@ def login():
     user_model = UserModel(current_app._get_current_object())
     username = request.json.get('username')
     password = request.json.get('password')
-    
-    if user_model.check_password(username, password):
+
+    try:
+        authenticated = user_model.check_password(username, password)
+    except HasherBusy:
+        return _busy()
+
+    if authenticated:
         access_token = create_access_token(identity=username)
         # 🔧 FIX: Return consistent format
         return jsonify({
@@ -51,7 +71,10 @@ def register():
     user_model = UserModel(current_app._get_current_object())
     username = request.json.get('username')
     password = request.json.get('password')
-    result = user_model.create_user(username, password)
+    try:
+        result = user_model.create_user(username, password)
+    except HasherBusy:
+        return _busy()
     if not result:
         return jsonify({"Message": "The user already exists"}), 409
     return jsonify({"Message": "User Created"}), 201
@@ -61,8 +84,9 @@ def register():
 @jwt_required()
 def logout():
     # Get the unique identifier for the JWT
-    jti = get_jwt()["jti"]
-    add_token_to_blacklist(jti)
+    token = get_jwt()
+    expires_at = datetime.utcfromtimestamp(token["exp"]) if "exp" in token else None
+    add_token_to_blacklist(token["jti"], expires_at)
     return jsonify({"Message": "User Logged Out"}), 200
 
 @auth.route('/protected', methods=['GET'])
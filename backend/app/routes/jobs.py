@@ -0,0 +1,22 @@
+from app.utils.job_queue import jobs, public_job
+from flask import Blueprint, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity # type: ignore
+
+job_routes = Blueprint('jobs', __name__)
+
+# Status of a background summarisation job, polled by the client after a 202
+@job_routes.route('/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+def get_job(job_id):
+    current_user = get_jwt_identity()
+    job = jobs.get(job_id)
+
+    # Someone else's job is reported as missing, not as forbidden
+    if not job or job.get('user_id') != current_user:
+        return jsonify({"message": "Job not found"}), 404
+
+    return jsonify(public_job(job)), 200
+
+@job_routes.route('/jobs/<job_id>', methods=['OPTIONS'])
+def job_options(job_id):
+    return '', 200
@@ -1,4 +1,11 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, current_app, Response
+from app.db.db_setup import pool_stats
+from app.utils.summary_cache import summary_cache
+from app.utils.note_cache import note_list_cache
+from app.utils.password_hasher import password_hasher
+from app.utils import metrics
+from app.utils.llm_client import llm_client
+from app.utils.readiness import readiness, READY
 
 main = Blueprint('main', __name__)
 
@@ -14,6 +21,50 @@ def home():
 def endpoints():
     return jsonify({
         "youtube_summariser": "/summariser/youtube (POST, JSON: {video_id})",
-        "pdf_summariser": "/summariser/pdf (POST, form-data: file)"
-        
-    })
\ No newline at end of file
+        "pdf_summariser": "/summariser/pdf (POST, form-data: file) -> 202 + job_id",
+        "audio_summariser": "/whisper/audio (POST, form-data: file) -> 202 + job_id",
+        "job_status": "/jobs/<job_id> (GET)",
+        "todo_agenda": "/todos/agenda?days=7 (GET)",
+        "note_search": "/notes/search?q=&limit=&after= (GET)",
+        "note_bulk": "/notes/bulk (POST, JSON: {ordered, operations: [{op, id, note}]})",
+        "note_patch": "/notes/<id> (PATCH, JSON: {base_revision, delta: {ops} | diff: [[offset, deleted, inserted]], title}) -> 409 if stale",
+        "db_pool_stats": "/db/pool (GET)",
+        "cache_stats": "/cache/stats (GET)",
+        "hasher_stats": "/auth/hasher (GET)",
+        "metrics": "/metrics (GET, Prometheus text format)",
+        "llm_stats": "/llm/stats (GET)",
+        "readiness": "/ready (GET, 503 until the worker is warm)"
+    })
+
+# Load balancer readiness: 503 until this worker has warmed its MongoDB pool
+@main.route('/ready')
+def ready():
+    # Already started under gunicorn; with the dev server the first call starts it
+    readiness.start(current_app._get_current_object())
+    state = readiness.snapshot()
+    return jsonify(state), 200 if state["status"] == READY else 503
+
+# MongoDB connection pool counters, used to size MONGO_MAX_POOL_SIZE
+@main.route('/db/pool')
+def db_pool():
+    return jsonify(pool_stats(current_app._get_current_object())), 200
+
+# Hit/miss counters for the AI summary cache and the notes list cache
+@main.route('/cache/stats')
+def cache_stats():
+    return jsonify({"summaries": summary_cache.snapshot(), "note_lists": note_list_cache.snapshot()}), 200
+
+# Password hashing pool: queue depth, busy rejections and the bcrypt cost in use
+@main.route('/auth/hasher')
+def hasher_stats():
+    return jsonify(password_hasher.snapshot()), 200
+
+# LLM calls in flight and waiting, and the circuit breaker state
+@main.route('/llm/stats')
+def llm_stats():
+    return jsonify(llm_client.snapshot()), 200
+
+# Request and per-stage latency histograms, for Prometheus to scrape
+@main.route('/metrics')
+def prometheus_metrics():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
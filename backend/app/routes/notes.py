@@ -1,10 +1,28 @@
+import logging
 from app.models.note import NoteModel
 from flask import current_app
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity # type: ignore
 from datetime import datetime
+from urllib.parse import urlencode
+from werkzeug.http import generate_etag
+from app.utils.note_cache import note_list_cache, list_etag
+from app.utils.json_provider import json_array_stream
+from app.db.query_helper import NOT_FOUND, FORBIDDEN, CONFLICT
+from app.utils.note_patch import PATCH_FORMATS, PatchError
+from app.utils.pagination import (
+    PaginationError, parse_limit, parse_fields, encode_cursor, decode_cursor,
+    encode_offset, decode_offset
+)
+
+# Largest batch POST /notes/bulk accepts in one request
+BULK_MAX_OPERATIONS = 1000
+
+# What a search hit carries unless ?fields= asks for something else
+SEARCH_RESULT_FIELDS = ('_id', 'title', 'created_at', 'updated_at', 'content_type')
 
 notes = Blueprint('notes', __name__)
+logger = logging.getLogger(__name__)
 
 @notes.route('/notes', methods=['OPTIONS'])
 def handle_notes_options():
@@ -40,9 +58,8 @@ def create_note():
         if 'content_type' not in data:
             data['content_type'] = 'manual'
         
-        print(f"Creating note for user: {current_user}")  # Debug log
-        print(f"Note data: {data}")  # Debug log
-        
+        logger.debug("Creating note", extra={"user_id": current_user, "content_chars": len(str(data.get('content', '')))})
+
         note_id = note_model.create_note(data)
         if note_id:
             return jsonify({
@@ -53,7 +70,7 @@ def create_note():
             return jsonify({"message": "Failed to create note"}), 500
             
     except Exception as e:
-        print(f"Error in create_note: {str(e)}")  # Debug log
+        logger.exception("Error in create_note")
         return jsonify({"message": f"Internal server error: {str(e)}"}), 500
 
 @notes.route('/notes', methods=['GET'])
@@ -62,84 +79,254 @@ def get_notes():
     try:
         current_user = get_jwt_identity()
         note_model = NoteModel(current_app._get_current_object())
-        
-        # 🔧 FIX: Add debug logging
-        print(f"📝 Getting notes for user: {current_user}")
-        
-        notes = note_model.get_notes_by_user(current_user)
-        
-        # Convert ObjectId to string for JSON serialization
-        for note in notes:
-            if '_id' in note:
-                note['_id'] = str(note['_id'])
-        
-        print(f"📝 Found {len(notes)} notes")
-        return jsonify(notes), 200
+
+        # ?limit=&after= for keyset pagination, ?fields=title,created_at to skip big fields
+        try:
+            limit = parse_limit(request.args.get('limit'))
+            after = request.args.get('after')
+            projection = parse_fields(request.args.get('fields'))
+            if after:
+                decode_cursor(after)
+        except PaginationError as e:
+            return jsonify({"message": str(e)}), 400
+
+        # The user's notes version is the list's validator: an unchanged list costs one small read
+        version, last_modified = note_model.list_version(current_user)
+        query_key = request.query_string.decode('utf-8')
+        etag = list_etag(current_user, version, last_modified, query_key)
+        if request.if_none_match.contains_weak(etag):
+            note_list_cache.not_modified()
+            return _revalidated(current_app.response_class(status=304), etag, last_modified)
+
+        cached = note_list_cache.get(current_user, query_key, version)
+        if cached:
+            body, headers = cached
+            response = current_app.response_class(body, mimetype='application/json')
+            response.headers.update(headers)
+            return _revalidated(response, etag, last_modified).make_conditional(request)
+
+        if not limit:
+            # The whole list: stream it off the cursor rather than build it in memory, caching it as it goes
+            response = json_array_stream(
+                note_model.get_notes_by_user(current_user, after=after, projection=projection),
+                through=lambda chunks: note_list_cache.record(current_user, query_key, version, chunks))
+            return _revalidated(response, etag, last_modified).make_conditional(request)
+
+        # One extra row tells us whether there is a next page
+        notes = []
+        next_cursor = None
+        for note in note_model.get_notes_by_user(current_user, limit=limit + 1, after=after,
+                                                 projection=projection):
+            if len(notes) == limit:
+                next_cursor = encode_cursor(notes[-1])
+                break
+            notes.append(note)
+
+        response = jsonify(notes)
+        if next_cursor:
+            response.headers['X-Next-Cursor'] = next_cursor
+            response.headers['Link'] = f'<{request.path}?{_next_page_query(next_cursor)}>; rel="next"'
+        note_list_cache.put(current_user, query_key, version, response.get_data(),
+                            {name: response.headers[name] for name in ('X-Next-Cursor', 'Link')
+                             if name in response.headers})
+        return _revalidated(response, etag, last_modified).make_conditional(request)
         
     except Exception as e:
-        print(f"❌ Error getting notes: {str(e)}")
+        logger.exception("Error getting notes")
         return jsonify({"message": f"Error getting notes: {str(e)}"}), 500
 
+@notes.route('/notes/bulk', methods=['POST'])
+@jwt_required()
+def bulk_notes():
+    """
+        Body: {"ordered": true, "operations": [{"op": "create", "note": {...}},
+        {"op": "update", "id": ..., "note": {...}}, {"op": "delete", "id": ...}]}
+        Answers 200 with one result per operation, even if some of them failed.
+    """
+    try:
+        current_user = get_jwt_identity()
+        note_model = NoteModel(current_app._get_current_object())
+        data = request.get_json(silent=True)
+
+        if not data or not isinstance(data.get('operations'), list) or not data['operations']:
+            return jsonify({"message": "operations must be a non-empty list"}), 400
+        if len(data['operations']) > BULK_MAX_OPERATIONS:
+            return jsonify({"message": f"At most {BULK_MAX_OPERATIONS} operations per request"}), 413
+
+        results = note_model.bulk_apply(current_user, data['operations'], ordered=bool(data.get('ordered', True)))
+        succeeded = sum(1 for result in results if result['status'] < 300)
+        return jsonify({
+            "results": results,
+            "succeeded": succeeded,
+            "failed": len(results) - succeeded
+        }), 200
+
+    except Exception as e:
+        logger.exception("Error in bulk note operation")
+        return jsonify({"message": f"Internal server error: {str(e)}"}), 500
+
+@notes.route('/notes/bulk', methods=['OPTIONS'])
+def handle_bulk_options():
+    return '', 200
+
+@notes.route('/notes/search', methods=['GET'])
+@jwt_required()
+def search_notes():
+    try:
+        current_user = get_jwt_identity()
+        note_model = NoteModel(current_app._get_current_object())
+
+        query = (request.args.get('q') or '').strip()
+        if not query:
+            return jsonify({"message": "Search query is required"}), 400
+        try:
+            limit = parse_limit(request.args.get('limit'), default=20)
+            after = request.args.get('after')
+            offset = decode_offset(after) if after else 0
+            projection = parse_fields(request.args.get('fields'))
+        except PaginationError as e:
+            return jsonify({"message": str(e)}), 400
+
+        results, total = note_model.search_notes(current_user, query, limit=limit, offset=offset,
+                                                 projection=projection)
+        returned_fields = tuple(projection) if projection else SEARCH_RESULT_FIELDS
+        hits = []
+        for note in results:
+            hit = {field: note[field] for field in returned_fields if field in note}
+            hit['_id'] = note['_id']
+            hit['score'] = note['score']
+            hit['snippet'] = note['snippet']
+            hits.append(hit)
+
+        response = jsonify(hits)
+        response.headers['X-Total-Count'] = str(total)
+        if offset + limit < total:
+            next_cursor = encode_offset(offset + limit)
+            response.headers['X-Next-Cursor'] = next_cursor
+            response.headers['Link'] = f'<{request.path}?{_next_page_query(next_cursor)}>; rel="next"'
+        return response, 200
+
+    except Exception as e:
+        logger.exception("Error searching notes")
+        return jsonify({"message": f"Error searching notes: {str(e)}"}), 500
+
+@notes.route('/notes/search', methods=['OPTIONS'])
+def handle_search_options():
+    return '', 200
+
+def _revalidated(response, etag, last_modified):
+    """
+        Validators plus no-cache, so clients always ask (cheaply) before reusing
+        a copy. The ETag is weak: it is taken before compress_response picks a
+        Content-Encoding, and the gzip, brotli and identity bodies share it.
+    """
+    response.set_etag(etag, weak=True)
+    if last_modified:
+        response.last_modified = last_modified
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+def _note_last_modified(note):
+    try:
+        return datetime.fromisoformat(note.get('updated_at') or note.get('created_at'))
+    except (TypeError, ValueError):
+        return None
+
+def _next_page_query(next_cursor):
+    args = request.args.to_dict()
+    args['after'] = next_cursor
+    return urlencode(args)
+
+# Error body and status for a failed ownership-scoped lookup or write
+OWNED_ERRORS = {
+    NOT_FOUND: ({"message": "Note not found"}, 404),
+    FORBIDDEN: ({"message": "Unauthorized access"}, 403),
+}
+
+def _owned_error(result):
+    body, status = OWNED_ERRORS[result.status]
+    return jsonify(body), status
+
 @notes.route('/notes/<note_id>', methods=['GET'])
 @jwt_required()
 def get_note_by_id(note_id):
     current_user = get_jwt_identity()
     note_model = NoteModel(current_app._get_current_object())
-    note = note_model.read_note(note_id)
-    
-    if not note:
-        return jsonify({"message": "Note not found"}), 404
-    
-    # Check if user owns this note
-    if note.get('user_id') != current_user:
-        return jsonify({"message": "Unauthorized access"}), 403
-    
-    note['_id'] = str(note['_id'])
-    return jsonify(note), 200
+
+    # Existence and ownership in the same query
+    result = note_model.read_owned(note_id, current_user)
+    if not result.ok:
+        return _owned_error(result)
+    note = result.document
+
+    response = jsonify(note)
+    # Hash of the uncompressed body, so an unchanged note answers 304
+    return _revalidated(response, generate_etag(response.get_data()),
+                        _note_last_modified(note)).make_conditional(request)
     
 @notes.route('/notes/<note_id>', methods=['PUT'])
 @jwt_required()
 def update_note(note_id):
     current_user = get_jwt_identity()
     note_model = NoteModel(current_app._get_current_object())
-    
-    # First check if note exists and user owns it
-    existing_note = note_model.read_note(note_id)
-    if not existing_note:
-        return jsonify({"message": "Note not found"}), 404
-    
-    if existing_note.get('user_id') != current_user:
-        return jsonify({"message": "Unauthorized access"}), 403
-    
+
     data = request.json
+    if not data:
+        return jsonify({"message": "No data provided"}), 400
     data['updated_at'] = datetime.utcnow().isoformat()
-    
-    # Ensure content format is preserved
-    if 'content' in data and 'format' not in data:
-        data['format'] = 'text'
-    
-    updated_note = note_model.update_note(note_id, data)
-    if updated_note:
-        return jsonify({"message": "Note updated successfully"}), 200
-    else:
-        return jsonify({"message": "Update failed"}), 400
+
+    # One atomic find_one_and_update, scoped to the caller's note
+    result = note_model.update_owned(note_id, current_user, data)
+    if result.ok:
+        return jsonify({"message": "Note updated successfully", "revision": result.document.get('revision')}), 200
+    return _owned_error(result)
+
+@notes.route('/notes/<note_id>', methods=['PATCH'])
+@jwt_required()
+def patch_note(note_id):
+    """
+        Autosave: only the change, made against the revision the editor last saw.
+        {"base_revision": n, "delta": {"ops": [...]}} or {"base_revision": n, "diff": [[offset, deleted, "inserted"]]},
+        optionally with "title". 409 with the current revision when the note moved on.
+    """
+    current_user = get_jwt_identity()
+    note_model = NoteModel(current_app._get_current_object())
+
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"message": "No data provided"}), 400
+    base_revision = data.get('base_revision')
+    if not isinstance(base_revision, int) or isinstance(base_revision, bool) or base_revision < 0:
+        return jsonify({"message": "base_revision must be the note's revision number"}), 400
+    patch_formats = [patch_format for patch_format in PATCH_FORMATS if patch_format in data]
+    if len(patch_formats) > 1:
+        return jsonify({"message": "Send either delta or diff, not both"}), 400
+    title = data.get('title')
+    if title is not None and (not isinstance(title, str) or not title.strip()):
+        return jsonify({"message": "Title cannot be empty"}), 400
+    if not patch_formats and title is None:
+        return jsonify({"message": "No changes provided"}), 400
+
+    patch_format = patch_formats[0] if patch_formats else None
+    try:
+        result = note_model.patch_owned(note_id, current_user, base_revision, patch_format,
+                                        data.get(patch_format), title=title)
+    except PatchError as error:
+        return jsonify({"message": str(error)}), 400
+    if result.status == CONFLICT:
+        return jsonify({"message": "Note was changed since that revision", **result.document}), 409
+    if not result.ok:
+        return _owned_error(result)
+    return jsonify({"message": "Note updated successfully", "revision": result.document.get('revision')}), 200
 
 @notes.route('/notes/<note_id>', methods=['DELETE'])
 @jwt_required()
 def delete_note(note_id):
     current_user = get_jwt_identity()
     note_model = NoteModel(current_app._get_current_object())
-    
-    # First check if note exists and user owns it
-    existing_note = note_model.read_note(note_id)
-    if not existing_note:
-        return jsonify({"message": "Note not found"}), 404
-    
-    if existing_note.get('user_id') != current_user:
-        return jsonify({"message": "Unauthorized access"}), 403
-    
-    deleted_note = note_model.delete_note(note_id)
-    if deleted_note:
+
+    result = note_model.delete_owned(note_id, current_user)
+    if result.ok:
         return jsonify({"message": "Note deleted successfully"}), 200
-    else:
-        return jsonify({"message": "Delete failed"}), 400
\ No newline at end of file
+    return _owned_error(result)
@@ -1,53 +1,136 @@
-from app.models.todo import TodoModel
+from app.models.todo import TodoModel, SORTS, DEFAULT_SORT, PRIORITY_RANKS
 from flask import current_app
 from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity # type: ignore
+from datetime import date, datetime
+from urllib.parse import urlencode
+from app.utils.pagination import PaginationError, parse_limit, encode_offset, decode_offset
+from app.utils.json_provider import json_array_stream
 
 todos = Blueprint('todos', __name__)
 
+# Longest agenda window, in days
+MAX_AGENDA_DAYS = 366
+
+def _parse_day(value, name):
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value).isoformat()
+    except ValueError:
+        raise PaginationError(f"{name} must be a date like 2025-12-31")
+
 @todos.route('/todos', methods=['POST'])
+@jwt_required()
 def create_todo():
     todo_model = TodoModel(current_app._get_current_object())
     data = request.json
+    if not data:
+        return jsonify({"message": "Invalid data"}), 400
+    data['user_id'] = get_jwt_identity()
+    data['created_at'] = datetime.utcnow().isoformat()
     todo_id = todo_model.create_todo(data)
     if todo_id:
         return jsonify({"todo_id": todo_id}), 201
     else:
         return jsonify({"message": "Invalid data"}), 400
-    
+
 @todos.route('/todos', methods=['GET'])
+@jwt_required()
 def get_all_todos():
+    """
+        The caller's todos. Optional filters: ?status=, ?priority=,
+        ?due_from=&due_to= (YYYY-MM-DD, inclusive), ?sort= (due_date,
+        -due_date, priority, -created_at) and ?limit=&after= paging.
+    """
+    todo_model = TodoModel(current_app._get_current_object())
+    try:
+        sort = request.args.get('sort') or DEFAULT_SORT
+        if sort not in SORTS:
+            raise PaginationError(f"sort must be one of: {', '.join(SORTS)}")
+        priority = request.args.get('priority') or None
+        if priority is not None and priority.lower() not in PRIORITY_RANKS:
+            raise PaginationError(f"priority must be one of: {', '.join(PRIORITY_RANKS)}")
+        limit = parse_limit(request.args.get('limit'))
+        after = request.args.get('after')
+        offset = decode_offset(after) if after else 0
+        due_from = _parse_day(request.args.get('due_from'), 'due_from')
+        due_to = _parse_day(request.args.get('due_to'), 'due_to')
+    except PaginationError as e:
+        return jsonify({"message": str(e)}), 400
+
+    # One extra row tells us whether there is a next page
+    todos = todo_model.get_todos_by_user(
+        get_jwt_identity(),
+        status=request.args.get('status'),
+        priority=priority,
+        due_from=due_from,
+        due_to=due_to,
+        sort=sort,
+        limit=limit + 1 if limit else None,
+        offset=offset
+    )
+    if not limit:
+        return json_array_stream(todos), 200
+
+    todos = list(todos)
+    has_more = len(todos) > limit
+    todos = todos[:limit]
+
+    response = jsonify(todos)
+    if has_more:
+        args = request.args.to_dict()
+        args['after'] = encode_offset(offset + limit)
+        response.headers['X-Next-Cursor'] = args['after']
+        response.headers['Link'] = f'<{request.path}?{urlencode(args)}>; rel="next"'
+    return response, 200
+
+@todos.route('/todos/agenda', methods=['GET'])
+@jwt_required()
+def get_agenda():
+    """Open todos due in the next ?days= days (default 7), soonest first"""
+    try:
+        days = int(request.args.get('days', 7))
+    except ValueError:
+        return jsonify({"message": "days must be a number"}), 400
+    if days < 0 or days > MAX_AGENDA_DAYS:
+        return jsonify({"message": f"days must be between 0 and {MAX_AGENDA_DAYS}"}), 400
+
     todo_model = TodoModel(current_app._get_current_object())
-    todos = todo_model.get_all_todos()
-    for todo in todos:
-        todo['_id'] = str(todo['_id'])
-    return jsonify(todos), 200
+    return jsonify(todo_model.get_agenda(get_jwt_identity(), days=days)), 200
 
 @todos.route('/todos/<todo_id>', methods=['GET'])
+@jwt_required()
 def get_todo_by_id(todo_id):
     todo_model = TodoModel(current_app._get_current_object())
-    todo = todo_model.read_todo(todo_id)
-    if todo:
-        todo['_id'] = str(todo['_id'])
-        return jsonify(todo), 200
+    # Someone else's todo is reported as missing, not as forbidden
+    result = todo_model.read_owned(todo_id, get_jwt_identity())
+    if result.ok:
+        return jsonify(result.document), 200
     else:
         return jsonify({"message": "Todo not found"}), 404
-    
+
 
 @todos.route('/todos/<todo_id>', methods=['PUT'])
+@jwt_required()
 def update_todo(todo_id):
     todo_model = TodoModel(current_app._get_current_object())
     data = request.json
-    updated = todo_model.update_todo(todo_id, data)
-    if updated:
+    if not data:
+        return jsonify({"message": "Invalid data"}), 400
+    # Ownership is part of the update filter, a todo cannot be handed to someone else
+    result = todo_model.update_owned(todo_id, get_jwt_identity(), data)
+    if result.ok:
         return jsonify({"message": "Todo updated successfully"}), 200
     else:
         return jsonify({"message": "Todo not found"}), 404
-    
+
 @todos.route('/todos/<todo_id>', methods=['DELETE'])
+@jwt_required()
 def delete_todo(todo_id):
     todo_model = TodoModel(current_app._get_current_object())
-    deleted = todo_model.delete_todo(todo_id)
-    if deleted:
+    result = todo_model.delete_owned(todo_id, get_jwt_identity())
+    if result.ok:
         return jsonify({"message": "Todo deleted successfully"}), 200
     else:
-        return jsonify({"message": "Todo not found"}), 404
\ No newline at end of file
+        return jsonify({"message": "Todo not found"}), 404
@@ -1,6 +1,8 @@
+import os
 from app import create_app
 
+# Development server only; production runs app.wsgi under gunicorn (see app/gunicorn.conf.py)
 app = create_app()
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    app.run(debug=os.getenv("FLASK_DEBUG", "true").lower() == "true")
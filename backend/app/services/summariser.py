@@ -1,122 +1,245 @@
 import os
+import logging
 from flask import Blueprint, request, jsonify, current_app
-from dotenv import load_dotenv # type: ignore
-import openai # type: ignore
-import PyPDF2 # type: ignore
-from app.utils.gpt_utils import gpt_summarise
+from app.utils.pdf_extract import iter_pages, parse_page_range, PageRangeError
+from app.utils.gpt_utils import summarise, summarise_stream, check_engine
+from app.utils.llm_client import LLMError
+from app.utils.sse import wants_stream, sse_event, sse_response
+from app.utils.job_queue import jobs, JobError, QueueFull
+from app.utils.uploads import receive_upload, UploadRejected, file_extension, discard_file
 from app.models.note import NoteModel
-import traceback
+from app.utils.metrics import stage_timer
 from flask_jwt_extended import jwt_required, get_jwt_identity # type: ignore
 from datetime import datetime
 
-load_dotenv()
 summarise_bp = Blueprint('summariser', __name__)
-openai.api_key = os.getenv("STUDIVIO_SECRET_KEY")
+logger = logging.getLogger(__name__)
 
 @summarise_bp.route('/summariser/pdf', methods=['POST'])
 @jwt_required()
 def summarise_pdf():
     try:
         current_user = get_jwt_identity()
-        
-        # Custom validation approach to avoid citations
-        uploaded_files = request.files
-        
+
+        # Stream the upload to disk, rejecting wrong types and oversize files mid-upload
+        max_allowed_size = 25 * 1024 * 1024  # 25MB
+        try:
+            pdf_file = receive_upload('file', max_allowed_size, ['pdf'])
+        except UploadRejected as rejected:
+            if rejected.reason == 'bad_type':
+                return jsonify({'error': 'Document must be in PDF format'}), 400
+            return jsonify({'error': 'Document size exceeds 25MB limit'}), 413
+
         # Check for file presence using custom logic
-        pdf_file = uploaded_files.get('file')
         if pdf_file is None:
             return jsonify({'error': 'Document upload required'}), 400
-            
+
         # Validate filename exists
         filename = getattr(pdf_file, 'filename', '')
         if not filename or filename.strip() == '':
             return jsonify({'error': 'Please choose a document to upload'}), 400
-            
+
         # Custom file type validation
-        file_extension = filename.lower().split('.')[-1] if '.' in filename else ''
-        if file_extension != 'pdf':
+        if file_extension(filename) != 'pdf':
             return jsonify({'error': 'Document must be in PDF format'}), 400
 
-        # Custom file size check
-        pdf_file.seek(0, 2)  # Seek to end
-        file_size = pdf_file.tell()
-        pdf_file.seek(0)  # Reset to beginning
-        
-        max_allowed_size = 25 * 1024 * 1024  # 25MB
-        if file_size > max_allowed_size:
-            return jsonify({'error': 'Document size exceeds 25MB limit'}), 400
+        upload = pdf_file.stream
+        file_size = upload.size
+
+        # Optional: only summarise part of the document, e.g. pages=1-20 or max_pages=50
+        try:
+            page_ranges = parse_page_range(request.form.get('pages'))
+            max_pages = int(request.form['max_pages']) if request.form.get('max_pages') else None
+            if max_pages is not None and max_pages < 1:
+                raise PageRangeError("max_pages must be at least 1")
+        except (PageRangeError, ValueError) as range_error:
+            message = str(range_error) if isinstance(range_error, PageRangeError) else 'max_pages must be a number'
+            return jsonify({'error': message}), 400
+
+        # Optional: engine=llm|extractive|auto (default), see summarise() in app/utils/gpt_utils.py
+        engine = request.form.get('engine') or 'auto'
+        engine_error = check_engine(engine)
+        if engine_error:
+            return jsonify({'error': engine_error}), 400
+
+        logger.info("Queueing document", extra={"source_file": filename, "bytes": file_size})
+
+        # The worker reads the upload after this request is gone, so it takes over the spool file
+        temp_path = upload.keep()
+        payload = {
+            'path': temp_path,
+            'filename': filename,
+            'file_size': file_size,
+            'sha256': upload.sha256,
+            'page_ranges': page_ranges,
+            'max_pages': max_pages,
+            'engine': engine
+        }
+
+        # Streaming mode: summarise in this request and send the text as it is written
+        if wants_stream():
+            # Removed when the response closes, even if the client leaves before the first event
+            return sse_response(stream_pdf_summary(current_user, payload), on_close=lambda: discard_file(temp_path))
 
-        print(f"📄 Processing document: {filename} ({file_size} bytes)")
-        
-        # Custom PDF text extraction
         try:
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
-            extracted_content = ""
-            
-            # Process each page individually
-            total_pages = len(pdf_reader.pages)
-            for page_index in range(total_pages):
-                current_page = pdf_reader.pages[page_index]
-                try:
-                    page_content = current_page.extract_text()
-                    if page_content and page_content.strip():
-                        extracted_content += f"{page_content}\n\n"
-                except Exception as extraction_error:
-                    print(f"⚠️ Page {page_index + 1} extraction issue: {extraction_error}")
+            job_id = jobs.submit('pdf_summary', current_user, payload)
+        except QueueFull:
+            os.remove(temp_path)
+            return jsonify({'error': 'Too many documents are being processed, please try again shortly'}), 503
+
+        response = jsonify({
+            'success': True,
+            'message': 'Document accepted for processing',
+            'job_id': job_id,
+            'status_url': f'/jobs/{job_id}',
+            'source_file': filename
+        })
+        response.headers['Location'] = f'/jobs/{job_id}'
+        return response, 202
+
+    except Exception as unexpected_error:
+        logger.exception("Unexpected error in PDF processing")
+        return jsonify({'error': f'Service error: {str(unexpected_error)}'}), 500
+
+def extract_pdf_text(pdf_source, page_ranges=None, max_pages=None):
+    """
+        Extract the text of every readable page, skipping pages that fail.
+        Returns the text and per-page timings for the job result.
+    """
+    page_texts = []
+    page_timings = []
+    try:
+        with stage_timer("pdf_extract"):
+            for page in iter_pages(pdf_source, page_ranges, max_pages,
+                                   workers=current_app.config.get("PDF_EXTRACT_WORKERS"),
+                                   parallel_min_pages=current_app.config.get("PDF_PARALLEL_MIN_PAGES", 16)):
+                page_timings.append(round(page.seconds, 4))
+                if page.error:
+                    logger.warning("Page extraction issue", extra={"page": page.index + 1, "error": str(page.error)})
                     continue
-            
-            # Validate extracted content
-            if not extracted_content.strip():
-                return jsonify({'error': 'Unable to extract readable text from document'}), 400
-                
-        except Exception as pdf_processing_error:
-            print(f"❌ Document processing failed: {pdf_processing_error}")
-            return jsonify({'error': 'Document appears to be corrupted or unreadable'}), 400
-        
+                if page.text.strip():
+                    page_texts.append(page.text)
+
+    except Exception as pdf_processing_error:
+        logger.warning("Document processing failed", extra={"error": str(pdf_processing_error)})
+        raise JobError('Document appears to be corrupted or unreadable')
+
+    # Validate extracted content
+    if not page_texts:
+        raise JobError('Unable to extract readable text from document')
+    return "\n\n".join(page_texts) + "\n\n", page_timings
+
+@jobs.handler('pdf_summary')
+def run_pdf_summary(job, report):
+    """Worker side of /summariser/pdf: extract, summarise, save the note"""
+    payload = job['payload']
+    filename = payload['filename']
+    try:
+        report('extracting', 10)
+        extracted_content, page_timings = extract_pdf_text(payload['path'], payload.get('page_ranges'),
+                                                           payload.get('max_pages'))
+
         # Generate AI summary
+        report('summarising', 40)
         try:
-            ai_summary = gpt_summarise(extracted_content, content_type="pdf")
-            if not ai_summary or ai_summary.startswith("Failed"):
-                return jsonify({'error': 'AI summary generation unsuccessful'}), 500
-        except Exception as ai_error:
-            print(f"❌ AI processing error: {ai_error}")
-            return jsonify({'error': 'Summary generation service unavailable'}), 500
-        
-        # Create note record
-        note_record = {
-            'title': f"Document Summary: {filename}",
+            ai_summary, engine = summarise(extracted_content, content_type="pdf", user_id=job['user_id'],
+                                           engine=payload.get('engine', 'auto'))
+        except LLMError as ai_error:
+            logger.error("AI processing error", extra={"error": str(ai_error), "kind": type(ai_error).__name__})
+            raise JobError(ai_error.public_message)
+        if not ai_summary:
+            raise JobError('AI summary generation unsuccessful')
+
+        report('saving', 90)
+        created_note_id = save_pdf_note(job['user_id'], payload, ai_summary, engine)
+        return {
+            'note_id': created_note_id,
             'content': ai_summary,
-            'content_type': 'pdf_summary',
-            'format': 'text',
-            'user_id': current_user,
-            'created_at': datetime.utcnow().isoformat(),
-            'updated_at': datetime.utcnow().isoformat(),
-            'source_document': filename,
-            'document_size': file_size
+            'engine': engine,
+            'source_file': filename,
+            'extraction': extraction_stats(page_timings)
         }
-        
-        # Save to database
-        note_service = NoteModel(current_app._get_current_object())
-        created_note_id = note_service.create_note(note_record)
-        
-        if created_note_id:
-            print(f"✅ Document summary saved: {created_note_id}")
-            return jsonify({
-                'success': True,
-                'message': 'Document successfully processed and saved as note',
-                'note_id': str(created_note_id),
-                'content': ai_summary,
-                'source_file': filename
-            }), 201
-        else:
-            return jsonify({'error': 'Note storage failed'}), 500
-            
-    except Exception as unexpected_error:
-        print(f"❌ Unexpected error in PDF processing: {unexpected_error}")
-        traceback.print_exc()
-        return jsonify({'error': f'Service error: {str(unexpected_error)}'}), 500
+    finally:
+        try:
+            os.remove(payload['path'])
+        except OSError:
+            pass
+
+def extraction_stats(page_timings):
+    return {
+        'pages': len(page_timings),
+        'seconds': round(sum(page_timings), 3),
+        'slowest_page_seconds': max(page_timings),
+        'page_seconds': page_timings
+    }
+
+def save_pdf_note(user_id, payload, ai_summary, engine):
+    """Store the finished summary as a note, returns its id"""
+    filename = payload['filename']
+    note_record = {
+        'title': f"Document Summary: {filename}",
+        'content': ai_summary,
+        'content_type': 'pdf_summary',
+        'format': 'text',
+        'user_id': user_id,
+        'created_at': datetime.utcnow().isoformat(),
+        'updated_at': datetime.utcnow().isoformat(),
+        'source_document': filename,
+        'document_size': payload['file_size'],
+        'source_sha256': payload.get('sha256'),
+        'summary_engine': engine
+    }
+
+    # Save to database
+    note_service = NoteModel(current_app._get_current_object())
+    created_note_id = note_service.create_note(note_record)
+    if not created_note_id:
+        raise JobError('Note storage failed')
+
+    logger.info("Document summary saved", extra={"note_id": str(created_note_id), "source_file": filename})
+    return str(created_note_id)
+
+def stream_pdf_summary(user_id, payload):
+    """
+        SSE version of run_pdf_summary: stage events, then the summary as
+        `token` events while it is generated, then `done` once the note is saved.
+        The upload is removed by the route (sse_response on_close), not here.
+    """
+    filename = payload['filename']
+    try:
+        yield sse_event('stage', {'stage': 'uploaded', 'source_file': filename})
+        extracted_content, page_timings = extract_pdf_text(payload['path'], payload.get('page_ranges'),
+                                                           payload.get('max_pages'))
+        yield sse_event('stage', {'stage': 'extracted', 'extraction': extraction_stats(page_timings)})
+
+        pieces, engine = [], None
+        try:
+            for kind, value in summarise_stream(extracted_content, content_type="pdf", user_id=user_id,
+                                                engine=payload.get('engine', 'auto')):
+                if kind == 'engine':
+                    engine = value
+                    yield sse_event('stage', {'stage': 'summarising', 'engine': engine})
+                    continue
+                pieces.append(value)
+                yield sse_event('token', {'text': value})
+        except LLMError as ai_error:
+            logger.error("AI processing error", extra={"error": str(ai_error), "kind": type(ai_error).__name__})
+            raise JobError(ai_error.public_message)
+        ai_summary = "".join(pieces)
+        if not ai_summary.strip():
+            raise JobError('AI summary generation unsuccessful')
+
+        yield sse_event('stage', {'stage': 'saving'})
+        created_note_id = save_pdf_note(user_id, payload, ai_summary, engine)
+        yield sse_event('done', {'note_id': created_note_id, 'content': ai_summary, 'engine': engine,
+                                 'source_file': filename})
+    except JobError as error:
+        yield sse_event('error', {'error': str(error)})
+    except Exception:
+        logger.exception("Streaming summary failed")
+        yield sse_event('error', {'error': 'Document processing failed'})
 
 # Add OPTIONS handler for CORS
 @summarise_bp.route('/summariser/pdf', methods=['OPTIONS'])
 def pdf_options():
-    return '', 200
\ No newline at end of file
+    return '', 200
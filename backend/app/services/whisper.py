@@ -1,131 +1,219 @@
 import os
+import logging
 from flask import Blueprint, request, jsonify, current_app
-from dotenv import load_dotenv # type: ignore
-import openai # type: ignore
-import assemblyai as aai # type: ignore
 from app.models.note import NoteModel
-from app.utils.gpt_utils import gpt_summarise
+from app.utils.gpt_utils import summarise, summarise_stream, check_engine
+from app.utils.llm_client import LLMError
+from app.utils.sse import wants_stream, sse_event, sse_response
+from app.utils.job_queue import jobs, JobError, QueueFull
+from app.utils.uploads import receive_upload, UploadRejected, file_extension, discard_file
 from flask_jwt_extended import jwt_required, get_jwt_identity # type: ignore
+from app.utils.metrics import stage_timer
+from app.utils.audio import prepared_segments
+from app.utils.transcription import transcriber_for, transcribe_segments, stitch, TranscriptionError
 from datetime import datetime
-import traceback
 
-load_dotenv()
 whisperer_bp = Blueprint('whisper', __name__)
-ASSEMBLY_API_KEY = os.getenv("ASSEMBLY_API_KEY")
-aai.settings.api_key = ASSEMBLY_API_KEY
-openai.api_key = os.getenv("STUDIVIO_SECRET_KEY")
+logger = logging.getLogger(__name__)
 
 @whisperer_bp.route('/whisper/audio', methods=['POST'])  # Fixed route
 @jwt_required()
 def whisper():
     try:
         current_user = get_jwt_identity()  # Added missing import
-        print("FILES RECEIVED:", request.files)
-        print("FORM RECEIVED:", request.form)
-        
-        # File validation
-        uploaded_files = request.files
-        audio_file = uploaded_files.get('file')
-        
+
+        # File validation, done while the upload streams to disk
+        allowed_extensions = ['mp3', 'wav', 'm4a', 'mp4', 'webm']
+        max_size = 50 * 1024 * 1024
+        try:
+            audio_file = receive_upload('file', max_size, allowed_extensions)
+        except UploadRejected as rejected:
+            if rejected.reason == 'bad_type':
+                return jsonify({'error': f'Audio format not supported. Use: {", ".join(allowed_extensions)}'}), 400
+            return jsonify({'error': 'Audio file size exceeds 50MB limit'}), 413
+
         if audio_file is None:
             return jsonify({'error': 'Audio file upload required'}), 400
-            
+
         filename = getattr(audio_file, 'filename', '')
         if not filename or filename.strip() == '':
             return jsonify({'error': 'Please choose an audio file to upload'}), 400
-            
-        # Audio file type validation
-        allowed_extensions = ['mp3', 'wav', 'm4a', 'mp4', 'webm']
-        file_extension = filename.lower().split('.')[-1] if '.' in filename else ''
 
-        if file_extension not in allowed_extensions:
+        # Audio file type validation
+        if file_extension(filename) not in allowed_extensions:
             return jsonify({'error': f'Audio format not supported. Use: {", ".join(allowed_extensions)}'}), 400
-            
-        # File size validation
-        audio_file.seek(0, 2)
-        file_size = audio_file.tell()
-        audio_file.seek(0)
-        max_size = 50 * 1024 * 1024 
-        if file_size > max_size:
-            return jsonify({'error': 'Audio file size exceeds 50MB limit'}), 400
-            
-        print(f"Processing audio: {filename} ({file_size} bytes)")
-
-        # Save file temporarily
-        temp_dir = os.path.join(os.getcwd(), "audio")
-        os.makedirs(temp_dir, exist_ok=True)
-        temp_path = os.path.join(temp_dir, filename)
-        print("Saving file...")
-        audio_file.save(temp_path)
-        print("File saved, starting transcription...")
-
-        # Transcription
-        try:
-            transcriber = aai.Transcriber()
-            transcript_result = transcriber.transcribe(temp_path)
-            if transcript_result.status == aai.TranscriptStatus.error:
-                return jsonify({'error': 'Audio transcription failed'}), 500
-            transcript = transcript_result.text
-            if not transcript or len(transcript.strip()) < 10:
-                return jsonify({'error': 'No clear speech detected in audio'}), 400
-        except Exception as transcription_error:
-            print(f"Transcription error: {transcription_error}")
-            return jsonify({'error': 'Audio transcription service unavailable'}), 500
-            
-        # Generate AI summary
-        try:
-            text_content = gpt_summarise(transcript, content_type="audio")
-            if not text_content or text_content.startswith("Failed"):
-                return jsonify({'error': 'AI summary generation unsuccessful'}), 500
-        except Exception as error:
-            print(f"AI processing error: {error}")
-            return jsonify({'error': 'Summary generation service unavailable'}), 500
-
-        # Create note record (fixed variable name)
-        note_data = {
-            'title': f"Voice Note: {filename}",
-            'content': text_content,  # Fixed variable name
-            'content_type': 'voice_transcription',
-            'format': 'text',
-            'user_id': current_user,
-            'created_at': datetime.utcnow().isoformat(),
-            'updated_at': datetime.utcnow().isoformat(),
-            'source_audio': filename,
-            'audio_size': file_size,
-            'transcript': transcript
+
+        # Optional: engine=llm|extractive|auto (default), see summarise() in app/utils/gpt_utils.py
+        engine = request.form.get('engine') or 'auto'
+        engine_error = check_engine(engine)
+        if engine_error:
+            return jsonify({'error': engine_error}), 400
+
+        upload = audio_file.stream
+        file_size = upload.size
+        logger.info("Queueing audio", extra={"source_file": filename, "bytes": file_size})
+
+        # The spool file already has a unique name, the worker takes it over and cleans it up
+        temp_path = upload.keep()
+        payload = {
+            'path': temp_path,
+            'filename': filename,
+            'file_size': file_size,
+            'sha256': upload.sha256,
+            'engine': engine
         }
-        
-        # Save to database (fixed variable name)
-        note_service = NoteModel(current_app._get_current_object())
-        created_note_id = note_service.create_note(note_data)  # Fixed: was note_record
 
-        # Clean up temp file
+        # Streaming mode: transcribe and summarise in this request, sending the text as it is written
+        if wants_stream():
+            # Removed when the response closes, even if the client leaves before the first event
+            return sse_response(stream_audio_summary(current_user, payload), on_close=lambda: discard_file(temp_path))
+
         try:
+            job_id = jobs.submit('audio_summary', current_user, payload)
+        except QueueFull:
             os.remove(temp_path)
-        except:
-            pass 
-            
-        if created_note_id:
-            print(f"✅ Voice note saved: {created_note_id}")
-            return jsonify({
-                'success': True,
-                'message': 'Audio successfully processed and saved as note',
-                'note_id': str(created_note_id),
-                'content': text_content,  # Fixed: was ai_summary
-                'source_file': filename
-            }), 201
-        else:
-            return jsonify({'error': 'Note storage failed'}), 500
-            
+            return jsonify({'error': 'Too many recordings are being processed, please try again shortly'}), 503
+
+        response = jsonify({
+            'success': True,
+            'message': 'Audio accepted for processing',
+            'job_id': job_id,
+            'status_url': f'/jobs/{job_id}',
+            'source_file': filename
+        })
+        response.headers['Location'] = f'/jobs/{job_id}'
+        return response, 202
+
     except Exception as unexpected_error:
-        print(f"Unexpected error in audio processing: {unexpected_error}")
-        traceback.print_exc()
+        logger.exception("Unexpected error in audio processing")
         return jsonify({'error': f'Service error: {str(unexpected_error)}'}), 500
 
-@whisperer_bp.route('/whisper/audio', methods=['OPTIONS'])
-def audio_options():
-    return '', 200
+def transcribe_audio(path, progress=None):
+    """
+        Transcribe the recording: prepared and cut into overlapping segments
+        (app/utils/audio.py), transcribed concurrently and stitched back into
+        one text (app/utils/transcription.py)
+    """
+    config = current_app.config
+    try:
+        with stage_timer("transcription"), prepared_segments(path, config) as segments:
+            texts = transcribe_segments(segments, transcriber_for(config),
+                                        concurrency=config.get("TRANSCRIBE_CONCURRENCY", 4),
+                                        retries=config.get("TRANSCRIBE_RETRIES", 1),
+                                        progress=progress)
+    except TranscriptionError as transcription_error:
+        logger.error("Transcription failed", extra={"error": str(transcription_error)})
+        raise JobError('Audio transcription failed')
+    except Exception as transcription_error:
+        logger.error("Transcription error", extra={"error": str(transcription_error)})
+        raise JobError('Audio transcription service unavailable')
+    logger.info("Audio transcribed", extra={"segments": len(segments)})
+    transcript = stitch(texts)
+    if not transcript or len(transcript.strip()) < 10:
+        raise JobError('No clear speech detected in audio')
+    return transcript
+
+@jobs.handler('audio_summary')
+def run_audio_summary(job, report):
+    """Worker side of /whisper/audio: transcribe, summarise, save the note"""
+    payload = job['payload']
+    filename = payload['filename']
+    try:
+        report('transcribing', 10)
+        transcript = transcribe_audio(payload['path'],
+                                      progress=lambda done, total: report('transcribing', 10 + 50 * done // total))
+
+        # Generate AI summary
+        report('summarising', 60)
+        try:
+            text_content, engine = summarise(transcript, content_type="audio", user_id=job['user_id'],
+                                             engine=payload.get('engine', 'auto'))
+        except LLMError as error:
+            logger.error("AI processing error", extra={"error": str(error), "kind": type(error).__name__})
+            raise JobError(error.public_message)
+        if not text_content:
+            raise JobError('AI summary generation unsuccessful')
 
+        report('saving', 90)
+        created_note_id = save_voice_note(job['user_id'], payload, text_content, transcript, engine)
+        return {
+            'note_id': created_note_id,
+            'content': text_content,  # Fixed: was ai_summary
+            'engine': engine,
+            'source_file': filename
+        }
+    finally:
+        # Clean up temp file
+        try:
+            os.remove(payload['path'])
+        except OSError:
+            pass
 
+def save_voice_note(user_id, payload, text_content, transcript, engine):
+    """Store the summary and transcript as a note, returns its id"""
+    filename = payload['filename']
+    note_data = {
+        'title': f"Voice Note: {filename}",
+        'content': text_content,  # Fixed variable name
+        'content_type': 'voice_transcription',
+        'format': 'text',
+        'user_id': user_id,
+        'created_at': datetime.utcnow().isoformat(),
+        'updated_at': datetime.utcnow().isoformat(),
+        'source_audio': filename,
+        'audio_size': payload['file_size'],
+        'source_sha256': payload.get('sha256'),
+        'transcript': transcript,
+        'summary_engine': engine
+    }
 
+    # Save to database (fixed variable name)
+    note_service = NoteModel(current_app._get_current_object())
+    created_note_id = note_service.create_note(note_data)  # Fixed: was note_record
+    if not created_note_id:
+        raise JobError('Note storage failed')
 
+    logger.info("Voice note saved", extra={"note_id": str(created_note_id), "source_file": filename})
+    return str(created_note_id)
+
+def stream_audio_summary(user_id, payload):
+    """
+        SSE version of run_audio_summary: stage events, summary `token` events,
+        then `done`. The upload is removed by the route (sse_response on_close).
+    """
+    filename = payload['filename']
+    try:
+        yield sse_event('stage', {'stage': 'uploaded', 'source_file': filename})
+        transcript = transcribe_audio(payload['path'])
+        yield sse_event('stage', {'stage': 'transcribed', 'transcript_chars': len(transcript)})
+
+        pieces, engine = [], None
+        try:
+            for kind, value in summarise_stream(transcript, content_type="audio", user_id=user_id,
+                                                engine=payload.get('engine', 'auto')):
+                if kind == 'engine':
+                    engine = value
+                    yield sse_event('stage', {'stage': 'summarising', 'engine': engine})
+                    continue
+                pieces.append(value)
+                yield sse_event('token', {'text': value})
+        except LLMError as error:
+            logger.error("AI processing error", extra={"error": str(error), "kind": type(error).__name__})
+            raise JobError(error.public_message)
+        text_content = "".join(pieces)
+        if not text_content.strip():
+            raise JobError('AI summary generation unsuccessful')
+
+        yield sse_event('stage', {'stage': 'saving'})
+        created_note_id = save_voice_note(user_id, payload, text_content, transcript, engine)
+        yield sse_event('done', {'note_id': created_note_id, 'content': text_content, 'engine': engine,
+                                 'source_file': filename})
+    except JobError as error:
+        yield sse_event('error', {'error': str(error)})
+    except Exception:
+        logger.exception("Streaming audio summary failed")
+        yield sse_event('error', {'error': 'Audio processing failed'})
+
+@whisperer_bp.route('/whisper/audio', methods=['OPTIONS'])
+def audio_options():
+    return '', 200
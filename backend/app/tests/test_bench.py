@@ -0,0 +1,39 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+import io
+import unittest
+import PyPDF2 # type: ignore
+from app.bench import datasets
+from app.bench.run import percentile, summarise_timings, compare
+
+class BenchHelpersTestCase(unittest.TestCase):
+    def test_percentiles(self):
+        values = [n / 1000.0 for n in range(1, 101)]
+        self.assertEqual(percentile(values, 0.50), 0.05)
+        self.assertEqual(percentile(values, 0.99), 0.099)
+        self.assertEqual(percentile([], 0.95), 0.0)
+
+        summary = summarise_timings(values, errors=2, wall_seconds=2.0)
+        self.assertEqual(summary['requests'], 100)
+        self.assertEqual(summary['throughput_rps'], 50.0)
+        self.assertEqual(summary['p95_ms'], 95.0)
+        self.assertEqual(summary['max_ms'], 100.0)
+
+    def test_compare_flags_regressions(self):
+        baseline = {'scenarios': {'notes.list': {'p95_ms': 10.0, 'throughput_rps': 100.0, 'errors': 0}}}
+        same = {'notes.list': {'p95_ms': 11.0, 'throughput_rps': 95.0, 'errors': 0}}
+        slower = {'notes.list': {'p95_ms': 20.0, 'throughput_rps': 50.0, 'errors': 1},
+                  'notes.new': {'p95_ms': 1.0, 'throughput_rps': 1.0, 'errors': 0}}
+        self.assertEqual(compare(same, baseline), [])
+        self.assertEqual(len(compare(slower, baseline)), 3)
+
+    def test_generated_pdf_is_readable(self):
+        reader = PyPDF2.PdfReader(io.BytesIO(datasets.make_pdf(pages=3)))
+        self.assertEqual(len(reader.pages), 3)
+        words = reader.pages[2].extract_text().split()
+        self.assertTrue(words and set(words) <= set(datasets.VOCABULARY))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+import threading
+import time
+import unittest
+import uuid
+from types import SimpleNamespace
+from unittest import mock
+from app import create_app
+from app.utils.chunking import count_tokens, split_into_chunks
+from app.utils.gpt_utils import gpt_summarise
+
+class ChunkingTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.app.config['SUMMARY_CHUNK_TOKENS'] = 200
+
+    def test_chunks_fit_budget_and_keep_paragraphs(self):
+        paragraphs = [f"Paragraph {i}. " + "Some sentence about biology. " * 20 for i in range(10)]
+        chunks = split_into_chunks("\n\n".join(paragraphs), 400)
+        self.assertGreater(len(chunks), 1)
+        for chunk in chunks:
+            self.assertLessEqual(count_tokens(chunk), 400)
+        self.assertTrue(all(chunk.startswith("Paragraph") for chunk in chunks))
+
+    def test_oversized_paragraph_is_split(self):
+        chunks = split_into_chunks("word " * 5000, 300)
+        self.assertTrue(all(count_tokens(chunk) <= 300 for chunk in chunks))
+        self.assertEqual(sum(len(chunk.split()) for chunk in chunks), 5000)
+
+    def test_long_text_is_map_reduced_concurrently(self):
+        active = []
+        peak = []
+        lock = threading.Lock()
+
+        def fake_completion(**kwargs):
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            time.sleep(0.05)
+            with lock:
+                active.pop()
+            message = SimpleNamespace(content=f"notes {uuid.uuid4().hex[:6]}")
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+        text = "\n\n".join(f"Page {i} {uuid.uuid4()} " + "content " * 80 for i in range(8))
+        with self.app.app_context(), mock.patch("openai.chat.completions.create",
+                                                side_effect=fake_completion) as create:
+            summary = gpt_summarise(text, content_type="pdf")
+        self.assertTrue(summary.startswith("notes"))
+        # Eight map calls plus one reduce
+        self.assertEqual(create.call_count, 9)
+        self.assertGreater(max(peak), 1)
+
+if __name__ == '__main__':
+    unittest.main()
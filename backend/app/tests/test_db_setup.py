@@ -0,0 +1,36 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+import unittest
+from flask import Flask
+from app import create_app
+from app.db.db_setup import get_db, pool_stats
+from app.models.note import NoteModel
+from app.models.user import UserModel
+
+class DbSetupTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+
+    def test_models_share_one_client(self):
+        note_model = NoteModel(self.app)
+        user_model = UserModel(self.app)
+        self.assertIs(note_model.collection.database.client, user_model.users.database.client)
+
+    def test_client_reused_across_apps(self):
+        other_app = Flask(__name__)
+        other_app.config["MONGO_URI"] = self.app.config["MONGO_URI"]
+        self.assertIs(get_db(other_app).client, get_db(self.app).client)
+
+    def test_pool_stats(self):
+        stats = pool_stats(self.app)
+        self.assertIn("maxPoolSize", stats["config"])
+        self.assertIn("in_use", stats["stats"])
+        response = self.client.get('/db/pool')
+        self.assertEqual(response.status_code, 200)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+import io
+import unittest
+import uuid
+from unittest import mock
+from app import create_app
+from app.utils import extractive
+from app.utils.extractive import split_sentences, rank_sentences, summarise_extractive
+from app.utils.gpt_utils import summarise, summarise_stream
+from app.utils.llm_client import LLMTimeout, LLMRequestError
+
+LECTURE = """
+Photosynthesis converts light energy into chemical energy inside plant cells.
+The light reactions of photosynthesis happen in the thylakoid membranes of the chloroplast.
+The Calvin cycle uses that chemical energy to fix carbon dioxide into sugars.
+Chlorophyll in the chloroplast absorbs mostly red and blue light for photosynthesis.
+The weather was pleasant on the day of the field trip.
+Plant cells store the sugars made by photosynthesis as starch.
+""" * 3
+
+@unittest.skipUnless(extractive.available(), "needs numpy")
+class ExtractiveSummaryTestCase(unittest.TestCase):
+    def test_split_sentences(self):
+        self.assertEqual(split_sentences("One two. Three four!\n\n- five six"), ["One two.", "Three four!", "- five six"])
+        # Text without punctuation falls back to its lines
+        lines = "\n".join(f"line {n} without any punctuation at all" for n in range(40))
+        self.assertEqual(len(split_sentences(lines)), 40)
+
+    def test_central_sentences_rank_first(self):
+        sentences = split_sentences(LECTURE)[:6]
+        ranking = rank_sentences(sentences)
+        self.assertEqual(sorted(ranking), list(range(6)))
+        self.assertEqual(ranking[-1], 4)    # the off-topic sentence
+
+    def test_summary_is_bullets_in_document_order(self):
+        summary = summarise_extractive(LECTURE, content_type="pdf", max_sentences=3)
+        heading, *bullets = summary.split("\n")
+        self.assertEqual(heading, "## Key Points")
+        self.assertEqual(len(bullets), 3)
+        positions = [LECTURE.index(bullet[2:]) for bullet in bullets]
+        self.assertEqual(positions, sorted(positions))
+        self.assertNotIn("weather", summary)
+        self.assertEqual(len(set(bullets)), 3)
+
+    def test_nothing_usable(self):
+        self.assertEqual(summarise_extractive("Too short."), "")
+
+@unittest.skipUnless(extractive.available(), "needs numpy")
+class SummaryEngineTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.app.config['SUMMARY_LOCAL_MAX_TOKENS'] = 50
+        self.text = LECTURE + f"\nLecture reference {uuid.uuid4().hex} covers photosynthesis in depth today."
+
+    def test_short_text_stays_local(self):
+        with self.app.app_context(), \
+             mock.patch("openai.chat.completions.create") as create:
+            self.app.config['SUMMARY_LOCAL_MAX_TOKENS'] = 1000
+            summary, engine = summarise(self.text, content_type="pdf")
+        self.assertEqual(engine, "extractive")
+        self.assertTrue(summary.startswith("## Key Points"))
+        create.assert_not_called()
+
+    def test_llm_timeout_falls_back(self):
+        with self.app.app_context(), \
+             mock.patch("app.utils.gpt_utils.gpt_summarise", side_effect=LLMTimeout("slow")):
+            summary, engine = summarise(self.text, content_type="pdf")
+            self.assertEqual(engine, "extractive")
+            self.assertIn("photosynthesis", summary.lower())
+
+            # Asking for the LLM explicitly, or an error a local summary cannot fix, is raised
+            with self.assertRaises(LLMTimeout):
+                summarise(self.text, content_type="pdf", engine="llm")
+        with self.app.app_context(), \
+             mock.patch("app.utils.gpt_utils.gpt_summarise", side_effect=LLMRequestError("bad")):
+            with self.assertRaises(LLMRequestError):
+                summarise(self.text, content_type="pdf")
+
+    def test_stream_falls_back_before_first_piece(self):
+        def failing_stream(*args, **kwargs):
+            raise LLMTimeout("slow")
+            yield
+
+        with self.app.app_context(), mock.patch("app.utils.gpt_utils.gpt_summarise_stream", failing_stream):
+            events = list(summarise_stream(self.text, content_type="audio"))
+        self.assertEqual([kind for kind, _ in events], ["engine", "engine", "text"])
+        self.assertEqual(events[1], ("engine", "extractive"))
+        self.assertTrue(events[2][1].startswith("## Key Points from the Recording"))
+
+    def test_route_engine_field(self):
+        client = self.app.test_client()
+        username = f"engine-{uuid.uuid4().hex[:8]}"
+        client.post('/Register', json={'username': username, 'password': 'testpass'})
+        token = client.post('/Login', json={'username': username, 'password': 'testpass'}).json['access_token']
+        response = client.post('/summariser/pdf', headers={'Authorization': f"Bearer {token}"},
+                               data={'file': (io.BytesIO(b'%PDF-1.4'), 'doc.pdf'), 'engine': 'magic'},
+                               content_type='multipart/form-data')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('engine must be one of', response.json['error'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,33 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+import unittest
+from app import create_app
+from app.db.db_setup import get_db
+from app.db.indexes import INDEXES, sync_indexes, index_status, run_migrations
+
+class IndexesTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.db = get_db(self.app)
+
+    def test_sync_creates_declared_indexes(self):
+        sync_indexes(self.db, report=lambda message: None)
+        status = index_status(self.db)
+        for collection_name, specs in INDEXES.items():
+            for spec in specs:
+                self.assertEqual(status[collection_name][spec["name"]], "ok")
+
+    def test_sync_is_idempotent(self):
+        sync_indexes(self.db, report=lambda message: None)
+        actions = sync_indexes(self.db, report=lambda message: None)
+        self.assertTrue(all(action[0] == "ok" for action in actions))
+
+    def test_migrations_run_once(self):
+        run_migrations(self.db, self.app, report=lambda message: None)
+        self.assertEqual(run_migrations(self.db, self.app, report=lambda message: None), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+import io
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta
+import PyPDF2 # type: ignore
+from app import create_app
+from app.utils.job_queue import jobs, wait_for_job, JobError, JobQueue, MongoJobStore, QUEUED, RUNNING
+
+@jobs.handler('test_echo')
+def echo_job(job, report):
+    report('echoing', 50)
+    if job['payload'].get('fail'):
+        raise JobError('Echo failed')
+    return {'echo': job['payload']['value']}
+
+class JobLeaseTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        self.store = MongoJobStore(self.app)
+        self.store.collection.delete_many({})
+
+    def _create(self, **fields):
+        now = datetime.utcnow()
+        job = dict({'_id': 'lease-job', 'kind': 'lease_test', 'user_id': 'jobuser', 'payload': {},
+                    'status': QUEUED, 'attempts': 0, 'created_at': now, 'updated_at': now}, **fields)
+        self.store.create(job)
+        return job
+
+    def test_stale_job_is_reclaimed_and_old_lease_is_ignored(self):
+        self._create()
+        first = self.store.claim(stale_seconds=60)
+        self.assertIsNone(self.store.claim(stale_seconds=60))
+
+        # The first worker went quiet past JOB_STALE_SECONDS
+        self.store.collection.update_one({'_id': 'lease-job'},
+                                         {'$set': {'updated_at': datetime.utcnow() - timedelta(seconds=120)}})
+        second = self.store.claim(stale_seconds=60)
+        self.assertNotEqual(second['lease'], first['lease'])
+        self.assertFalse(self.store.update('lease-job', {'status': 'succeeded', 'result': 'old'}, first['lease']))
+        self.assertTrue(self.store.update('lease-job', {'stage': 'extracting'}, second['lease']))
+        self.assertEqual(self.store.get('lease-job')['status'], RUNNING)
+
+    def test_heartbeat_keeps_a_long_stage_claimed(self):
+        self._create()
+        queue = JobQueue()
+        queue.app, queue.store, queue.stale_seconds, queue.max_attempts = self.app, self.store, 0.3, 2
+        finish, reclaimed = threading.Event(), []
+
+        @queue.handler('lease_test')
+        def long_stage(job, report):
+            # No report() for several stale periods, only the heartbeat speaks for the job
+            finish.wait(5)
+            return 'done'
+
+        runner = threading.Thread(target=queue._run, args=(self.store.claim(stale_seconds=0.3),))
+        runner.start()
+        for _ in range(10):
+            time.sleep(0.1)
+            reclaimed.append(self.store.claim(stale_seconds=0.3))
+        finish.set()
+        runner.join()
+        self.assertEqual(reclaimed, [None] * 10)
+        self.assertEqual(self.store.get('lease-job')['result'], 'done')
+
+class JobQueueTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+
+    def _auth_headers(self, username='jobuser'):
+        self.client.post('/Register', json={'username': username, 'password': 'testpass'})
+        response = self.client.post('/Login', json={'username': username, 'password': 'testpass'})
+        return {'Authorization': f"Bearer {response.json['access_token']}"}
+
+    def test_job_succeeds(self):
+        job_id = jobs.submit('test_echo', 'jobuser', {'value': 42})
+        job = wait_for_job(job_id)
+        self.assertEqual(job['status'], 'succeeded')
+        self.assertEqual(job['result'], {'echo': 42})
+
+    def test_job_fails_with_message(self):
+        job_id = jobs.submit('test_echo', 'jobuser', {'fail': True})
+        job = wait_for_job(job_id)
+        self.assertEqual(job['status'], 'failed')
+        self.assertEqual(job['error'], 'Echo failed')
+
+    def test_job_status_is_private(self):
+        headers = self._auth_headers()
+        job_id = jobs.submit('test_echo', 'someone-else', {'value': 1})
+        response = self.client.get(f'/jobs/{job_id}', headers=headers)
+        self.assertEqual(response.status_code, 404)
+
+    def test_pdf_upload_returns_job(self):
+        headers = self._auth_headers()
+        writer = PyPDF2.PdfWriter()
+        writer.add_blank_page(width=200, height=200)
+        pdf_bytes = io.BytesIO()
+        writer.write(pdf_bytes)
+        pdf_bytes.seek(0)
+
+        response = self.client.post('/summariser/pdf', headers=headers,
+                                    data={'file': (pdf_bytes, 'blank.pdf')},
+                                    content_type='multipart/form-data')
+        self.assertEqual(response.status_code, 202)
+        job = wait_for_job(response.json['job_id'])
+        # A blank page has no text, so the extraction stage fails the job
+        self.assertEqual(job['status'], 'failed')
+        status = self.client.get(response.json['status_url'], headers=headers)
+        self.assertEqual(status.status_code, 200)
+        self.assertEqual(status.json['error'], 'Unable to extract readable text from document')
+
+if __name__ == '__main__':
+    unittest.main()
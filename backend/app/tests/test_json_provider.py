@@ -0,0 +1,55 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+import gzip
+import json
+import unittest
+from datetime import datetime
+from unittest import mock
+from bson.objectid import ObjectId # type: ignore
+from app import create_app
+from app.utils import json_provider
+from app.utils.json_provider import json_array_stream
+
+class JSONProviderTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+
+    def test_encodes_bson_types(self):
+        note_id = ObjectId()
+        document = {'_id': note_id, 'created_at': datetime(2025, 1, 2, 3, 4, 5), 'tags': {'a'}}
+        expected = {'_id': str(note_id), 'created_at': '2025-01-02T03:04:05', 'tags': ['a']}
+        self.assertEqual(json.loads(self.app.json.dumps(document)), expected)
+        # Same output without orjson
+        with mock.patch.object(json_provider, 'orjson', None):
+            self.assertEqual(json.loads(self.app.json.dumps(document)), expected)
+
+    def test_streams_json_array(self):
+        with self.app.test_request_context():
+            response = json_array_stream(iter([{'_id': ObjectId(), 'n': n} for n in range(3)]))
+            self.assertTrue(response.is_streamed)
+            body = response.get_data()
+        self.assertEqual([item['n'] for item in json.loads(body)], [0, 1, 2])
+        with self.app.test_request_context():
+            self.assertEqual(json_array_stream(iter([])).get_data(), b'[]')
+
+    def test_gzip_is_negotiated(self):
+        self.client.post('/Register', json={'username': 'gzipuser', 'password': 'testpass'})
+        token = self.client.post('/Login', json={'username': 'gzipuser', 'password': 'testpass'}).json['access_token']
+        headers = {'Authorization': f'Bearer {token}'}
+        for i in range(20):
+            self.client.post('/notes', headers=headers, json={'title': f'Note {i}', 'content': 'Body text ' * 20})
+
+        plain = self.client.get('/notes', headers=headers)
+        self.assertNotIn('Content-Encoding', plain.headers)
+
+        compressed = self.client.get('/notes', headers=dict(headers, **{'Accept-Encoding': 'gzip'}))
+        self.assertEqual(compressed.headers['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', compressed.headers['Vary'])
+        self.assertEqual(json.loads(gzip.decompress(compressed.data)), plain.json)
+
+if __name__ == '__main__':
+    unittest.main()
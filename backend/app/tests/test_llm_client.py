@@ -0,0 +1,99 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+import threading
+import time
+import unittest
+import uuid
+from types import SimpleNamespace
+from unittest import mock
+import httpx # type: ignore
+import openai # type: ignore
+from app import create_app
+from app.utils.gpt_utils import gpt_summarise
+from app.utils.llm_client import (
+    LLMClient, Deadline, CircuitBreaker, LLMBusy, LLMError, LLMRateLimited, LLMUnavailable
+)
+
+CREATE = "openai.chat.completions.create"
+REQUEST = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+
+def answer(text="Notes"):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+
+def rate_limited(retry_after="0"):
+    response = httpx.Response(429, request=REQUEST, headers={"retry-after": retry_after})
+    return openai.RateLimitError("Rate limit reached", response=response, body=None)
+
+def server_error():
+    return openai.InternalServerError("Bad gateway", response=httpx.Response(502, request=REQUEST), body=None)
+
+class LLMClientTestCase(unittest.TestCase):
+    def setUp(self):
+        self.client = LLMClient()
+        self.client.backoff_base = 0.001
+        self.client.breaker = CircuitBreaker(failure_threshold=3, reset_seconds=0.05)
+
+    def test_rate_limits_are_retried(self):
+        with mock.patch(CREATE, side_effect=[rate_limited(), rate_limited(), answer()]) as create:
+            self.assertEqual(self.client.complete("p", "m", 10), "Notes")
+        self.assertEqual(create.call_count, 3)
+        self.assertLessEqual(create.call_args.kwargs["timeout"], self.client.request_timeout)
+
+    def test_retries_stop_at_the_deadline(self):
+        # Retry-After is longer than the time left, so there is no point waiting
+        with mock.patch(CREATE, side_effect=rate_limited("60")) as create:
+            with self.assertRaises(LLMRateLimited):
+                self.client.complete("p", "m", 10, deadline=Deadline(1))
+        self.assertEqual(create.call_count, 1)
+
+    def test_breaker_fails_fast_then_recovers(self):
+        self.client.max_retries = 0
+        with mock.patch(CREATE, side_effect=server_error()) as create:
+            for _ in range(3):
+                with self.assertRaises(LLMUnavailable):
+                    self.client.complete("p", "m", 10)
+            with self.assertRaises(LLMUnavailable):
+                self.client.complete("p", "m", 10)
+        # The fourth call never reached the provider
+        self.assertEqual(create.call_count, 3)
+        self.assertEqual(self.client.breaker.state, CircuitBreaker.OPEN)
+
+        time.sleep(0.06)
+        with mock.patch(CREATE, return_value=answer()):
+            self.assertEqual(self.client.complete("p", "m", 10), "Notes")
+        self.assertEqual(self.client.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_per_user_cap(self):
+        self.client.max_per_user = 1
+        self.client.queue_timeout = 0.05
+        started, release = threading.Event(), threading.Event()
+
+        def slow(**kwargs):
+            started.set()
+            release.wait(2)
+            return answer()
+
+        with mock.patch(CREATE, side_effect=slow):
+            first = threading.Thread(target=self.client.complete, args=("p", "m", 10), kwargs={"user_id": "alice"})
+            first.start()
+            started.wait(2)
+            with self.assertRaises(LLMBusy):
+                self.client.complete("p", "m", 10, user_id="alice")
+            release.set()
+            # Another user is not held up by alice
+            self.assertEqual(self.client.complete("p", "m", 10, user_id="bob"), "Notes")
+            first.join()
+        self.assertEqual(self.client.snapshot()["in_flight"], 0)
+
+    def test_summarise_raises_typed_errors(self):
+        app = create_app()
+        with app.app_context(), mock.patch("app.utils.gpt_utils.llm_client.complete",
+                                           side_effect=LLMUnavailable("down")):
+            with self.assertRaises(LLMError) as raised:
+                gpt_summarise(f"Lecture {uuid.uuid4()}", content_type="pdf")
+        self.assertEqual(raised.exception.public_message, "Summary generation service unavailable")
+
+if __name__ == '__main__':
+    unittest.main()
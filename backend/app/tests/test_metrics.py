@@ -0,0 +1,73 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+import json
+import logging
+import unittest
+from app import create_app
+from app.utils import metrics
+from app.utils.metrics import Histogram, stage_timer
+from app.utils.log import JSONFormatter, RequestSampler
+
+class MetricsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+        metrics.reset()
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram('test_seconds', 'Test', ('stage',), buckets=(0.1, 1))
+        for value in (0.05, 0.5, 5):
+            histogram.observe(value, stage='x')
+        lines = histogram.samples()
+        self.assertIn('test_seconds_bucket{stage="x",le="0.1"} 1', lines)
+        self.assertIn('test_seconds_bucket{stage="x",le="1.0"} 2', lines)
+        self.assertIn('test_seconds_bucket{stage="x",le="+Inf"} 3', lines)
+        self.assertIn('test_seconds_count{stage="x"} 3', lines)
+
+    def test_stage_errors_are_counted(self):
+        with self.assertRaises(ValueError):
+            with stage_timer('llm'):
+                raise ValueError()
+        body = metrics.render()
+        self.assertIn('studivio_stage_errors_total{stage="llm"} 1', body)
+        self.assertIn('studivio_stage_duration_seconds_count{stage="llm"} 1', body)
+
+    def test_requests_are_timed_by_route(self):
+        # Observed when the server closes the response, after the body went out
+        self.client.get('/').close()
+        self.client.get('/notes/123456789012345678901234').close()
+        body = self.client.get('/metrics').get_data(as_text=True)
+        self.assertIn('endpoint="/",status="200"', body)
+        # The route pattern is the label, not the note id
+        self.assertIn('endpoint="/notes/<note_id>"', body)
+        self.assertNotIn('123456789012345678901234', body)
+
+class StructuredLoggingTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+
+    def _record(self, level=logging.INFO, **fields):
+        logger = logging.getLogger('app.tests')
+        return logger.makeRecord(logger.name, level, __file__, 1, 'Note created', (), None, extra=fields)
+
+    def test_json_lines_carry_fields(self):
+        with self.app.test_request_context('/notes', method='POST'):
+            entry = json.loads(JSONFormatter().format(self._record(note_id='abc', bytes=12)))
+        self.assertEqual(entry['message'], 'Note created')
+        self.assertEqual(entry['level'], 'INFO')
+        self.assertEqual(entry['note_id'], 'abc')
+        self.assertEqual(entry['bytes'], 12)
+        self.assertEqual(entry['path'], '/notes')
+
+    def test_sampling_only_drops_request_info(self):
+        sampler = RequestSampler(rate=0.0)
+        self.assertTrue(sampler.filter(self._record()))
+        with self.app.test_request_context('/'):
+            self.assertFalse(sampler.filter(self._record()))
+            self.assertTrue(sampler.filter(self._record(logging.WARNING)))
+
+if __name__ == '__main__':
+    unittest.main()
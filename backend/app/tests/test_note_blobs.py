@@ -0,0 +1,106 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+import unittest
+import uuid
+from app import create_app
+from app.db.db_setup import get_collection
+from app.models.note import NoteModel
+from app.utils.note_blobs import PREVIEW_CHARS, compress, decompress
+
+class NoteBlobTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.app.config['NOTE_BLOB_THRESHOLD_BYTES'] = 1024
+        self.user = f"blob-{uuid.uuid4().hex[:8]}"
+        self.marker = f"zebra{uuid.uuid4().hex[:8]}"
+        # The marker word only appears far past the preview
+        self.transcript = "word " * 2000 + self.marker
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        self.model = NoteModel(self.app)
+        self.notes = get_collection(self.app, "notes")
+        self.blobs = get_collection(self.app, "note_blobs")
+
+    def tearDown(self):
+        self.ctx.pop()
+
+    def _create(self, **fields):
+        return self.model.create_note(dict({'title': 'Lecture', 'content': 'Short summary', 'user_id': self.user,
+                                            'transcript': self.transcript}, **fields))
+
+    def test_codecs_round_trip(self):
+        data = ("lecture " * 500).encode()
+        codec, packed = compress(data)
+        self.assertLess(len(packed), len(data))
+        self.assertEqual(decompress(codec, packed), data)
+
+    def test_large_field_is_offloaded_and_loaded_back(self):
+        note_id = self._create()
+        stored = self.notes.find_one({'_id': self.model.read_note(note_id)['_id']})
+        self.assertEqual(stored['content'], 'Short summary')
+        self.assertLessEqual(len(stored['transcript']), PREVIEW_CHARS + 1)
+        self.assertNotIn('content', stored['blobs'])
+        stub = stored['blobs']['transcript']
+        self.assertEqual(stub['size'], len(self.transcript))
+        self.assertLess(stub['stored_size'], stub['size'])
+
+        note = self.model.read_owned(note_id, self.user).document
+        self.assertEqual(note['transcript'], self.transcript)
+        self.assertNotIn('blobs', note)
+
+        # Search still sees the offloaded text
+        results, _ = self.model.search_notes(self.user, self.marker)
+        self.assertEqual([str(hit['_id']) for hit in results], [note_id])
+
+    def test_updates_replace_and_drop_blobs(self):
+        note_id = self._create()
+        first = self.notes.find_one({'user_id': self.user})['blobs']['transcript']['blob_id']
+
+        self.model.update_owned(note_id, self.user, {'transcript': self.transcript + " again"})
+        second = self.notes.find_one({'user_id': self.user})['blobs']['transcript']['blob_id']
+        self.assertNotEqual(first, second)
+        self.assertEqual([blob['_id'] for blob in self.blobs.find({'user_id': self.user})], [second])
+
+        # A title-only update keeps the transcript searchable
+        self.model.update_owned(note_id, self.user, {'title': 'Renamed'})
+        results, _ = self.model.search_notes(self.user, self.marker)
+        self.assertEqual(len(results), 1)
+
+        self.model.update_owned(note_id, self.user, {'transcript': 'short now'})
+        stored = self.notes.find_one({'user_id': self.user})
+        self.assertEqual(stored['transcript'], 'short now')
+        self.assertFalse(stored.get('blobs'))
+        self.assertEqual(self.blobs.count_documents({'user_id': self.user}), 0)
+
+    def test_foreign_update_leaves_no_blob(self):
+        note_id = self._create()
+        result = self.model.update_owned(note_id, 'someone-else', {'transcript': self.transcript + " hijack"})
+        self.assertFalse(result.ok)
+        self.assertEqual(self.blobs.count_documents({'note_id': self.notes.find_one({'user_id': self.user})['_id']}), 1)
+        self.assertEqual(self.model.read_owned(note_id, self.user).document['transcript'], self.transcript)
+
+    def test_corrupt_blob_falls_back_to_preview(self):
+        note_id = self._create()
+        self.blobs.update_many({'user_id': self.user}, {'$set': {'sha256': 'x', 'data': b'not zlib'}})
+        note = self.model.read_owned(note_id, self.user).document
+        self.assertTrue(note['transcript'].endswith('…'))
+        self.assertIn('transcript', note['blobs'])
+
+    def test_bulk_and_delete(self):
+        results = self.model.bulk_apply(self.user, [
+            {'op': 'create', 'note': {'title': 'Bulk', 'content': self.transcript}},
+            {'op': 'create', 'note': {'title': 'Small', 'content': 'tiny'}},
+        ])
+        self.assertEqual([result['status'] for result in results], [201, 201])
+        self.assertEqual(self.blobs.count_documents({'user_id': self.user}), 1)
+        big = results[0]['note_id']
+        self.assertEqual(self.model.read_owned(big, self.user).document['content'], self.transcript)
+
+        self.model.bulk_apply(self.user, [{'op': 'delete', 'id': big}])
+        self.assertEqual(self.blobs.count_documents({'user_id': self.user}), 0)
+
+if __name__ == '__main__':
+    unittest.main()
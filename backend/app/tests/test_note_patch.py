@@ -0,0 +1,103 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+import unittest
+import uuid
+from app import create_app
+from app.models.note import NoteModel
+from app.utils.note_patch import apply_delta, apply_diff, PatchError
+
+class PatchFormatTestCase(unittest.TestCase):
+    def test_delta(self):
+        delta = {'ops': [{'retain': 4}, {'delete': 5}, {'insert': 'fast'}, {'retain': 1, 'attributes': {'bold': True}}]}
+        self.assertEqual(apply_delta('The quick fox.', delta), 'The fast fox.')
+        # Offsets count UTF-16 code units, as the editor does: the emoji is 2
+        self.assertEqual(apply_delta('🧪 lab', {'ops': [{'retain': 3}, {'insert': 'wet '}]}), '🧪 wet lab')
+
+    def test_diff(self):
+        self.assertEqual(apply_diff('abcdef', [[1, 1, 'B'], [4, 0, '-'], [6, 0, '!']]), 'aBcd-ef!')
+
+    def test_bad_patches(self):
+        for text, patch in [('abc', {'ops': [{'retain': 5}]}),
+                            ('abc', {'ops': [{'insert': {'image': 'x.png'}}]}),
+                            ('abc', {'ops': [{'retain': -1}]}),
+                            ('🧪', {'ops': [{'retain': 1}, {'insert': 'x'}]})]:
+            with self.assertRaises(PatchError):
+                apply_delta(text, patch)
+        for splices in ([[2, 1, 'x'], [1, 0, 'y']], [[0, 9, '']], [[0, 0]], 'abc'):
+            with self.assertRaises(PatchError):
+                apply_diff('abc', splices)
+
+class NotePatchRouteTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+        username = f"patch-{uuid.uuid4().hex[:8]}"
+        self.client.post('/Register', json={'username': username, 'password': 'testpass'})
+        token = self.client.post('/Login', json={'username': username, 'password': 'testpass'}).json['access_token']
+        self.headers = {'Authorization': f"Bearer {token}"}
+        self.note_id = self.client.post('/notes', headers=self.headers,
+                                        json={'title': 'Cells', 'content': 'Cells have walls.'}).json['note_id']
+
+    def _patch(self, body):
+        return self.client.patch(f'/notes/{self.note_id}', headers=self.headers, json=body)
+
+    def _note(self):
+        return self.client.get(f'/notes/{self.note_id}', headers=self.headers).json
+
+    def test_patches_apply_in_order(self):
+        self.assertEqual(self._note()['revision'], 0)
+        response = self._patch({'base_revision': 0, 'diff': [[6, 4, 'may have']]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['revision'], 1)
+        response = self._patch({'base_revision': 1, 'delta': {'ops': [{'retain': 21}, {'insert': ' Plant'}]},
+                                'title': 'Plant cells'})
+        self.assertEqual(response.json['revision'], 2)
+        note = self._note()
+        self.assertEqual((note['title'], note['content']), ('Plant cells', 'Cells may have walls. Plant'))
+
+        with self.app.app_context():
+            log = NoteModel(self.app).revision_log(self.note_id)
+        self.assertEqual([entry['revision'] for entry in log], [1, 2])
+        self.assertEqual(log[0]['patch'], [[6, 4, 'may have']])
+        self.assertNotIn('content', log[0])
+
+    def test_stale_revision_conflicts(self):
+        self._patch({'base_revision': 0, 'diff': [[0, 0, 'Plant ']]})
+        # A second tab still editing revision 0
+        response = self._patch({'base_revision': 0, 'diff': [[0, 5, 'Animal']]})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json['revision'], 1)
+
+        # A full PUT moves the revision on as well
+        put = self.client.put(f'/notes/{self.note_id}', headers=self.headers, json={'content': 'Rewritten.'})
+        self.assertEqual(put.json['revision'], 2)
+        self.assertEqual(self._patch({'base_revision': 1, 'title': 'Old'}).status_code, 409)
+        self.assertEqual(self._note()['content'], 'Rewritten.')
+
+    def test_rejected_requests(self):
+        self.assertEqual(self._patch({'diff': [[0, 0, 'x']]}).status_code, 400)
+        self.assertEqual(self._patch({'base_revision': 0}).status_code, 400)
+        self.assertEqual(self._patch({'base_revision': 0, 'diff': [[99, 1, 'x']]}).status_code, 400)
+        self.assertEqual(self._note()['revision'], 0)
+
+        self.client.post('/Register', json={'username': 'patch-intruder', 'password': 'testpass'})
+        token = self.client.post('/Login', json={'username': 'patch-intruder', 'password': 'testpass'}).json['access_token']
+        response = self.client.patch(f'/notes/{self.note_id}', headers={'Authorization': f"Bearer {token}"},
+                                     json={'base_revision': 0, 'title': 'Mine'})
+        self.assertEqual(response.status_code, 403)
+
+    def test_log_is_trimmed_and_deleted_with_the_note(self):
+        self.app.config['NOTE_REVISION_LOG_LIMIT'] = 3
+        for revision in range(5):
+            self._patch({'base_revision': revision, 'diff': [[0, 0, 'x']]})
+        with self.app.app_context():
+            model = NoteModel(self.app)
+            self.assertEqual([entry['revision'] for entry in model.revision_log(self.note_id)], [3, 4, 5])
+            self.client.delete(f'/notes/{self.note_id}', headers=self.headers)
+            self.assertEqual(model.revision_log(self.note_id), [])
+
+if __name__ == '__main__':
+    unittest.main()
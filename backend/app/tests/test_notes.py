@@ -5,7 +5,11 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../.
 
 
 import unittest
+from unittest import mock
+from bson.objectid import ObjectId # type: ignore
 from app import create_app
+from app.models.note import NoteModel
+from app.utils.note_cache import NoteListCache, note_list_cache
 
 class NotesRouteTestCase(unittest.TestCase):
     def setUp(self):
@@ -26,5 +30,208 @@ class NotesRouteTestCase(unittest.TestCase):
         response = self.client.get('/notes?username=testuser')
         self.assertIn(response.status_code, [200, 404])
 
+    def _auth_headers(self, username='pageuser'):
+        self.client.post('/Register', json={'username': username, 'password': 'testpass'})
+        response = self.client.post('/Login', json={'username': username, 'password': 'testpass'})
+        return {'Authorization': f"Bearer {response.json['access_token']}"}
+
+    def test_get_notes_paginated(self):
+        headers = self._auth_headers()
+        for i in range(5):
+            self.client.post('/notes', headers=headers, json={'title': f'Page {i}', 'content': 'Body'})
+
+        seen = []
+        after = None
+        while True:
+            url = '/notes?limit=2' + (f'&after={after}' if after else '')
+            response = self.client.get(url, headers=headers)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(note['_id'] for note in response.json)
+            after = response.headers.get('X-Next-Cursor')
+            if not after:
+                break
+        self.assertEqual(len(seen), len(set(seen)))
+        self.assertGreaterEqual(len(seen), 5)
+
+    def test_get_notes_projection(self):
+        headers = self._auth_headers()
+        self.client.post('/notes', headers=headers, json={'title': 'Projected', 'content': 'Body'})
+        response = self.client.get('/notes?fields=title', headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(all('content' not in note for note in response.json))
+
+    def test_get_notes_bad_cursor(self):
+        headers = self._auth_headers()
+        response = self.client.get('/notes?after=not-a-cursor', headers=headers)
+        self.assertEqual(response.status_code, 400)
+
+    def test_get_notes_conditional(self):
+        headers = self._auth_headers('etaguser')
+        first = self.client.get('/notes', headers=headers)
+        etag = first.headers['ETag']
+        self.client.post('/notes', headers=headers, json={'title': 'Fresh', 'content': 'Body'})
+
+        # The create above changed the list, the old ETag no longer matches
+        changed = self.client.get('/notes', headers=dict(headers, **{'If-None-Match': etag}))
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed.headers['ETag'], etag)
+
+        unchanged = self.client.get('/notes', headers=dict(headers, **{'If-None-Match': changed.headers['ETag']}))
+        self.assertEqual(unchanged.status_code, 304)
+        self.assertEqual(unchanged.data, b'')
+
+    def test_get_note_conditional(self):
+        headers = self._auth_headers('etaguser')
+        note_id = self.client.post('/notes', headers=headers, json={'title': 'One', 'content': 'Body'}).json['note_id']
+        first = self.client.get(f'/notes/{note_id}', headers=headers)
+        self.assertIn('Last-Modified', first.headers)
+        etag = first.headers['ETag']
+        self.assertEqual(self.client.get(f'/notes/{note_id}', headers=dict(headers, **{'If-None-Match': etag})).status_code, 304)
+
+        self.client.put(f'/notes/{note_id}', headers=headers, json={'content': 'Edited'})
+        self.assertEqual(self.client.get(f'/notes/{note_id}', headers=dict(headers, **{'If-None-Match': etag})).status_code, 200)
+
+    def test_etag_is_weak_across_encodings(self):
+        headers = self._auth_headers('etaguser')
+        note_id = self.client.post('/notes', headers=headers, json={'title': 'Long', 'content': 'Cells. ' * 500}).json['note_id']
+        plain = self.client.get(f'/notes/{note_id}', headers=dict(headers, **{'Accept-Encoding': 'identity'}))
+        gzipped = self.client.get(f'/notes/{note_id}', headers=dict(headers, **{'Accept-Encoding': 'gzip'}))
+        self.assertEqual(gzipped.headers['Content-Encoding'], 'gzip')
+        self.assertTrue(plain.headers['ETag'].startswith('W/'))
+        self.assertEqual(plain.headers['ETag'], gzipped.headers['ETag'])
+        revalidated = self.client.get(f'/notes/{note_id}', headers=dict(headers, **{'If-None-Match': gzipped.headers['ETag']}))
+        self.assertEqual(revalidated.status_code, 304)
+
+    def test_whole_list_is_cached_after_streaming(self):
+        headers = self._auth_headers('listcacheuser')
+        self.client.post('/notes', headers=headers, json={'title': 'Cached', 'content': 'Body'})
+        first = self.client.get('/notes', headers=headers)
+        self.assertTrue(first.is_streamed)
+        hits = note_list_cache.stats['hits']
+        second = self.client.get('/notes', headers=headers)
+        self.assertEqual(note_list_cache.stats['hits'], hits + 1)
+        self.assertEqual(second.json, first.json)
+
+        # A write moves the version on, the next read streams a fresh list
+        self.client.post('/notes', headers=headers, json={'title': 'Another', 'content': 'Body'})
+        self.assertEqual(len(self.client.get('/notes', headers=headers).json), len(first.json) + 1)
+
+    def test_note_writes_check_ownership(self):
+        owner = self._auth_headers('owneruser')
+        intruder = self._auth_headers('intruderuser')
+        note_id = self.client.post('/notes', headers=owner, json={'title': 'Private', 'content': 'Body'}).json['note_id']
+
+        self.assertEqual(self.client.put(f'/notes/{note_id}', headers=intruder, json={'title': 'X'}).status_code, 403)
+        self.assertEqual(self.client.delete(f'/notes/{note_id}', headers=intruder).status_code, 403)
+        self.assertEqual(self.client.get('/notes/not-an-id', headers=owner).status_code, 404)
+        self.assertEqual(self.client.get(f'/notes/{note_id}', headers=owner).json['title'], 'Private')
+
+    def test_bulk_operations(self):
+        headers = self._auth_headers('bulkuser')
+        created = self.client.post('/notes/bulk', headers=headers, json={'operations': [
+            {'op': 'create', 'note': {'title': f'Bulk {i}', 'content': 'Body'}} for i in range(3)
+        ]})
+        self.assertEqual(created.status_code, 200)
+        note_ids = [result['note_id'] for result in created.json['results']]
+        self.assertEqual([result['status'] for result in created.json['results']], [201, 201, 201])
+
+        other = self._auth_headers('bulkother')
+        foreign_id = self.client.post('/notes', headers=other, json={'title': 'Mine', 'content': 'Body'}).json['note_id']
+
+        response = self.client.post('/notes/bulk', headers=headers, json={'ordered': False, 'operations': [
+            {'op': 'update', 'id': note_ids[0], 'note': {'title': 'Renamed'}},
+            {'op': 'delete', 'id': note_ids[1]},
+            {'op': 'delete', 'id': foreign_id},
+            {'op': 'delete', 'id': 'not-an-id'},
+        ]})
+        self.assertEqual([result['status'] for result in response.json['results']], [200, 200, 403, 400])
+        self.assertEqual(self.client.get(f'/notes/{note_ids[0]}', headers=headers).json['title'], 'Renamed')
+        self.assertEqual(self.client.get(f'/notes/{note_ids[1]}', headers=headers).status_code, 404)
+        self.assertEqual(self.client.get(f'/notes/{foreign_id}', headers=other).status_code, 200)
+
+    def test_bulk_ordered_stops_at_first_failure(self):
+        headers = self._auth_headers('bulkuser')
+        note_id = self.client.post('/notes', headers=headers, json={'title': 'Keep', 'content': 'Body'}).json['note_id']
+        response = self.client.post('/notes/bulk', headers=headers, json={'operations': [
+            {'op': 'create', 'note': {'title': 'No content'}},
+            {'op': 'delete', 'id': note_id},
+        ]})
+        self.assertEqual([result['status'] for result in response.json['results']], [400, 424])
+        self.assertEqual(self.client.get(f'/notes/{note_id}', headers=headers).status_code, 200)
+
+    def test_bulk_reports_notes_gone_by_write_time(self):
+        headers = self._auth_headers('bulkuser')
+        note_ids = [self.client.post('/notes', headers=headers, json={'title': f'Gone {i}', 'content': 'Body'}).json['note_id']
+                    for i in range(2)]
+        response = self.client.post('/notes/bulk', headers=headers, json={'operations': [
+            {'op': 'delete', 'id': note_ids[0]},
+            {'op': 'delete', 'id': note_ids[0]},
+            {'op': 'update', 'id': note_ids[0], 'note': {'title': 'Too late'}},
+        ]})
+        self.assertEqual([result['status'] for result in response.json['results']], [200, 404, 404])
+        self.assertEqual(response.json['failed'], 2)
+
+        # Deleted by another request between the ownership check and the write
+        note_model = NoteModel(self.app)
+        find = note_model.collection.find
+        def find_then_delete(*args, **kwargs):
+            found = list(find(*args, **kwargs))
+            note_model.collection.delete_one({'_id': ObjectId(note_ids[1])})
+            return found
+        with self.app.app_context(), mock.patch.object(note_model.collection, 'find', side_effect=find_then_delete):
+            results = note_model.bulk_apply('bulkuser', [{'op': 'update', 'id': note_ids[1], 'note': {'title': 'Lost'}},
+                                                         {'op': 'delete', 'id': note_ids[1]}], ordered=False)
+        self.assertEqual([result['status'] for result in results], [404, 404])
+
+    def test_client_cannot_write_blob_stubs(self):
+        headers = self._auth_headers('blobuser')
+        self.app.config['NOTE_BLOB_THRESHOLD_BYTES'] = 1024
+        note_id = self.client.post('/notes', headers=headers,
+                                   json={'title': 'Stubs', 'content': 'Body', 'blobs': 'x'}).json['note_id']
+        self.assertEqual(self.client.put(f'/notes/{note_id}', headers=headers, json={'blobs': 'x'}).status_code, 200)
+        # With an offloaded content too, $set would hold both blobs and blobs.content
+        response = self.client.put(f'/notes/{note_id}', headers=headers,
+                                   json={'blobs': {'content': 'x'}, 'content': 'Long. ' * 1000})
+        self.assertEqual(response.status_code, 200)
+        bulk = self.client.post('/notes/bulk', headers=headers, json={'operations': [
+            {'op': 'update', 'id': note_id, 'note': {'title': 'Renamed', 'blobs': 'x'}},
+            {'op': 'create', 'note': {'title': 'New', 'content': 'Body', 'blobs': 'x'}}]})
+        self.assertEqual([result['status'] for result in bulk.json['results']], [200, 201])
+
+        note = self.client.get(f'/notes/{note_id}', headers=headers)
+        self.assertEqual(note.status_code, 200)
+        self.assertEqual((note.json['title'], note.json['content']), ('Renamed', 'Long. ' * 1000))
+        self.assertNotIn('blobs', note.json)
+        created = bulk.json['results'][1]['note_id']
+        self.assertEqual(self.client.get(f'/notes/{created}', headers=headers).status_code, 200)
+
+class NoteListCacheTestCase(unittest.TestCase):
+    def test_invalidate_drops_only_that_users_lists(self):
+        cache = NoteListCache(size=3)
+        cache.put('ana', '', 1, b'[]', {})
+        cache.put('ana', 'limit=5', 1, b'[]', {})
+        cache.put('ben', '', 1, b'[]', {})
+        cache.invalidate('ana')
+        self.assertIsNone(cache.get('ana', '', 1))
+        self.assertIsNotNone(cache.get('ben', '', 1))
+        self.assertNotIn('ana', cache._keys)
+
+        # Entries the LRU evicts leave the index as well
+        for user in ('cy', 'di', 'ed'):
+            cache.put(user, '', 1, b'[]', {})
+        self.assertEqual(set(cache._keys), {'cy', 'di', 'ed'})
+
+    def test_record_skips_partial_and_oversized_lists(self):
+        cache = NoteListCache(max_bytes=8)
+        self.assertEqual(list(cache.record('ana', '', 1, iter(['[', '1', ']']))), ['[', '1', ']'])
+        self.assertEqual(cache.get('ana', '', 1), (b'[1]', {}))
+
+        list(cache.record('ben', '', 1, iter(['[', '123456789', ']'])))
+        self.assertIsNone(cache.get('ben', '', 1))
+        unfinished = cache.record('cy', '', 1, iter(['[', '1', ']']))
+        next(unfinished)
+        unfinished.close()
+        self.assertIsNone(cache.get('cy', '', 1))
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,79 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+import time
+import unittest
+import uuid
+import bcrypt # type: ignore
+from app import create_app
+from app.models.user import UserModel
+from app.utils.password_hasher import PasswordHasher, HasherBusy, calibrate, hash_rounds
+
+class PasswordHasherTestCase(unittest.TestCase):
+    def setUp(self):
+        self.hasher = PasswordHasher()
+        self.hasher.fixed_rounds = 5
+
+    def test_hash_and_verify_in_pool(self):
+        self.hasher.workers = 1
+        hashed = self.hasher.hash('s3cret')
+        self.assertEqual(hash_rounds(hashed), 5)
+        self.assertTrue(self.hasher.verify('s3cret', hashed))
+        self.assertFalse(self.hasher.verify('wrong', hashed))
+
+    def test_reads_existing_flask_bcrypt_hashes(self):
+        self.hasher.workers = 0
+        legacy = bcrypt.hashpw(b'password', bcrypt.gensalt(4)).decode('utf-8')
+        self.assertTrue(self.hasher.verify('password', legacy))
+        self.assertFalse(self.hasher.verify('password', 'not-a-hash'))
+        self.assertTrue(self.hasher.needs_rehash(legacy))
+
+    def test_rejects_when_queue_is_full(self):
+        self.hasher.workers = 1
+        self.hasher.max_pending = 0
+        with self.assertRaises(HasherBusy):
+            self.hasher.hash('s3cret')
+
+    def test_timed_out_hash_stays_pending_until_done(self):
+        self.hasher.workers = 1
+        self.hasher.hash('warm up the pool')
+        self.hasher.fixed_rounds = 12
+        self.hasher.timeout = 0.001
+        with self.assertRaises(HasherBusy):
+            self.hasher.hash('s3cret')
+        self.assertEqual(self.hasher._pending, 1)
+        deadline = time.monotonic() + 30
+        while self.hasher._pending and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.hasher._pending, 0)
+
+    def test_calibration_runs_off_the_request_thread(self):
+        hasher = PasswordHasher()
+        hasher.configure({'BCRYPT_TARGET_MS': 0.001, 'BCRYPT_MIN_ROUNDS': 4, 'BCRYPT_MAX_ROUNDS': 6})
+        # Nothing starts until a hash needs the cost: create_app() runs before gunicorn forks
+        self.assertIsNone(hasher._calibrating_pid)
+        # Answers straight away, with the floor if the cost is not known yet
+        self.assertIn(hasher.rounds, (4, 5, 6))
+        deadline = time.monotonic() + 30
+        while hasher._rounds is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(hasher.rounds, 4)
+
+    def test_calibration_stays_in_bounds(self):
+        self.assertEqual(calibrate(0.001, 4, 8, samples=1), 4)
+        self.assertEqual(calibrate(10 ** 9, 4, 8, samples=1), 8)
+
+    def test_login_upgrades_cheap_hash(self):
+        app = create_app()
+        users = UserModel(app)
+        username = f"rehash-{uuid.uuid4().hex[:8]}"
+        users.users.insert_one({'username': username,
+                                'password': bcrypt.hashpw(b'pw', bcrypt.gensalt(4)).decode('utf-8')})
+        self.assertTrue(users.check_password(username, 'pw'))
+        upgraded = users.find_username(username)['password']
+        self.assertGreater(hash_rounds(upgraded), 4)
+        self.assertTrue(users.check_password(username, 'pw'))
+
+if __name__ == '__main__':
+    unittest.main()
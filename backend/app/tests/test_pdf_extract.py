@@ -0,0 +1,70 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+import tempfile
+import unittest
+from app.utils.pdf_extract import iter_pages, page_indices, parse_page_range, PageRangeError
+
+def write_text_pdf(path, page_texts):
+    """Smallest valid PDF with one line of Helvetica text per page"""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in page_texts:
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        content_id = len(objects)
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    body = b"%PDF-1.4\n"
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(body))
+        body += f"{number} 0 obj\n{obj}\nendobj\n".encode("latin-1")
+    xref = len(body)
+    body += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    for offset in offsets:
+        body += f"{offset:010d} 00000 n \n".encode("latin-1")
+    body += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    with open(path, "wb") as pdf_file:
+        pdf_file.write(body)
+
+class PdfExtractTestCase(unittest.TestCase):
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix=".pdf")
+        os.close(handle)
+        write_text_pdf(self.path, [f"Page number {i + 1}" for i in range(6)])
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_parse_page_range(self):
+        self.assertEqual(parse_page_range("1-3,5"), [[0, 3], [4, 5]])
+        self.assertEqual(page_indices(parse_page_range("1-3,5"), 6), [0, 1, 2, 4])
+        self.assertEqual(parse_page_range("4-6,1-2,2-3,9"), [[0, 6], [8, 9]])
+        self.assertIsNone(parse_page_range(""))
+        # Expanded only once clamped to the document
+        self.assertEqual(page_indices(parse_page_range("5-200000000"), 6), [4, 5])
+        with self.assertRaises(PageRangeError):
+            parse_page_range("5-2")
+
+    def test_inline_extraction_in_order(self):
+        pages = list(iter_pages(self.path, workers=1))
+        self.assertEqual([page.index for page in pages], list(range(6)))
+        self.assertIn("Page number 4", pages[3].text)
+        self.assertTrue(all(page.seconds >= 0 for page in pages))
+
+    def test_parallel_extraction_matches_inline(self):
+        inline = [page.text for page in iter_pages(self.path, workers=1)]
+        parallel = [page.text for page in iter_pages(self.path, workers=2, parallel_min_pages=2)]
+        self.assertEqual(inline, parallel)
+
+    def test_page_range_and_cap(self):
+        pages = list(iter_pages(self.path, page_ranges=[[1, 5]], max_pages=2, workers=1))
+        self.assertEqual([page.index for page in pages], [1, 2])
+
+if __name__ == '__main__':
+    unittest.main()
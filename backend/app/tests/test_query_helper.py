@@ -0,0 +1,38 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+import unittest
+from app import create_app
+from app.db.db_setup import get_collection
+from app.db.query_helper import find_owned, update_owned, delete_owned, OK, NOT_FOUND, FORBIDDEN
+
+class OwnedQueryTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.collection = get_collection(self.app, "query_helper_test")
+        self.collection.delete_many({})
+        self.doc_id = self.collection.insert_one({'user_id': 'alice', 'title': 'Mine'}).inserted_id
+
+    def test_find_owned(self):
+        self.assertEqual(find_owned(self.collection, self.doc_id, 'alice').status, OK)
+        self.assertEqual(find_owned(self.collection, self.doc_id, 'bob').status, FORBIDDEN)
+        self.assertEqual(find_owned(self.collection, 'not-an-id', 'alice').status, NOT_FOUND)
+
+    def test_update_owned_returns_updated_document(self):
+        result = update_owned(self.collection, self.doc_id, 'alice', {'title': 'Renamed'})
+        self.assertTrue(result.ok)
+        self.assertEqual(result.document['title'], 'Renamed')
+
+        refused = update_owned(self.collection, self.doc_id, 'bob', {'title': 'Stolen'})
+        self.assertEqual(refused.status, FORBIDDEN)
+        self.assertEqual(self.collection.find_one({'_id': self.doc_id})['title'], 'Renamed')
+
+    def test_delete_owned(self):
+        self.assertEqual(delete_owned(self.collection, self.doc_id, 'bob').status, FORBIDDEN)
+        self.assertTrue(delete_owned(self.collection, self.doc_id, 'alice').ok)
+        self.assertEqual(delete_owned(self.collection, self.doc_id, 'alice').status, NOT_FOUND)
+
+if __name__ == '__main__':
+    unittest.main()
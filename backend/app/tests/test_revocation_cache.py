@@ -0,0 +1,79 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+import threading
+import unittest
+import uuid
+from datetime import datetime
+from app import create_app
+from app.db.db_setup import get_collection
+from app.utils.revocation_cache import BloomFilter, RevocationCache, TTLCache
+
+class CountingCollection:
+    """Wraps a collection and counts point lookups"""
+    def __init__(self, collection):
+        self.collection = collection
+        self.find_one_calls = 0
+
+    def find(self, *args, **kwargs):
+        return self.collection.find(*args, **kwargs)
+
+    def find_one(self, *args, **kwargs):
+        self.find_one_calls += 1
+        return self.collection.find_one(*args, **kwargs)
+
+class RevocationCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.blacklist = CountingCollection(get_collection(self.app, "blacklisted_tokens"))
+        self.cache = RevocationCache(refresh_seconds=60)
+
+    def test_bloom_filter_has_no_false_negatives(self):
+        bloom = BloomFilter(1000, 0.01)
+        items = [str(uuid.uuid4()) for _ in range(1000)]
+        for item in items:
+            bloom.add(item)
+        self.assertTrue(all(item in bloom for item in items))
+
+    def test_negative_lookup_skips_database(self):
+        self.cache.is_revoked(str(uuid.uuid4()), self.blacklist)
+        self.assertFalse(self.cache.is_revoked(str(uuid.uuid4()), self.blacklist))
+        self.assertEqual(self.blacklist.find_one_calls, 0)
+
+    def test_revoked_token_is_found(self):
+        jti = str(uuid.uuid4())
+        self.blacklist.collection.insert_one({"jti": jti, "revoked_at": datetime.utcnow(), "expires_at": None})
+        self.assertTrue(self.cache.is_revoked(jti, self.blacklist))
+
+    def test_local_logout_is_visible_immediately(self):
+        jti = str(uuid.uuid4())
+        self.cache.is_revoked(jti, self.blacklist)
+        self.blacklist.collection.insert_one({"jti": jti, "revoked_at": datetime.utcnow(), "expires_at": None})
+        self.cache.add(jti)
+        self.assertTrue(self.cache.is_revoked(jti, self.blacklist))
+
+    def test_lru_is_thread_safe(self):
+        # Tiny and instantly expiring, so reads evict and reorder while others write
+        lru, errors = TTLCache(8, 0), []
+
+        def hammer(offset):
+            try:
+                for n in range(20000):
+                    key = (n + offset) % 32
+                    lru.set(key, n)
+                    lru.get(key + 1)
+                    lru.pop(key + 2)
+            except Exception as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=hammer, args=(offset,)) for offset in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+if __name__ == '__main__':
+    unittest.main()
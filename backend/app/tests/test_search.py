@@ -0,0 +1,92 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+import unittest
+import uuid
+from app import create_app
+from app.utils.search_index import tokenize, term_weights
+
+class SearchIndexTestCase(unittest.TestCase):
+    def test_tokenize_drops_stopwords_and_short_words(self):
+        self.assertEqual(tokenize("The Krebs cycle, a.k.a. citric-acid cycle"),
+                         ["krebs", "cycle", "citric", "acid", "cycle"])
+
+    def test_title_weighs_more_than_content(self):
+        weights = term_weights({'title': 'mitosis', 'content': 'meiosis', 'transcript': 'cytokinesis'})
+        self.assertGreater(weights['mitosis'], weights['meiosis'])
+        self.assertGreater(weights['meiosis'], weights['cytokinesis'])
+
+
+class NoteSearchRouteTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+        self.headers = self._auth_headers(f"search-{uuid.uuid4().hex[:8]}")
+
+    def _auth_headers(self, username):
+        self.client.post('/Register', json={'username': username, 'password': 'testpass'})
+        response = self.client.post('/Login', json={'username': username, 'password': 'testpass'})
+        return {'Authorization': f"Bearer {response.json['access_token']}"}
+
+    def _create(self, title, content, headers=None):
+        response = self.client.post('/notes', headers=headers or self.headers,
+                                    json={'title': title, 'content': content})
+        return response.json['note_id']
+
+    def _search(self, query, headers=None):
+        return self.client.get(f'/notes/search?q={query}', headers=headers or self.headers)
+
+    def test_ranks_title_matches_first(self):
+        body_hit = self._create('Lecture 4', 'We covered photosynthesis in plants')
+        title_hit = self._create('Photosynthesis', 'Light reactions and the Calvin cycle')
+        self._create('Lecture 5', 'Cell division')
+
+        response = self._search('photosynthesis')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([hit['_id'] for hit in response.json], [title_hit, body_hit])
+        self.assertEqual(response.headers['X-Total-Count'], '2')
+        self.assertIn('photosynthesis', response.json[1]['snippet'])
+        self.assertNotIn('content', response.json[0])
+
+    def test_prefix_and_all_words_must_match(self):
+        both = self._create('Organic chemistry', 'Alkenes and alkynes')
+        self._create('Organic farming', 'Crop rotation')
+
+        self.assertEqual([hit['_id'] for hit in self._search('organic chem').json], [both])
+        self.assertEqual(len(self._search('organic').json), 2)
+
+    def test_index_follows_updates_and_deletes(self):
+        note_id = self._create('Draft', 'thermodynamics entropy')
+        self.client.put(f'/notes/{note_id}', headers=self.headers, json={'content': 'kinematics'})
+        self.assertEqual(self._search('entropy').json, [])
+        self.assertEqual(len(self._search('kinematics').json), 1)
+
+        self.client.delete(f'/notes/{note_id}', headers=self.headers)
+        self.assertEqual(self._search('kinematics').json, [])
+
+    def test_results_are_per_user(self):
+        self._create('Secret', 'quaternions')
+        other = self._auth_headers(f"search-{uuid.uuid4().hex[:8]}")
+        self.assertEqual(self._search('quaternions', headers=other).json, [])
+
+    def test_paginates_with_cursor(self):
+        for i in range(5):
+            self._create(f'Vector note {i}', 'vectors')
+        seen = []
+        url = '/notes/search?q=vectors&limit=2'
+        while url:
+            response = self.client.get(url, headers=self.headers)
+            seen.extend(hit['_id'] for hit in response.json)
+            cursor = response.headers.get('X-Next-Cursor')
+            url = f'/notes/search?q=vectors&limit=2&after={cursor}' if cursor else None
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(len(set(seen)), 5)
+
+    def test_requires_query(self):
+        self.assertEqual(self.client.get('/notes/search', headers=self.headers).status_code, 400)
+        self.assertEqual(self.client.get('/notes/search?q=x&after=bogus', headers=self.headers).status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+import json
+import subprocess
+import unittest
+from unittest import mock
+from app import create_app
+from app.utils.readiness import Readiness, readiness, READY, FAILED
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+
+class StartupTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+
+    def test_boot_skips_heavy_imports(self):
+        # A fresh interpreter, this one already has them from other tests
+        probe = ("import json, sys; import app.wsgi; "
+                 "print(json.dumps([name for name in ('openai', 'assemblyai', 'PyPDF2', 'numpy') if name in sys.modules]))")
+        environment = dict(os.environ, PYTHONPATH=BACKEND_DIR)
+        environment.setdefault('MONGO_URI', 'mongodb://localhost:27017/Studivio')
+        output = subprocess.run([sys.executable, '-c', probe], cwd=BACKEND_DIR, env=environment,
+                                capture_output=True, text=True, check=True).stdout
+        self.assertEqual(json.loads(output.strip().splitlines()[-1]), [])
+
+    def test_ready_after_warm_up(self):
+        with mock.patch('app.utils.readiness.warm_pool', return_value=4):
+            probe = Readiness()
+            probe.start(self.app)
+            self.assertTrue(probe.wait(5))
+        self.assertEqual(probe.snapshot()['mongo_connections'], 4)
+
+    def test_ready_route(self):
+        # The dev server has no post_worker_init hook, the first call starts the warm-up
+        self.client.get('/ready')
+        self.assertTrue(readiness.wait(5))
+        response = self.client.get('/ready')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['status'], READY)
+
+    def test_warm_up_gives_up_after_timeout(self):
+        self.app.config['MONGO_WARM_TIMEOUT_SECONDS'] = 0
+        with mock.patch('app.utils.readiness.warm_pool', side_effect=OSError('no server')):
+            probe = Readiness()
+            probe.start(self.app)
+            self.assertFalse(probe.wait(5))
+        self.assertEqual(probe.snapshot()['status'], FAILED)
+        self.assertEqual(probe.snapshot()['error'], 'no server')
+
+        # A failed worker tries again on the next start
+        with mock.patch('app.utils.readiness.warm_pool', return_value=1):
+            probe.start(self.app)
+            probe.wait(5)
+        self.assertEqual(probe.state, READY)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+import io
+import json
+import tempfile
+import unittest
+import uuid
+from types import SimpleNamespace
+from unittest import mock
+from werkzeug.test import EnvironBuilder
+from app import create_app
+from app.models.note import NoteModel
+from app.tests.test_pdf_extract import write_text_pdf
+
+FAKE_SUMMARY = ["# Notes", "\n- point one", "\n- point two"]
+
+def fake_stream(**kwargs):
+    """Stands in for the streaming completions API, one chunk per piece"""
+    assert kwargs.get("stream") is True
+    for piece in FAKE_SUMMARY:
+        yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))])
+
+def parse_events(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+class StreamingSummaryTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+        self.username = f"stream-{uuid.uuid4().hex[:8]}"
+        self.client.post('/Register', json={'username': self.username, 'password': 'testpass'})
+        response = self.client.post('/Login', json={'username': self.username, 'password': 'testpass'})
+        self.headers = {'Authorization': f"Bearer {response.json['access_token']}",
+                        'Accept': 'text/event-stream'}
+
+    def _pdf_bytes(self, text):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'doc.pdf')
+            write_text_pdf(path, [text])
+            with open(path, 'rb') as source:
+                return io.BytesIO(source.read())
+
+    def test_pdf_stream_sends_stages_tokens_and_saves_note(self):
+        pdf = self._pdf_bytes(f"Streaming lecture {uuid.uuid4().hex}")
+        with mock.patch("openai.chat.completions.create", side_effect=fake_stream):
+            response = self.client.post('/summariser/pdf', headers=self.headers,
+                                        data={'file': (pdf, 'lecture.pdf')},
+                                        content_type='multipart/form-data')
+            body = response.get_data(as_text=True)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        events = parse_events(body)
+        stages = [data['stage'] for name, data in events if name == 'stage']
+        self.assertEqual(stages, ['uploaded', 'extracted', 'summarising', 'saving'])
+        self.assertEqual([data['text'] for name, data in events if name == 'token'], FAKE_SUMMARY)
+
+        name, done = events[-1]
+        self.assertEqual(name, 'done')
+        note = NoteModel(self.app).read_note(done['note_id'])
+        self.assertEqual(note['content'], "".join(FAKE_SUMMARY))
+        self.assertEqual(note['user_id'], self.username)
+
+    def test_pdf_stream_reports_errors_as_event(self):
+        pdf = self._pdf_bytes("")
+        response = self.client.post('/summariser/pdf?stream=1', headers=self.headers,
+                                    data={'file': (pdf, 'blank.pdf')},
+                                    content_type='multipart/form-data')
+        name, data = parse_events(response.get_data(as_text=True))[-1]
+        self.assertEqual(name, 'error')
+        self.assertEqual(data['error'], 'Unable to extract readable text from document')
+
+    def _leave_before_first_event(self, path, upload):
+        """Run the endpoint as a WSGI server would, then close the response without reading it"""
+        with tempfile.TemporaryDirectory() as spool:
+            self.app.config['UPLOAD_TMP_DIR'] = spool
+            environ = EnvironBuilder(path=path, method='POST', headers=self.headers,
+                                     data={'file': upload}, content_type='multipart/form-data').get_environ()
+            body = self.app.wsgi_app(environ, lambda status, headers, exc_info=None: None)
+            self.assertEqual(len(os.listdir(spool)), 1)
+            body.close()
+            return os.listdir(spool)
+
+    def test_pdf_upload_removed_when_client_leaves_early(self):
+        self.assertEqual(self._leave_before_first_event('/summariser/pdf', (self._pdf_bytes("Gone"), 'lecture.pdf')), [])
+
+    def test_audio_upload_removed_when_client_leaves_early(self):
+        self.assertEqual(self._leave_before_first_event('/whisper/audio', (io.BytesIO(b'RIFF....'), 'talk.wav')), [])
+
+    def test_audio_stream(self):
+        transcript = f"Today we talk about entropy {uuid.uuid4().hex}"
+        with mock.patch("app.services.whisper.transcribe_audio", return_value=transcript), \
+             mock.patch("openai.chat.completions.create", side_effect=fake_stream):
+            response = self.client.post('/whisper/audio', headers=self.headers,
+                                        data={'file': (io.BytesIO(b'RIFF....'), 'talk.wav')},
+                                        content_type='multipart/form-data')
+            events = parse_events(response.get_data(as_text=True))
+
+        self.assertIn(('stage', {'stage': 'transcribed', 'transcript_chars': len(transcript)}), events)
+        name, done = events[-1]
+        self.assertEqual(name, 'done')
+        self.assertEqual(NoteModel(self.app).read_note(done['note_id'])['transcript'], transcript)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+import unittest
+import uuid
+from types import SimpleNamespace
+from unittest import mock
+from app import create_app
+from app.db.db_setup import get_collection
+from app.utils.gpt_utils import gpt_summarise
+from app.utils.summary_cache import summary_cache, cache_key
+
+def fake_completion(**kwargs):
+    message = SimpleNamespace(content="Summary of: " + kwargs["messages"][0]["content"][-20:])
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+class SummaryCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.text = f"Lecture {uuid.uuid4()} about photosynthesis and light reactions."
+
+    def test_key_ignores_whitespace(self):
+        self.assertEqual(cache_key("a  b\n c", "pdf", "m"), cache_key(" a b c ", "pdf", "m"))
+        self.assertNotEqual(cache_key("a b c", "pdf", "m"), cache_key("a b c", "audio", "m"))
+
+    def test_repeat_summary_hits_cache(self):
+        with self.app.app_context(), mock.patch("openai.chat.completions.create",
+                                                side_effect=fake_completion) as create:
+            first = gpt_summarise(self.text, content_type="pdf")
+            second = gpt_summarise("  " + self.text.replace(" ", "\n"), content_type="pdf")
+            self.assertEqual(first, second)
+            self.assertEqual(create.call_count, 1)
+
+    def test_database_tier_survives_memory_clear(self):
+        with self.app.app_context(), mock.patch("openai.chat.completions.create",
+                                                side_effect=fake_completion) as create:
+            gpt_summarise(self.text, content_type="audio")
+            summary_cache.clear_memory()
+            db_hits = summary_cache.stats["db_hits"]
+            gpt_summarise(self.text, content_type="audio")
+            self.assertEqual(create.call_count, 1)
+            self.assertEqual(summary_cache.stats["db_hits"], db_hits + 1)
+
+    def test_trim_respects_max_bytes(self):
+        with self.app.app_context():
+            collection = get_collection(self.app, "summary_cache")
+            for i in range(5):
+                summary_cache.put(cache_key(f"{self.text} {i}", "pdf", "m"), "x" * 100, "pdf", "m")
+            old_limit = summary_cache.max_bytes
+            summary_cache.max_bytes = 0
+            try:
+                summary_cache.trim(collection)
+            finally:
+                summary_cache.max_bytes = old_limit
+            self.assertEqual(collection.count_documents({}), 0)
+
+    def test_database_errors_degrade_to_no_cache(self):
+        key = cache_key(self.text, "pdf", "m")
+        broken = mock.Mock(**{"find_one_and_update.side_effect": ConnectionError("down"),
+                              "update_one.side_effect": ConnectionError("down")})
+        with self.app.app_context(), mock.patch.object(summary_cache, "_collection", return_value=broken):
+            errors = summary_cache.stats["errors"]
+            self.assertIsNone(summary_cache.get(key))
+            self.assertEqual(summary_cache.stats["errors"], errors + 1)
+            summary_cache.put(key, "Summary", "pdf", "m")
+            broken.update_one.assert_called_once()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,7 +4,6 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../.
 
 import unittest
 from app.models.todo import TodoModel
-from flask import Flask
 from app import create_app
 
 class TodoModelTestCase(unittest.TestCase):
@@ -33,5 +32,15 @@ class TodoModelTestCase(unittest.TestCase):
         todos = self.todo_model.get_all_todos()  # <-- updated method name
         self.assertIsInstance(todos, list)
 
+    def test_update_is_scoped_to_owner(self):
+        todo_id = self.todo_model.create_todo({
+            'title': 'Owned', 'description': 'd', 'due_date': '2025-12-31',
+            'priority': 'High', 'status': 'Pending', 'user_id': 'owner'
+        })
+        self.assertFalse(self.todo_model.update_todo(todo_id, {'title': 'Stolen'}, user_id='intruder'))
+        self.assertTrue(self.todo_model.update_todo(todo_id, {'priority': 'low'}, user_id='owner'))
+        self.assertEqual(self.todo_model.read_todo(todo_id, user_id='owner')['priority_rank'], 3)
+        self.assertIsNone(self.todo_model.read_todo(todo_id, user_id='intruder'))
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
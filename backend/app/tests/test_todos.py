@@ -4,6 +4,8 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../.
 
 
 import unittest
+import uuid
+from datetime import date, timedelta
 from app import create_app
 
 class TodosRouteTestCase(unittest.TestCase):
@@ -12,17 +14,86 @@ class TodosRouteTestCase(unittest.TestCase):
         self.app.config['TESTING'] = True
         self.app.config["MONGO_URI"] = "mongodb://localhost:27017/Studivio"
         self.client = self.app.test_client()
+        self.headers = self._auth_headers(f"todo-{uuid.uuid4().hex[:8]}")
+
+    def _auth_headers(self, username):
+        self.client.post('/Register', json={'username': username, 'password': 'testpass'})
+        response = self.client.post('/Login', json={'username': username, 'password': 'testpass'})
+        return {'Authorization': f"Bearer {response.json['access_token']}"}
+
+    def _create(self, title, due_in_days, priority='normal', status='pending', headers=None):
+        response = self.client.post('/todos', headers=headers or self.headers, json={
+            'title': title,
+            'description': 'Something to do',
+            'due_date': (date.today() + timedelta(days=due_in_days)).isoformat(),
+            'priority': priority,
+            'status': status
+        })
+        self.assertEqual(response.status_code, 201)
+        return response.json['todo_id']
 
     def test_create_todo(self):
-        response = self.client.post('/todos', json={
+        response = self.client.post('/todos', headers=self.headers, json={
             'username': 'testuser',
             'task': 'Test Todo'
         })
         self.assertIn(response.status_code, [200, 201, 400])
 
     def test_get_todos(self):
-        response = self.client.get('/todos?username=testuser')
+        response = self.client.get('/todos?username=testuser', headers=self.headers)
         self.assertIn(response.status_code, [200, 404])
 
+    def test_todos_require_login(self):
+        self.assertEqual(self.client.get('/todos').status_code, 401)
+
+    def test_todos_are_per_user(self):
+        todo_id = self._create('Mine', 1)
+        other = self._auth_headers(f"todo-{uuid.uuid4().hex[:8]}")
+        self.assertEqual(self.client.get('/todos', headers=other).json, [])
+        self.assertEqual(self.client.get(f'/todos/{todo_id}', headers=other).status_code, 404)
+        self.assertEqual(self.client.delete(f'/todos/{todo_id}', headers=other).status_code, 404)
+        self.assertEqual(self.client.get(f'/todos/{todo_id}', headers=self.headers).status_code, 200)
+
+    def test_filters_and_sorting(self):
+        self._create('Later', 10, priority='low')
+        self._create('Soon', 2, priority='urgent')
+        self._create('Done', 1, priority='high', status='completed')
+
+        by_due = self.client.get('/todos?status=pending', headers=self.headers).json
+        self.assertEqual([todo['title'] for todo in by_due], ['Soon', 'Later'])
+
+        by_priority = self.client.get('/todos?sort=priority', headers=self.headers).json
+        self.assertEqual([todo['title'] for todo in by_priority], ['Soon', 'Done', 'Later'])
+
+        window = f'due_from={date.today().isoformat()}&due_to={(date.today() + timedelta(days=5)).isoformat()}'
+        in_range = self.client.get(f'/todos?{window}', headers=self.headers).json
+        self.assertEqual({todo['title'] for todo in in_range}, {'Soon', 'Done'})
+
+        self.assertEqual(self.client.get('/todos?sort=bogus', headers=self.headers).status_code, 400)
+        self.assertEqual(self.client.get('/todos?due_from=tomorrow', headers=self.headers).status_code, 400)
+        self.assertEqual(self.client.get('/todos?priority=bogus', headers=self.headers).status_code, 400)
+        self.assertEqual([todo['title'] for todo in self.client.get('/todos?priority=Urgent', headers=self.headers).json],
+                         ['Soon'])
+
+    def test_pagination(self):
+        for day in range(5):
+            self._create(f'Task {day}', day)
+        seen = []
+        url = '/todos?limit=2'
+        while url:
+            response = self.client.get(url, headers=self.headers)
+            seen.extend(todo['title'] for todo in response.json)
+            cursor = response.headers.get('X-Next-Cursor')
+            url = f'/todos?limit=2&after={cursor}' if cursor else None
+        self.assertEqual(seen, [f'Task {day}' for day in range(5)])
+
+    def test_agenda(self):
+        self._create('Tomorrow', 1)
+        self._create('Next month', 30)
+        self._create('Finished', 2, status='completed')
+        self._create('Overdue', -3)
+        agenda = self.client.get('/todos/agenda?days=7', headers=self.headers).json
+        self.assertEqual([todo['title'] for todo in agenda], ['Tomorrow'])
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,118 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+import wave
+from unittest import mock
+from app import create_app
+from app.utils import audio
+from app.utils.audio import Resampler, Segment, prepared_segments, split_recording
+from app.utils.transcription import FakeTranscriber, stitch, transcribe_segments
+from app.services.whisper import transcribe_audio
+
+# Stereo 44.1kHz: speech from 0.5s to 9.5s of every 10 seconds, quiet in between
+def lecture_wav(path, seconds=40, rate=44100):
+    np = audio._numpy()
+    t = np.arange(seconds * rate) / rate
+    level = np.where((t % 10 >= 0.5) & (t % 10 < 9.5), 0.5, 0.001)
+    samples = (level * 32767 * np.sin(2 * np.pi * 220 * t)).astype('<i2')
+    with wave.open(path, 'wb') as recording:
+        recording.setnchannels(2)
+        recording.setsampwidth(2)
+        recording.setframerate(rate)
+        recording.writeframes(np.repeat(samples, 2).tobytes())
+
+@unittest.skipUnless(audio._numpy() is not None, "needs numpy")
+class AudioPipelineTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'lecture.wav')
+        lecture_wav(self.path)
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.app.config.update(TRANSCRIBER_BACKEND='fake', AUDIO_SEGMENT_SECONDS=10,
+                               AUDIO_SEGMENT_SEARCH_SECONDS=3, AUDIO_SEGMENT_OVERLAP_SECONDS=3)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_resampler_has_no_seams(self):
+        np = audio._numpy()
+        tone = np.sin(2 * np.pi * 1000 * np.arange(44100) / 44100).astype(np.float32)
+        resampler = Resampler(44100, 16000)
+        pieces, start = [], 0
+        for size in (1, 7, 1000, 4410, 30000, 10000):
+            pieces.append(resampler.feed(tone[start:start + size]))
+            start += size
+        output = np.concatenate(pieces + [resampler.feed(tone[start:])])
+        self.assertLessEqual(abs(len(output) - 16000), 1)
+        crossings = np.count_nonzero(np.diff(np.signbit(output[100:-100])))
+        self.assertAlmostEqual(crossings / ((len(output) - 200) / 16000), 2000, delta=20)
+
+    def test_segments_are_mono_16k_and_cut_in_pauses(self):
+        segments = split_recording(self.path, self.directory, segment_seconds=10, search_seconds=3, overlap_seconds=1)
+        self.assertEqual(len(segments), 4)
+        for segment in segments[1:]:
+            self.assertLess(min(segment.start % 10, 10 - segment.start % 10), 0.5)
+        for previous, segment in zip(segments, segments[1:]):
+            self.assertAlmostEqual(previous.end - segment.start, 1, places=2)
+        with wave.open(segments[0].path) as first:
+            self.assertEqual((first.getnchannels(), first.getframerate(), first.getsampwidth()), (1, 16000, 2))
+        self.assertAlmostEqual(segments[-1].end, 40, places=1)
+
+    def test_long_recording_is_stitched_without_repeats(self):
+        progress = []
+        with self.app.app_context():
+            transcript = transcribe_audio(self.path, progress=lambda done, total: progress.append((done, total)))
+        self.assertEqual(transcript, " ".join(f"s{second}" for second in range(40)))
+        self.assertEqual(sorted(progress), [(1, 4), (2, 4), (3, 4), (4, 4)])
+
+    def test_other_formats_without_ffmpeg_go_as_uploaded(self):
+        mp3 = os.path.join(self.directory, 'lecture.mp3')
+        with open(mp3, 'wb') as upload:
+            upload.write(b'ID3' + b'\x00' * 100)
+        with mock.patch('app.utils.audio.shutil.which', return_value=None), \
+             prepared_segments(mp3, self.app.config) as segments:
+            self.assertEqual(segments, [Segment(0, mp3, 0.0, None)])
+
+class TranscriptionTestCase(unittest.TestCase):
+    def test_stitch_drops_the_repeated_words(self):
+        texts = ["the membrane controls what enters the cel",
+                 "enters the cell and what leaves it",
+                 "nothing in common here"]
+        self.assertEqual(stitch(texts), "the membrane controls what enters the cell and what leaves it "
+                                        "nothing in common here")
+
+    def test_pool_is_bounded_ordered_and_retries(self):
+        running, peak, failed = [0], [0], set()
+        lock = threading.Lock()
+
+        class SlowTranscriber(FakeTranscriber):
+            def transcribe(self, segment):
+                with lock:
+                    running[0] += 1
+                    peak[0] = max(peak[0], running[0])
+                time.sleep(0.02)
+                with lock:
+                    running[0] -= 1
+                    if segment.index not in failed:
+                        failed.add(segment.index)
+                        raise ConnectionError("flaky")
+                return f"part{segment.index}"
+
+        segments = [Segment(index, None, index * 10.0, index * 10.0 + 10) for index in range(6)]
+        texts = transcribe_segments(segments, SlowTranscriber(), concurrency=2, retries=1)
+        self.assertEqual(texts, [f"part{index}" for index in range(6)])
+        self.assertEqual(peak[0], 2)
+
+        failed.clear()
+        with self.assertRaises(ConnectionError):
+            transcribe_segments(segments, SlowTranscriber(), concurrency=2, retries=0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+import hashlib
+import io
+import shutil
+import tempfile
+import unittest
+from app import create_app
+from app.utils.uploads import UploadSpool, UploadRejected
+
+class UploadsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.upload_dir = tempfile.mkdtemp()
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.app.config['UPLOAD_TMP_DIR'] = self.upload_dir
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        shutil.rmtree(self.upload_dir, ignore_errors=True)
+
+    def _auth_headers(self, username='uploaduser'):
+        self.client.post('/Register', json={'username': username, 'password': 'testpass'})
+        response = self.client.post('/Login', json={'username': username, 'password': 'testpass'})
+        return {'Authorization': f"Bearer {response.json['access_token']}"}
+
+    def test_spool_hashes_and_counts(self):
+        spool = UploadSpool(self.upload_dir, max_bytes=100)
+        spool.write(b"hello ")
+        spool.write(b"world")
+        self.assertEqual(spool.size, 11)
+        self.assertEqual(spool.sha256, hashlib.sha256(b"hello world").hexdigest())
+        spool.close()
+        self.assertEqual(os.listdir(self.upload_dir), [])
+
+    def test_spool_rejects_over_limit_and_cleans_up(self):
+        spool = UploadSpool(self.upload_dir, max_bytes=10)
+        with self.assertRaises(UploadRejected):
+            spool.write(b"x" * 11)
+        self.assertEqual(os.listdir(self.upload_dir), [])
+
+    def test_oversize_pdf_rejected(self):
+        headers = self._auth_headers()
+        big = io.BytesIO(b"%PDF" + b"0" * (26 * 1024 * 1024))
+        response = self.client.post('/summariser/pdf', headers=headers,
+                                    data={'file': (big, 'big.pdf')},
+                                    content_type='multipart/form-data')
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(os.listdir(self.upload_dir), [])
+
+    def test_wrong_audio_type_rejected(self):
+        headers = self._auth_headers()
+        response = self.client.post('/whisper/audio', headers=headers,
+                                    data={'file': (io.BytesIO(b"not audio"), 'notes.txt')},
+                                    content_type='multipart/form-data')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(os.listdir(self.upload_dir), [])
+
+if __name__ == '__main__':
+    unittest.main()
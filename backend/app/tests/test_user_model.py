@@ -3,6 +3,8 @@ import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
 
 import unittest
+from unittest import mock
+from pymongo.errors import DuplicateKeyError # type: ignore
 from app.models.user import UserModel
 from flask import Flask
 
@@ -20,5 +22,11 @@ class UserModelTestCase(unittest.TestCase):
         self.user_model.create_user('modeltest', 'password')
         self.assertTrue(self.user_model.check_password('modeltest', 'password'))
 
+    def test_create_user_race_reports_existing_user(self):
+        # Both requests passed the find_one check, the unique index stops the second insert
+        with mock.patch.object(self.user_model.users, 'find_one', return_value=None), \
+             mock.patch.object(self.user_model.users, 'insert_one', side_effect=DuplicateKeyError('username_unique')):
+            self.assertFalse(self.user_model.create_user('modeltest', 'password'))
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
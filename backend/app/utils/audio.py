@@ -0,0 +1,246 @@
+"""
+    Audio preparation for transcription.
+    A recording is decoded, downmixed to mono and resampled to 16kHz 16-bit
+    PCM (a 44.1kHz stereo WAV shrinks by more than 5x), then cut into
+    segments of about AUDIO_SEGMENT_SECONDS, each cut placed at the quietest
+    moment near its target so words are rarely split. Every segment runs
+    AUDIO_SEGMENT_OVERLAP_SECONDS into the next one; stitch() in
+    app/utils/transcription.py removes the words that overlap produced twice.
+    PCM WAV is decoded with the stdlib wave module and needs no external
+    binary; other formats go through ffmpeg when it is installed. Everything
+    streams block by block, a long recording is never held in memory whole.
+"""
+
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import wave
+from collections import namedtuple
+from contextlib import contextmanager
+from app.utils.metrics import stage_timer
+
+# numpy is optional, without it recordings are sent to the transcriber as uploaded; imported on first use
+_np = None
+_numpy_missing = False
+
+logger = logging.getLogger(__name__)
+
+# start and end are seconds into the recording; end is None when the segment is the untouched upload
+Segment = namedtuple("Segment", ["index", "path", "start", "end"])
+
+# Frames read per block while decoding
+BLOCK_FRAMES = 1 << 16
+# Loudness is measured over frames this long when looking for pauses
+FRAME_SECONDS = 0.03
+# ...and smoothed over this many frames, so a cut lands in a pause, not a gap between syllables
+SMOOTH_FRAMES = 10
+
+SAMPLE_SCALE = {1: 128.0, 2: 32768.0, 3: 8388608.0, 4: 2147483648.0}
+
+
+class AudioError(Exception):
+    """The recording could not be decoded"""
+
+
+def _numpy():
+    global _np, _numpy_missing
+    if _np is None and not _numpy_missing:
+        try:
+            import numpy # type: ignore
+            _np = numpy
+        except ImportError:
+            _numpy_missing = True
+    return _np
+
+
+def _mono(data, sample_width, channels):
+    """Interleaved PCM bytes to float32 mono samples in [-1, 1]"""
+    if sample_width not in SAMPLE_SCALE:
+        raise AudioError(f"Unsupported sample width {sample_width}")
+    if sample_width == 1:
+        samples = _np.frombuffer(data, dtype=_np.uint8).astype(_np.float32) - 128.0
+    elif sample_width == 3:
+        raw = _np.frombuffer(data, dtype=_np.uint8).reshape(-1, 3).astype(_np.int32)
+        samples = (raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)).astype(_np.float32)
+        samples[samples >= 8388608.0] -= 16777216.0
+    else:
+        samples = _np.frombuffer(data, dtype=f"<i{sample_width}").astype(_np.float32)
+    samples /= SAMPLE_SCALE[sample_width]
+    return samples.reshape(-1, channels).mean(axis=1) if channels > 1 else samples
+
+
+def _pcm16(samples):
+    return (_np.clip(samples, -1.0, 1.0) * 32767.0).astype("<i2").tobytes()
+
+
+class Resampler:
+    """
+        Streaming linear resampler. Blocks go in one after another and come out
+        at the target rate with no seam between them. When downsampling, a
+        moving average runs first so frequencies the new rate cannot hold do
+        not alias into the speech band.
+    """
+
+    def __init__(self, source_rate, target_rate):
+        self.step = source_rate / target_rate
+        self.width = max(1, int(round(self.step)))
+        self.history = _np.zeros(self.width - 1, dtype=_np.float32)
+        # Input position of the next output sample, counted from the carried sample
+        self.position = 0.0
+        self.carried = None
+
+    def feed(self, samples):
+        if not len(samples):
+            return samples
+        if self.width > 1:
+            padded = _np.concatenate([self.history, samples])
+            self.history = padded[len(padded) - (self.width - 1):]
+            samples = _np.convolve(padded, _np.full(self.width, 1.0 / self.width, dtype=_np.float32), mode="valid")
+        if self.step == 1:
+            return samples
+        if self.carried is not None:
+            samples = _np.concatenate([self.carried, samples])
+        last = len(samples) - 1
+        self.carried = samples[-1:]
+        if last < self.position:
+            self.position -= last
+            return samples[:0]
+        positions = self.position + self.step * _np.arange(int((last - self.position) // self.step) + 1)
+        self.position = positions[-1] + self.step - last
+        return _np.interp(positions, _np.arange(len(samples)), samples).astype(_np.float32)
+
+
+def to_mono_wav(source, destination, rate=16000, ffmpeg=None, timeout=300):
+    """Decode source into a 16-bit mono PCM WAV at rate, returns its length in seconds"""
+    try:
+        reader = wave.open(source, "rb")
+    except (wave.Error, EOFError):
+        # Not a PCM WAV (mp3, m4a, webm, float WAV...)
+        return _ffmpeg_decode(source, destination, rate, ffmpeg, timeout)
+    try:
+        with reader, wave.open(destination, "wb") as writer:
+            writer.setnchannels(1)
+            writer.setsampwidth(2)
+            writer.setframerate(rate)
+            resampler = Resampler(reader.getframerate(), rate)
+            while True:
+                data = reader.readframes(BLOCK_FRAMES)
+                if not data:
+                    break
+                writer.writeframes(_pcm16(resampler.feed(_mono(data, reader.getsampwidth(), reader.getnchannels()))))
+            return writer.getnframes() / rate
+    except (wave.Error, EOFError, ValueError) as error:
+        raise AudioError(f"Unreadable WAV: {error}")
+
+
+def _ffmpeg_decode(source, destination, rate, ffmpeg, timeout):
+    ffmpeg = ffmpeg or shutil.which("ffmpeg")
+    if not ffmpeg:
+        raise AudioError("Not a PCM WAV file and ffmpeg is not installed")
+    command = [ffmpeg, "-nostdin", "-v", "error", "-y", "-i", source,
+               "-ac", "1", "-ar", str(rate), "-acodec", "pcm_s16le", "-f", "wav", destination]
+    try:
+        subprocess.run(command, check=True, capture_output=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        raise AudioError("ffmpeg timed out")
+    except subprocess.CalledProcessError as error:
+        raise AudioError(f"ffmpeg could not decode the recording: {error.stderr.decode(errors='replace')[-300:]}")
+    with wave.open(destination, "rb") as reader:
+        return reader.getnframes() / reader.getframerate()
+
+
+def frame_loudness(path, frame_seconds=FRAME_SECONDS):
+    """RMS loudness of each frame of a 16-bit mono WAV, and the frame length in samples"""
+    with wave.open(path, "rb") as reader:
+        size = max(1, int(reader.getframerate() * frame_seconds))
+        blocks = []
+        while True:
+            data = reader.readframes(size * 1024)
+            if not data:
+                break
+            samples = _np.frombuffer(data, dtype="<i2").astype(_np.float32)
+            samples = _np.pad(samples, (0, -len(samples) % size))
+            blocks.append(_np.sqrt(_np.mean(samples.reshape(-1, size) ** 2, axis=1)))
+    return (_np.concatenate(blocks) if blocks else _np.zeros(0, dtype=_np.float32)), size
+
+
+def find_cuts(loudness, frame_seconds, segment_seconds, search_seconds):
+    """
+        Frame indices to cut the recording at: about every segment_seconds, at
+        the quietest point within search_seconds of that target, preferring
+        the point nearest the target when several are about as quiet.
+    """
+    target = max(1, int(segment_seconds / frame_seconds))
+    search = min(target - 1, int(search_seconds / frame_seconds))
+    smooth = _np.convolve(loudness, _np.full(SMOOTH_FRAMES, 1.0 / SMOOTH_FRAMES), mode="same")
+    cuts, start = [], 0
+    # The last segment may run up to target + search rather than leave a tiny one behind
+    while len(loudness) - start > target + search:
+        low = start + target - search
+        window = smooth[low:start + target + search + 1]
+        quiet = _np.flatnonzero(window <= window.min() + 0.05 * (window.max() - window.min()))
+        cut = low + int(quiet[_np.argmin(_np.abs(quiet + low - start - target))])
+        cuts.append(cut)
+        start = cut
+    return cuts
+
+
+def split_recording(path, directory, rate=16000, segment_seconds=300, search_seconds=30, overlap_seconds=3,
+                    ffmpeg=None, ffmpeg_timeout=300):
+    """Prepare the recording at path and write its segments into directory, returns the Segments"""
+    mono = os.path.join(directory, "mono.wav")
+    to_mono_wav(path, mono, rate, ffmpeg, ffmpeg_timeout)
+    loudness, frame_size = frame_loudness(mono)
+    cuts = find_cuts(loudness, frame_size / rate, segment_seconds, search_seconds)
+    with wave.open(mono, "rb") as reader:
+        total = reader.getnframes()
+        if not cuts:
+            return [Segment(0, mono, 0.0, total / rate)]
+        bounds = [0] + [cut * frame_size for cut in cuts] + [total]
+        overlap = int(overlap_seconds * rate)
+        segments = []
+        for index, (start, end) in enumerate(zip(bounds, bounds[1:])):
+            end = min(total, end + overlap)
+            reader.setpos(start)
+            segment_path = os.path.join(directory, f"segment-{index:03d}.wav")
+            with wave.open(segment_path, "wb") as writer:
+                writer.setnchannels(1)
+                writer.setsampwidth(2)
+                writer.setframerate(rate)
+                writer.writeframes(reader.readframes(end - start))
+            segments.append(Segment(index, segment_path, start / rate, end / rate))
+    return segments
+
+
+@contextmanager
+def prepared_segments(path, config):
+    """
+        The Segments to transcribe for the recording at path; the files made
+        for them are removed on exit. Without numpy, or for a format that
+        needs ffmpeg when it is missing, the upload itself is the one segment.
+    """
+    whole = [Segment(0, path, 0.0, None)]
+    if not config.get("AUDIO_PREPROCESS_ENABLED", True) or _numpy() is None:
+        yield whole
+        return
+    directory = tempfile.mkdtemp(prefix="studivio-audio-", dir=config.get("UPLOAD_TMP_DIR") or None)
+    try:
+        try:
+            with stage_timer("audio_preprocess"):
+                segments = split_recording(
+                    path, directory,
+                    rate=config.get("AUDIO_SAMPLE_RATE", 16000),
+                    segment_seconds=config.get("AUDIO_SEGMENT_SECONDS", 300),
+                    search_seconds=config.get("AUDIO_SEGMENT_SEARCH_SECONDS", 30),
+                    overlap_seconds=config.get("AUDIO_SEGMENT_OVERLAP_SECONDS", 3),
+                    ffmpeg_timeout=config.get("AUDIO_FFMPEG_TIMEOUT_SECONDS", 300),
+                )
+        except AudioError as error:
+            logger.warning("Audio sent as uploaded", extra={"reason": str(error)})
+            segments = whole
+        yield segments
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
@@ -0,0 +1,77 @@
+import re
+
+try:
+    import tiktoken # type: ignore
+except ImportError:  # optional, a character estimate is close enough for budgeting
+    tiktoken = None
+
+"""
+    Splits long documents and transcripts into chunks that fit a token
+    budget, cutting at paragraph (and so page) boundaries where possible,
+    then at sentences, and only as a last resort in the middle of a sentence.
+"""
+
+PARAGRAPH_BREAK = re.compile(r'\n\s*\n')
+SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+_encoding = None
+
+
+def count_tokens(text):
+    global _encoding
+    if tiktoken is not None:
+        if _encoding is None:
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        return len(_encoding.encode(text, disallowed_special=()))
+    # Roughly four characters per token for English text
+    return len(text) // 4 + 1
+
+
+def _split_oversized(piece, max_tokens):
+    """Break a single paragraph that is over budget into sentences, then words"""
+    parts = []
+    for sentence in SENTENCE_END.split(piece):
+        if count_tokens(sentence) <= max_tokens:
+            parts.append(sentence)
+            continue
+        current = []
+        current_tokens = 0
+        for word in sentence.split():
+            word_tokens = count_tokens(' ' + word)
+            if current and current_tokens + word_tokens > max_tokens:
+                parts.append(' '.join(current))
+                current = []
+                current_tokens = 0
+            current.append(word)
+            current_tokens += word_tokens
+        if current:
+            parts.append(' '.join(current))
+    return parts
+
+
+def split_into_chunks(text, max_tokens):
+    """Greedily pack paragraphs into chunks of at most max_tokens"""
+    pieces = []
+    for paragraph in PARAGRAPH_BREAK.split(text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if count_tokens(paragraph) > max_tokens:
+            pieces.extend(_split_oversized(paragraph, max_tokens))
+        else:
+            pieces.append(paragraph)
+
+    chunks = []
+    current = []
+    current_tokens = 0
+    for piece in pieces:
+        piece_tokens = count_tokens(piece)
+        if current and current_tokens + piece_tokens > max_tokens:
+            chunks.append('\n\n'.join(current))
+            current = []
+            current_tokens = 0
+        current.append(piece)
+        current_tokens += piece_tokens
+    if current:
+        chunks.append('\n\n'.join(current))
+    return chunks
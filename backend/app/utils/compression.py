@@ -0,0 +1,87 @@
+import gzip
+import zlib
+from flask import request
+
+try:
+    import brotli # type: ignore
+except ImportError:  # optional, gzip is offered without it
+    brotli = None
+
+"""
+    Response compression negotiated from Accept-Encoding.
+    brotli is preferred when the brotli package is installed, gzip otherwise.
+    Streamed responses are compressed chunk by chunk as they are produced,
+    so streaming still keeps memory flat. Server-sent events are left alone,
+    a compressor would hold tokens back until its buffer fills.
+"""
+
+COMPRESSIBLE_TYPES = ("application/json", "text/plain", "text/html", "text/css", "application/javascript")
+
+
+def choose_encoding(accept_encodings):
+    """Best encoding we support from the request's Accept-Encoding, or None"""
+    offered = ["br", "gzip"] if brotli is not None else ["gzip"]
+    return accept_encodings.best_match(offered)
+
+
+def _gzip_stream(chunks, level):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk if isinstance(chunk, bytes) else chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _brotli_stream(chunks, quality):
+    compressor = brotli.Compressor(quality=quality)
+    for chunk in chunks:
+        data = compressor.process(chunk if isinstance(chunk, bytes) else chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class Compressor:
+    def __init__(self, enabled=True, min_bytes=1024, gzip_level=6, brotli_quality=5):
+        self.enabled = enabled
+        self.min_bytes = min_bytes
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def configure(self, config):
+        self.enabled = config.get("COMPRESS_ENABLED", self.enabled)
+        self.min_bytes = config.get("COMPRESS_MIN_BYTES", self.min_bytes)
+        self.gzip_level = config.get("COMPRESS_GZIP_LEVEL", self.gzip_level)
+        self.brotli_quality = config.get("COMPRESS_BROTLI_QUALITY", self.brotli_quality)
+
+    def init_app(self, app):
+        self.configure(app.config)
+        app.after_request(self.compress_response)
+
+    def compress_response(self, response):
+        if (not self.enabled or response.status_code != 200 or response.direct_passthrough
+                or "Content-Encoding" in response.headers
+                or response.mimetype not in COMPRESSIBLE_TYPES):
+            return response
+        response.vary.add("Accept-Encoding")
+        encoding = choose_encoding(request.accept_encodings)
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            chunks = response.response
+            response.response = (_brotli_stream(chunks, self.brotli_quality) if encoding == "br"
+                                 else _gzip_stream(chunks, self.gzip_level))
+            response.headers.pop("Content-Length", None)
+        else:
+            body = response.get_data()
+            if len(body) < self.min_bytes:
+                return response
+            response.set_data(brotli.compress(body, quality=self.brotli_quality) if encoding == "br"
+                              else gzip.compress(body, self.gzip_level))
+        response.headers["Content-Encoding"] = encoding
+        return response
+
+
+compressor = Compressor()
@@ -0,0 +1,154 @@
+"""
+    Local extractive summariser: picks the most central sentences of a text,
+    with no network call.
+    Sentences become L2-normalised TF-IDF vectors; their cosine
+    similarities form a graph, and TextRank (PageRank over that graph, by
+    power iteration) scores how central each sentence is. The final score
+    mixes centrality with the sentence's own TF-IDF weight, and the best
+    sentences come back in document order. Everything after tokenising is
+    NumPy array maths, so a few hundred pages take well under a second.
+"""
+
+import re
+from app.utils.search_index import tokenize
+
+# numpy is optional, without it every summary goes to the LLM; imported on first use, see _numpy()
+_np = None
+_numpy_missing = False
+
+SENTENCE_SPLIT = re.compile(r'(?<=[.!?])\s+|\n\s*\n|\n(?=\s*[-*•\d])')
+
+# Sentences shorter than this carry little content, longer ones are usually broken extraction
+MIN_SENTENCE_TOKENS = 4
+MAX_SENTENCE_CHARS = 600
+# The similarity matrix is n x n; past this, only the highest TF-IDF sentences enter the graph
+MAX_GRAPH_SENTENCES = 2500
+DAMPING = 0.85
+CENTRALITY_WEIGHT = 0.7
+
+HEADINGS = {
+    "pdf": "## Key Points",
+    "audio": "## Key Points from the Recording",
+    "youtube": "## Key Points from the Lecture",
+}
+
+
+def _numpy():
+    global _np, _numpy_missing
+    if _np is None and not _numpy_missing:
+        try:
+            import numpy # type: ignore
+            _np = numpy
+        except ImportError:
+            _numpy_missing = True
+    return _np
+
+
+def available():
+    return _numpy() is not None
+
+
+def split_sentences(text):
+    sentences = []
+    for piece in SENTENCE_SPLIT.split(text or ""):
+        # Slides and extracted tables often have no punctuation, their lines are the sentences
+        lines = piece.splitlines() if len(piece) > MAX_SENTENCE_CHARS else [piece]
+        for line in lines:
+            sentence = " ".join(line.split())
+            if sentence and len(sentence) <= MAX_SENTENCE_CHARS:
+                sentences.append(sentence)
+    return sentences
+
+
+def sentence_vectors(token_lists):
+    """
+        TF-IDF in coordinate form, never a dense sentences x vocabulary matrix:
+        (row, column, L2-normalised weight) per distinct term of each sentence,
+        plus each sentence's mean raw weight.
+    """
+    vocabulary = {}
+    rows, columns = [], []
+    for row, tokens in enumerate(token_lists):
+        for token in tokens:
+            rows.append(row)
+            columns.append(vocabulary.setdefault(token, len(vocabulary)))
+    sentences, terms = len(token_lists), max(1, len(vocabulary))
+    keys, counts = _np.unique(_np.asarray(rows, dtype=_np.int64) * terms + _np.asarray(columns, dtype=_np.int64),
+                             return_counts=True)
+    pair_rows, pair_columns = _np.divmod(keys, terms)
+
+    document_frequency = _np.bincount(pair_columns, minlength=terms)
+    idf = _np.log((1.0 + sentences) / (1.0 + document_frequency)) + 1.0
+    weights = (1.0 + _np.log(counts)) * idf[pair_columns]
+    norms = _np.sqrt(_np.bincount(pair_rows, weights * weights, minlength=sentences))
+    mean_weight = _np.bincount(pair_rows, weights, minlength=sentences) / _np.maximum(
+        _np.bincount(pair_rows, minlength=sentences), 1)
+    return pair_rows, pair_columns, (weights / norms[pair_rows]).astype(_np.float32), mean_weight
+
+
+def dense_rows(pair_rows, pair_columns, weights, keep):
+    """Dense matrix of the kept sentences, over only the terms at least two of them share"""
+    position = _np.full(pair_rows.max() + 1, -1)
+    position[keep] = _np.arange(len(keep))
+    selected = position[pair_rows] >= 0
+    rows, columns, weights = position[pair_rows[selected]], pair_columns[selected], weights[selected]
+    shared = _np.bincount(columns) >= 2
+    useful = shared[columns]
+    column_position = _np.cumsum(shared) - 1
+    matrix = _np.zeros((len(keep), max(1, int(shared.sum()))), dtype=_np.float32)
+    matrix[rows[useful], column_position[columns[useful]]] = weights[useful]
+    return matrix
+
+
+def textrank(matrix, iterations=50, tolerance=1e-6):
+    """PageRank over the cosine similarity graph of the (normalised) rows"""
+    similarity = matrix @ matrix.T
+    _np.fill_diagonal(similarity, 0.0)
+    out_weight = similarity.sum(axis=1, keepdims=True)
+    transition = _np.divide(similarity, out_weight, out=_np.zeros_like(similarity), where=out_weight > 0)
+    count = matrix.shape[0]
+    scores = _np.full(count, 1.0 / count, dtype=_np.float32)
+    for _ in range(iterations):
+        updated = (1 - DAMPING) / count + DAMPING * (transition.T @ scores)
+        if _np.abs(updated - scores).sum() < tolerance:
+            return updated
+        scores = updated
+    return scores
+
+
+def _normalise(values):
+    spread = values.max() - values.min()
+    return (values - values.min()) / spread if spread > 0 else _np.ones_like(values)
+
+
+def rank_sentences(sentences):
+    """Indices of sentences, best first"""
+    token_lists = [tokenize(sentence) for sentence in sentences]
+    candidates = _np.asarray([index for index, tokens in enumerate(token_lists) if len(tokens) >= MIN_SENTENCE_TOKENS])
+    if not len(candidates):
+        return []
+    pair_rows, pair_columns, weights, mean_weight = sentence_vectors([token_lists[index] for index in candidates])
+    keep = _np.arange(len(candidates))
+    if len(keep) > MAX_GRAPH_SENTENCES:
+        keep = _np.sort(_np.argsort(-mean_weight, kind="stable")[:MAX_GRAPH_SENTENCES])
+    centrality = textrank(dense_rows(pair_rows, pair_columns, weights, keep))
+    scores = CENTRALITY_WEIGHT * _normalise(centrality) + (1 - CENTRALITY_WEIGHT) * _normalise(mean_weight[keep])
+    return [int(candidates[keep[index]]) for index in _np.argsort(-scores, kind="stable")]
+
+
+def summarise_extractive(text, content_type="general", ratio=0.15, min_sentences=3, max_sentences=30):
+    """Markdown bullet list of the top sentences, in document order; "" if nothing usable"""
+    if _numpy() is None:
+        raise RuntimeError("The extractive summariser needs numpy")
+    sentences, seen = [], set()
+    for sentence in split_sentences(text):
+        # Repeated headers, footers and slide titles would vote for each other in the graph
+        if sentence.lower() not in seen:
+            seen.add(sentence.lower())
+            sentences.append(sentence)
+    count = min(max_sentences, max(min_sentences, int(len(sentences) * ratio)))
+    chosen = sorted(rank_sentences(sentences)[:count])
+    if not chosen:
+        return ""
+    heading = HEADINGS.get(content_type, "## Key Points")
+    return heading + "\n" + "\n".join(f"- {sentences[index]}" for index in chosen)
@@ -1,26 +1,261 @@
-import openai # type: ignore
-import os
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app, has_app_context
+from app.config import Config
+from app.utils.chunking import count_tokens, split_into_chunks
+from app.utils.summary_cache import summary_cache, cache_key
+from app.utils.metrics import stage_timer, timed_stream, Counter, register
+from app.utils.llm_client import (llm_client, Deadline, LLMEmptyResponse, LLMTimeout, LLMRateLimited,
+                                  LLMBusy, LLMUnavailable)
+from app.utils import extractive
 
-def gpt_summarise(text, content_type="general", model="gpt-4-1106-preview"):
-    """Generate summary and return as plain text"""
+logger = logging.getLogger(__name__)
+
+# Different prompts for different content types
+PROMPTS = {
+    "youtube": "Turn this YouTube transcript into structured lecture notes with clear sections: Overview, Key Concepts, Examples, and Summary. Use proper headings and bullet points.",
+    "pdf": "Turn this PDF content into organized study notes with main topics as headings, key points as bullets, and clear sections.",
+    "audio": "Turn this audio transcript into well-formatted notes with speaker identification, main topics as headings, and key points organized.",
+    "general": "Turn the transcript into structured lecture notes with sections like Overview, Key Concepts, Examples, and Summary."
+}
+
+# Map step: each chunk of a long document is condensed on its own
+CHUNK_PROMPT = "This is one section of a longer {kind}. Summarise it as concise study notes, keeping every key concept, definition and example."
+
+# Reduce step: the section notes are merged into the final summary
+REDUCE_PROMPT = "The following are notes on consecutive sections of one {kind}, in order. Merge them into a single set of notes. {instructions}"
+
+KINDS = {"youtube": "lecture transcript", "pdf": "document", "audio": "recording transcript", "general": "transcript"}
+
+# engine= for summarise(): "auto" picks extractive for short texts and when the LLM cannot answer
+ENGINES = ("auto", "llm", "extractive")
+
+# The provider is slow, down or saturated; a local summary beats an error
+FALLBACK_ERRORS = (LLMTimeout, LLMRateLimited, LLMBusy, LLMUnavailable)
+
+SUMMARIES = register(Counter(
+    "studivio_summaries_total",
+    "Summaries by engine and why it was picked (requested, short_text, llm_fallback)",
+    ("engine", "reason"),
+))
+
+# Shared by every summary in the process, so this also caps concurrent LLM calls for chunks
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _setting(key):
+    if has_app_context():
+        return current_app.config.get(key, getattr(Config, key))
+    return getattr(Config, key)
+
+
+def _chunk_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=_setting("SUMMARY_MAX_FAN_OUT"),
+                                           thread_name_prefix="summary-chunk")
+        return _executor
+
+
+def _complete(prompt, model, max_tokens, user_id=None, deadline=None):
+    with stage_timer("llm"):
+        return llm_client.complete(prompt, model, max_tokens, user_id=user_id, deadline=deadline)
+
+
+def _complete_stream(prompt, model, max_tokens, user_id=None, deadline=None):
+    """Like _complete, but yields the text as the completions API produces it"""
+    return timed_stream("llm", llm_client.stream(prompt, model, max_tokens, user_id=user_id, deadline=deadline))
+
+
+def _summarise_chunk(app, chunk, content_type, model, user_id=None, deadline=None):
+    """Map step for one chunk, cached like any other summary"""
+    def run():
+        key = cache_key(chunk, f"chunk:{content_type}", model)
+        cached = summary_cache.get(key)
+        if cached is not None:
+            return cached
+        kind = KINDS.get(content_type, KINDS["general"])
+        summary = _complete(f"{CHUNK_PROMPT.format(kind=kind)}\n\n{chunk}", model,
+                            _setting("SUMMARY_CHUNK_SUMMARY_TOKENS"), user_id, deadline)
+        if summary:
+            summary_cache.put(key, summary, f"chunk:{content_type}", model)
+        return summary
+
+    if app is None:
+        return run()
+    with app.app_context():
+        return run()
+
+
+def _map_reduce(text, content_type, model, complete=_complete, user_id=None, deadline=None):
+    """
+        Summarise a text that does not fit one prompt: split it on paragraph
+        boundaries, summarise the chunks concurrently, then merge the partial
+        summaries. Merging repeats if the partials are still over budget.
+        complete runs the final merge, _complete_stream makes it a generator.
+    """
+    chunk_tokens = _setting("SUMMARY_CHUNK_TOKENS")
+    app = current_app._get_current_object() if has_app_context() else None
+
+    while True:
+        chunks = split_into_chunks(text, chunk_tokens)
+        logger.info("Summarising in chunks", extra={"chunks": len(chunks), "content_type": content_type})
+        futures = [_chunk_executor().submit(_summarise_chunk, app, chunk, content_type, model, user_id, deadline)
+                   for chunk in chunks]
+        partials = [future.result() for future in futures]
+        if any(not partial for partial in partials):
+            raise LLMEmptyResponse("A chunk summary came back empty")
+        text = "\n\n".join(partials)
+        if count_tokens(text) <= chunk_tokens or len(chunks) == 1:
+            break
+
+    kind = KINDS.get(content_type, KINDS["general"])
+    prompt = REDUCE_PROMPT.format(kind=kind, instructions=PROMPTS.get(content_type, PROMPTS['general']))
+    return complete(f"{prompt}\n\n{text}", model, 1000, user_id, deadline)
+
+
+def gpt_summarise(text, content_type="general", model="gpt-4-1106-preview", user_id=None):
+    """
+        Generate summary and return as plain text.
+        Raises an LLMError subclass (see app/utils/llm_client.py) on failure;
+        every call for this summary shares one LLM_SUMMARY_DEADLINE_SECONDS budget.
+    """
+    # Same text, type and model means the same summary, skip the LLM call
+    key = cache_key(text, content_type, model)
+    cached = summary_cache.get(key)
+    if cached is not None:
+        return cached
+
+    deadline = Deadline(_setting("LLM_SUMMARY_DEADLINE_SECONDS"))
+    if count_tokens(text) <= _setting("SUMMARY_CHUNK_TOKENS"):
+        prompt = f"{PROMPTS.get(content_type, PROMPTS['general'])}\n\n{text}"
+        summary = _complete(prompt, model, 1000, user_id, deadline)
+    else:
+        # Too long for one prompt, latency is now that of the slowest chunk
+        summary = _map_reduce(text, content_type, model, user_id=user_id, deadline=deadline)
+    summary_cache.put(key, summary, content_type, model)
+    return summary  # Return as plain text string
+
+
+def gpt_summarise_stream(text, content_type="general", model="gpt-4-1106-preview", user_id=None):
+    """
+        Streaming gpt_summarise: yields the summary piece by piece as it is
+        generated. A cached summary comes back as a single piece. Errors are
+        LLMError subclasses, as for gpt_summarise.
+    """
+    key = cache_key(text, content_type, model)
+    cached = summary_cache.get(key)
+    if cached is not None:
+        yield cached
+        return
+
+    deadline = Deadline(_setting("LLM_SUMMARY_DEADLINE_SECONDS"))
+    if count_tokens(text) <= _setting("SUMMARY_CHUNK_TOKENS"):
+        prompt = f"{PROMPTS.get(content_type, PROMPTS['general'])}\n\n{text}"
+        pieces = _complete_stream(prompt, model, 1000, user_id, deadline)
+    else:
+        # Chunk summaries are not streamed, only the final merge is
+        pieces = _map_reduce(text, content_type, model, complete=_complete_stream, user_id=user_id, deadline=deadline)
+
+    summary = []
+    for piece in pieces:
+        summary.append(piece)
+        yield piece
+    if summary:
+        summary_cache.put(key, "".join(summary), content_type, model)
+
+
+def check_engine(engine):
+    """Error message for an engine= value this server cannot run, None if it is fine"""
+    if engine not in ENGINES:
+        return f"engine must be one of: {', '.join(ENGINES)}"
+    if engine == "extractive" and not extractive.available():
+        return "Extractive summaries are not available on this server"
+    return None
+
+
+def _summarise_locally(text, content_type, reason):
+    with stage_timer("extractive"):
+        summary = extractive.summarise_extractive(text, content_type)
+    if summary:
+        SUMMARIES.inc(engine="extractive", reason=reason)
+    return summary
+
+
+def _local_first(text, engine):
+    """Whether auto mode should skip the LLM for this text"""
+    if engine == "extractive":
+        return True
+    return (engine == "auto" and extractive.available()
+            and count_tokens(text) <= _setting("SUMMARY_LOCAL_MAX_TOKENS"))
+
+
+def _can_fall_back(engine):
+    return engine == "auto" and extractive.available() and _setting("SUMMARY_FALLBACK_ENABLED")
+
+
+def summarise(text, content_type="general", user_id=None, engine="auto"):
+    """
+        Summary of text by the LLM or the local extractive summariser
+        (app/utils/extractive.py), returns (summary, engine used).
+        "auto" summarises texts up to SUMMARY_LOCAL_MAX_TOKENS locally, and
+        falls back to the local summary when the LLM times out, is rate
+        limited, busy or down. Other LLMErrors are raised as they are.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown summary engine {engine!r}")
+    if _local_first(text, engine):
+        summary = _summarise_locally(text, content_type, "requested" if engine == "extractive" else "short_text")
+        if summary or engine == "extractive":
+            return summary, "extractive"
+    try:
+        summary = gpt_summarise(text, content_type, user_id=user_id)
+    except FALLBACK_ERRORS as error:
+        if not _can_fall_back(engine):
+            raise
+        logger.warning("LLM unavailable, using the extractive summary", extra={"kind": type(error).__name__})
+        summary = _summarise_locally(text, content_type, "llm_fallback")
+        if not summary:
+            raise
+        return summary, "extractive"
+    SUMMARIES.inc(engine="llm", reason="requested" if engine == "llm" else "auto")
+    return summary, "llm"
+
+
+def summarise_stream(text, content_type="general", user_id=None, engine="auto"):
+    """
+        Streaming summarise(): yields ("engine", name) when the engine is
+        picked, then ("text", piece) for the summary. The LLM stream only
+        falls back to the local summary before its first piece went out,
+        so the client sees a second ("engine", "extractive") in that case.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown summary engine {engine!r}")
+    if _local_first(text, engine):
+        summary = _summarise_locally(text, content_type, "requested" if engine == "extractive" else "short_text")
+        if summary or engine == "extractive":
+            yield "engine", "extractive"
+            if summary:
+                yield "text", summary
+            return
+
+    yield "engine", "llm"
+    sent = False
     try:
-        # Different prompts for different content types
-        prompts = {
-            "youtube": "Turn this YouTube transcript into structured lecture notes with clear sections: Overview, Key Concepts, Examples, and Summary. Use proper headings and bullet points.",
-            "pdf": "Turn this PDF content into organized study notes with main topics as headings, key points as bullets, and clear sections.",
-            "audio": "Turn this audio transcript into well-formatted notes with speaker identification, main topics as headings, and key points organized.",
-            "general": "Turn the transcript into structured lecture notes with sections like Overview, Key Concepts, Examples, and Summary."
-        }
-        
-        prompt = f"{prompts.get(content_type, prompts['general'])}\n\n{text}"
-        response = openai.chat.completions.create(
-            model=model,
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=1000
-        )
-        summary = response.choices[0].message.content
-        return summary  # Return as plain text string
-        
-    except Exception as e:
-        print(f"GPT summarisation error: {e}")
-        return "Failed to generate summary."
\ No newline at end of file
+        for piece in gpt_summarise_stream(text, content_type, user_id=user_id):
+            sent = True
+            yield "text", piece
+    except FALLBACK_ERRORS as error:
+        if sent or not _can_fall_back(engine):
+            raise
+        logger.warning("LLM unavailable, using the extractive summary", extra={"kind": type(error).__name__})
+        summary = _summarise_locally(text, content_type, "llm_fallback")
+        if not summary:
+            raise
+        yield "engine", "extractive"
+        yield "text", summary
+        return
+    SUMMARIES.inc(engine="llm", reason="requested" if engine == "llm" else "auto")
@@ -0,0 +1,270 @@
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument # type: ignore
+from app.db.db_setup import get_collection
+from app.utils.metrics import stage_timer, STAGE_SECONDS
+
+"""
+    Background job queue for the slow AI pipelines (PDF and audio summaries).
+    Routes call jobs.submit(...) and answer 202 straight away, a small pool of
+    worker threads runs the registered handler and records stage/progress so
+    GET /jobs/<id> can report it.
+
+    Two stores are available (JOB_QUEUE_BACKEND):
+      - "local": jobs live in this process only, nothing outside is needed
+      - "mongo": jobs live in the `jobs` collection, so they survive a restart
+        and any worker process on the same host can pick them up
+
+    Every claim hands out a new lease token, and a running job's updated_at
+    is bumped by a heartbeat while its handler runs. A job that has not been
+    heard of for JOB_STALE_SECONDS belonged to a dead worker and is claimed
+    again; the old run's writes carry its old lease and are ignored.
+"""
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+
+logger = logging.getLogger(__name__)
+
+
+class JobError(Exception):
+    """Raised by a handler to fail the job with a message that is safe to show the user"""
+
+
+class QueueFull(Exception):
+    pass
+
+
+class LocalJobStore:
+    def __init__(self, history_limit=1000):
+        self.history_limit = history_limit
+        self._jobs = OrderedDict()
+        self._pending = deque()
+        self._lock = threading.Lock()
+
+    def create(self, job):
+        with self._lock:
+            self._jobs[job["_id"]] = job
+            self._pending.append(job["_id"])
+            self._prune()
+
+    def _prune(self):
+        # Forget the oldest finished jobs once there are too many
+        finished = [job_id for job_id, job in self._jobs.items() if job["status"] in (SUCCEEDED, FAILED)]
+        for job_id in finished[:max(0, len(finished) - self.history_limit)]:
+            del self._jobs[job_id]
+
+    def claim(self, stale_seconds):
+        with self._lock:
+            if not self._pending:
+                return None
+            job = self._jobs.get(self._pending.popleft())
+            if job is None:
+                return None
+            job.update(status=RUNNING, started_at=datetime.utcnow(), updated_at=datetime.utcnow(),
+                       lease=uuid.uuid4().hex)
+            job["attempts"] = job.get("attempts", 0) + 1
+            return dict(job)
+
+    def update(self, job_id, fields, lease=None):
+        """False when the job is gone, or lease is given and no longer holds the job"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or (lease is not None and job.get("lease") != lease):
+                return False
+            job.update(fields, updated_at=datetime.utcnow())
+            return True
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def pending_count(self):
+        with self._lock:
+            return len(self._pending)
+
+
+class MongoJobStore:
+    def __init__(self, app):
+        self.collection = get_collection(app, "jobs")
+
+    def create(self, job):
+        self.collection.insert_one(job)
+
+    def claim(self, stale_seconds):
+        now = datetime.utcnow()
+        # Running jobs that stopped heart-beating belonged to a dead worker
+        stale = now - timedelta(seconds=stale_seconds)
+        return self.collection.find_one_and_update(
+            {"$or": [{"status": QUEUED}, {"status": RUNNING, "updated_at": {"$lt": stale}}]},
+            {"$set": {"status": RUNNING, "started_at": now, "updated_at": now, "lease": uuid.uuid4().hex},
+             "$inc": {"attempts": 1}},
+            sort=[("created_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    def update(self, job_id, fields, lease=None):
+        """False when the job is gone, or lease is given and no longer holds the job"""
+        query = {"_id": job_id} if lease is None else {"_id": job_id, "lease": lease}
+        result = self.collection.update_one(query, {"$set": dict(fields, updated_at=datetime.utcnow())})
+        return result.matched_count > 0
+
+    def get(self, job_id):
+        return self.collection.find_one({"_id": job_id})
+
+    def pending_count(self):
+        return self.collection.count_documents({"status": QUEUED})
+
+
+class JobQueue:
+    def __init__(self):
+        self.handlers = {}
+        self.store = None
+        self.app = None
+        self._threads = []
+        self._wakeup = threading.Event()
+        self._start_lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        self.workers = app.config.get("JOB_WORKERS", 2)
+        self.max_pending = app.config.get("JOB_MAX_PENDING", 100)
+        self.poll_seconds = app.config.get("JOB_POLL_SECONDS", 1.0)
+        self.stale_seconds = app.config.get("JOB_STALE_SECONDS", 900)
+        self.max_attempts = app.config.get("JOB_MAX_ATTEMPTS", 2)
+        if app.config.get("JOB_QUEUE_BACKEND", "local") == "mongo":
+            self.store = MongoJobStore(app)
+        else:
+            self.store = LocalJobStore(app.config.get("JOB_HISTORY_LIMIT", 1000))
+        app.extensions["job_queue"] = self
+
+    def handler(self, kind):
+        """Decorator registering the function that runs jobs of this kind"""
+        def register(func):
+            self.handlers[kind] = func
+            return func
+        return register
+
+    def submit(self, kind, user_id, payload):
+        if kind not in self.handlers:
+            raise ValueError(f"No handler registered for job kind '{kind}'")
+        if self.store.pending_count() >= self.max_pending:
+            raise QueueFull()
+        now = datetime.utcnow()
+        job = {
+            "_id": uuid.uuid4().hex,
+            "kind": kind,
+            "user_id": user_id,
+            "payload": payload,
+            "status": QUEUED,
+            "stage": "queued",
+            "progress": 0,
+            "result": None,
+            "error": None,
+            "attempts": 0,
+            "created_at": now,
+            "updated_at": now,
+        }
+        self.store.create(job)
+        self._ensure_workers()
+        self._wakeup.set()
+        return job["_id"]
+
+    def get(self, job_id):
+        return self.store.get(job_id)
+
+    def _ensure_workers(self):
+        # Threads start on first use, never in a process that is about to fork
+        with self._start_lock:
+            self._threads = [thread for thread in self._threads if thread.is_alive()]
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._work_loop, name=f"job-worker-{len(self._threads)}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _work_loop(self):
+        while True:
+            job = self.store.claim(self.stale_seconds)
+            if job is None:
+                self._wakeup.wait(self.poll_seconds)
+                self._wakeup.clear()
+                continue
+            self._run(job)
+
+    def _heartbeat(self, job_id, lease, stopped):
+        """Keeps a running job's updated_at fresh, so a long stage is not taken for a dead worker"""
+        interval = max(0.05, self.stale_seconds / 3)
+        while not stopped.wait(interval):
+            try:
+                if not self.store.update(job_id, {}, lease):
+                    logger.warning("Job lease lost", extra={"job_id": job_id})
+                    return
+            except Exception as error:
+                # A missed beat is retried, the job only goes stale after several
+                logger.warning("Job heartbeat failed", extra={"job_id": job_id, "error": str(error)})
+
+    def _run(self, job):
+        job_id, lease = job["_id"], job.get("lease")
+        if job.get("attempts", 1) > self.max_attempts:
+            self.store.update(job_id, {"status": FAILED, "error": "Processing was interrupted, please try again",
+                                       "finished_at": datetime.utcnow()}, lease)
+            return
+
+        def report(stage, progress):
+            self.store.update(job_id, {"stage": stage, "progress": progress}, lease)
+
+        if job.get("created_at") and job.get("started_at"):
+            STAGE_SECONDS.observe((job["started_at"] - job["created_at"]).total_seconds(), stage="job_queue_wait")
+
+        stopped = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(job_id, lease, stopped),
+                                     name=f"job-heartbeat-{job_id[:8]}", daemon=True)
+        heartbeat.start()
+        try:
+            with self.app.app_context(), stage_timer(f"job_{job['kind']}"):
+                result = self.handlers[job["kind"]](job, report)
+            outcome = {"status": SUCCEEDED, "stage": "done", "progress": 100, "result": result}
+        except JobError as error:
+            outcome = {"status": FAILED, "error": str(error)}
+        except Exception as error:
+            logger.exception("Job crashed", extra={"job_id": job_id, "kind": job["kind"]})
+            outcome = {"status": FAILED, "error": f"Service error: {error}"}
+        finally:
+            stopped.set()
+            heartbeat.join()
+        if not self.store.update(job_id, dict(outcome, finished_at=datetime.utcnow()), lease):
+            logger.warning("Job result dropped, another worker holds the job",
+                           extra={"job_id": job_id, "kind": job["kind"]})
+
+
+def public_job(job):
+    """The fields of a job that the owner is allowed to see"""
+    return {
+        "job_id": job["_id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "stage": job.get("stage"),
+        "progress": job.get("progress", 0),
+        "result": job.get("result"),
+        "error": job.get("error"),
+        "created_at": job["created_at"].isoformat() if job.get("created_at") else None,
+        "updated_at": job["updated_at"].isoformat() if job.get("updated_at") else None,
+    }
+
+
+def wait_for_job(job_id, timeout=30.0, interval=0.05):
+    """Block until the job finishes, used by tests and scripts"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = jobs.get(job_id)
+        if job and job["status"] in (SUCCEEDED, FAILED):
+            return job
+        time.sleep(interval)
+    return jobs.get(job_id)
+
+
+jobs = JobQueue()
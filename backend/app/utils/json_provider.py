@@ -0,0 +1,88 @@
+import json
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+from bson.objectid import ObjectId # type: ignore
+from flask import current_app, stream_with_context
+from flask.json.provider import DefaultJSONProvider
+from app.utils.metrics import stage_timer
+
+try:
+    import orjson # type: ignore
+except ImportError:  # optional, the stdlib encoder is used without it
+    orjson = None
+
+"""
+    JSON encoding for every response.
+    ObjectId becomes its hex string and datetime an ISO 8601 string, so routes
+    can hand Mongo documents straight to jsonify without rewriting them
+    first. orjson does the encoding when it is installed. json_array_stream()
+    encodes a cursor one document at a time, so a long list is never held in
+    memory as a whole.
+"""
+
+
+def _default(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (Decimal, uuid.UUID)):
+        return str(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if hasattr(value, "__html__"):
+        return str(value.__html__())
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that understands BSON types, backed by orjson when available"""
+
+    sort_keys = False
+
+    def dumps(self, obj, **kwargs):
+        with stage_timer("serialise"):
+            return self._dumps(obj, **kwargs)
+
+    def _dumps(self, obj, **kwargs):
+        if orjson is not None and not kwargs:
+            try:
+                return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+            except TypeError:
+                # e.g. integers beyond 64 bits, the stdlib encoder copes with those
+                pass
+        kwargs.setdefault("default", _default)
+        kwargs.setdefault("ensure_ascii", self.ensure_ascii)
+        kwargs.setdefault("sort_keys", self.sort_keys)
+        return json.dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+
+def init_json(app):
+    # Replaces flask_pymongo's provider, which would write ObjectId as {"$oid": ...}
+    app.json = FastJSONProvider(app)
+
+
+def json_array_stream(documents, through=None):
+    """
+        Response streaming a JSON array out of any iterable (e.g. a cursor),
+        one document at a time. through(chunks), when given, wraps the chunks
+        on their way out (NoteListCache.record keeps a copy of them).
+    """
+    dumps = current_app.json.dumps
+
+    def generate():
+        yield "["
+        first = True
+        for document in documents:
+            yield ("" if first else ",") + dumps(document)
+            first = False
+        yield "]"
+
+    chunks = through(generate()) if through else generate()
+    return current_app.response_class(stream_with_context(chunks), mimetype="application/json")
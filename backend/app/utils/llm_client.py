@@ -0,0 +1,350 @@
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from app.utils.metrics import Counter, register
+
+# The openai SDK takes most of a worker's boot time to import; it is loaded by the first call
+openai = None
+
+"""
+    Every call to the LLM provider goes through llm_client.
+      - one pooled, keep-alive HTTP client for the whole process
+      - a global and a per-user cap on calls in flight; a caller waits for a
+        slot at most LLM_QUEUE_TIMEOUT_SECONDS, then gets LLMBusy
+      - a Deadline shared by all the calls of one summary, each request's
+        timeout is whatever time the summary has left
+      - 429s, timeouts, connection errors and 5xx are retried with jittered
+        exponential backoff (Retry-After wins when the provider sends one)
+      - a circuit breaker: after LLM_BREAKER_FAILURES provider failures in a
+        row, calls fail fast with LLMUnavailable for LLM_BREAKER_RESET_SECONDS,
+        then one trial call decides whether it closes again
+    So a slow or failing provider costs each worker thread one short wait,
+    not a pile of threads stuck on sockets. Failures are LLMError subclasses.
+    The openai and httpx modules are only imported by the first call, so
+    neither slows down starting a worker.
+"""
+
+logger = logging.getLogger(__name__)
+
+LLM_CALLS = register(Counter(
+    "studivio_llm_calls_total",
+    "LLM requests by outcome (ok, retried, rate_limited, timeout, busy, circuit_open, failed)",
+    ("outcome",),
+))
+
+
+class LLMError(Exception):
+    """Base class; public_message is safe to show to the user"""
+    public_message = "Summary generation service unavailable"
+
+
+class LLMTimeout(LLMError):
+    public_message = "Summary generation took too long, please try again"
+
+
+class LLMRateLimited(LLMError):
+    public_message = "Summary generation is rate limited right now, please try again shortly"
+
+
+class LLMBusy(LLMError):
+    public_message = "Too many summaries are being generated, please try again shortly"
+
+
+class LLMUnavailable(LLMError):
+    public_message = "Summary generation service unavailable"
+
+
+class LLMRequestError(LLMError):
+    """The provider refused the request itself (4xx other than 429), retrying will not help"""
+    public_message = "Summary generation request was rejected"
+
+
+class LLMEmptyResponse(LLMError):
+    public_message = "AI summary generation unsuccessful"
+
+
+class Deadline:
+    """An absolute point in time; shared so retries and chunk calls spend one budget"""
+
+    def __init__(self, seconds):
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self):
+        return self.remaining() <= 0
+
+
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold=5, reset_seconds=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_running = False
+
+    def allow(self):
+        """False while open; once the reset time has passed, lets exactly one trial call through"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_seconds:
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning("LLM circuit opened", extra={"failures": self.failures})
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def release(self):
+        # A trial call that ended without a verdict (e.g. a bad request) lets the next one try
+        with self._lock:
+            self._trial_running = False
+
+
+def _retry_after(error):
+    response = getattr(error, "response", None)
+    try:
+        return float(response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+class LLMClient:
+    def __init__(self):
+        self.max_concurrency = 8
+        self.max_per_user = 4
+        self.queue_timeout = 30.0
+        self.request_timeout = 120.0
+        self.max_retries = 4
+        self.backoff_base = 0.5
+        self.backoff_max = 20.0
+        self.http_max_connections = 20
+        self.http_keepalive = 10
+        self.breaker = CircuitBreaker()
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._user_slots = {}   # user id -> [semaphore, callers holding or waiting]
+        self._lock = threading.Lock()
+        self._http_client = None
+        self.api_key = None
+        self.stats = {"in_flight": 0, "waiting": 0}
+
+    def configure(self, config):
+        self.max_concurrency = config.get("LLM_MAX_CONCURRENCY", self.max_concurrency)
+        self.max_per_user = config.get("LLM_MAX_CONCURRENCY_PER_USER", self.max_per_user)
+        self.queue_timeout = config.get("LLM_QUEUE_TIMEOUT_SECONDS", self.queue_timeout)
+        self.request_timeout = config.get("LLM_REQUEST_TIMEOUT_SECONDS", self.request_timeout)
+        self.max_retries = config.get("LLM_MAX_RETRIES", self.max_retries)
+        self.backoff_base = config.get("LLM_BACKOFF_BASE_SECONDS", self.backoff_base)
+        self.backoff_max = config.get("LLM_BACKOFF_MAX_SECONDS", self.backoff_max)
+        self.http_max_connections = config.get("LLM_HTTP_MAX_CONNECTIONS", self.http_max_connections)
+        self.http_keepalive = config.get("LLM_HTTP_KEEPALIVE", self.http_keepalive)
+        self.breaker.failure_threshold = config.get("LLM_BREAKER_FAILURES", self.breaker.failure_threshold)
+        self.breaker.reset_seconds = config.get("LLM_BREAKER_RESET_SECONDS", self.breaker.reset_seconds)
+        self.api_key = config.get("OPENAI_API_KEY", self.api_key)
+        with self._lock:
+            if not self.stats["in_flight"]:
+                self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        if openai is not None:
+            self._install_http_client()
+
+    def _provider(self):
+        """The openai module, imported and wired up on first use"""
+        global openai
+        if openai is None:
+            import openai as module # type: ignore
+            openai = module
+            self._install_http_client()
+        return openai
+
+    def _install_http_client(self):
+        """The module-level openai client gets one shared connection pool and no retries of its own"""
+        import httpx # type: ignore
+        with self._lock:
+            if self._http_client is None:
+                self._http_client = httpx.Client(
+                    limits=httpx.Limits(max_connections=self.http_max_connections,
+                                        max_keepalive_connections=self.http_keepalive),
+                    timeout=httpx.Timeout(self.request_timeout, connect=10.0),
+                )
+                openai.http_client = self._http_client
+            if self.api_key:
+                openai.api_key = self.api_key
+            openai.max_retries = 0
+            openai.timeout = self.request_timeout
+
+    # --- Concurrency ---
+
+    @contextmanager
+    def _slot(self, user_id, deadline):
+        wait = min(self.queue_timeout, deadline.remaining())
+        started = time.monotonic()
+        user_slot = self._acquire_user(user_id, wait) if user_id is not None else None
+        try:
+            with self._lock:
+                self.stats["waiting"] += 1
+            try:
+                got = self._slots.acquire(timeout=max(0.0, wait - (time.monotonic() - started)))
+            finally:
+                with self._lock:
+                    self.stats["waiting"] -= 1
+            if not got:
+                LLM_CALLS.inc(outcome="busy")
+                raise LLMBusy("No free LLM slot")
+            with self._lock:
+                self.stats["in_flight"] += 1
+            try:
+                yield
+            finally:
+                with self._lock:
+                    self.stats["in_flight"] -= 1
+                self._slots.release()
+        finally:
+            if user_slot is not None:
+                self._release_user(user_id)
+
+    def _acquire_user(self, user_id, wait):
+        with self._lock:
+            entry = self._user_slots.get(user_id)
+            if entry is None:
+                entry = self._user_slots[user_id] = [threading.BoundedSemaphore(self.max_per_user), 0]
+            entry[1] += 1
+        if not entry[0].acquire(timeout=wait):
+            self._forget_user(user_id)
+            LLM_CALLS.inc(outcome="busy")
+            raise LLMBusy("This user already has the maximum number of LLM calls running")
+        return entry
+
+    def _release_user(self, user_id):
+        self._user_slots[user_id][0].release()
+        self._forget_user(user_id)
+
+    def _forget_user(self, user_id):
+        with self._lock:
+            entry = self._user_slots[user_id]
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._user_slots[user_id]
+
+    # --- Calls ---
+
+    def _backoff(self, attempt, error):
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        retry_after = _retry_after(error)
+        if retry_after is not None:
+            delay = min(self.backoff_max, max(delay, retry_after))
+        return delay
+
+    def _call(self, request, deadline):
+        """Run request(timeout) with retries, backoff and the breaker; returns what it returns"""
+        self._provider()
+        attempt = 0
+        while True:
+            if deadline.expired:
+                LLM_CALLS.inc(outcome="timeout")
+                raise LLMTimeout("The summary deadline passed")
+            if not self.breaker.allow():
+                LLM_CALLS.inc(outcome="circuit_open")
+                raise LLMUnavailable("The LLM provider is failing, calls are paused")
+            try:
+                result = request(min(self.request_timeout, deadline.remaining()))
+            except openai.RateLimitError as error:
+                # The provider is up, just throttling us; does not count against the breaker
+                self.breaker.release()
+                failure, outcome, cause = LLMRateLimited(str(error)), "rate_limited", error
+            except (openai.APITimeoutError, openai.APIConnectionError, openai.InternalServerError) as error:
+                self.breaker.record_failure()
+                if isinstance(error, openai.APITimeoutError):
+                    failure, outcome, cause = LLMTimeout(str(error)), "timeout", error
+                else:
+                    failure, outcome, cause = LLMUnavailable(str(error)), "failed", error
+            except openai.APIStatusError as error:
+                self.breaker.release()
+                LLM_CALLS.inc(outcome="failed")
+                raise LLMRequestError(str(error)) from error
+            else:
+                self.breaker.record_success()
+                LLM_CALLS.inc(outcome="ok")
+                return result
+
+            delay = self._backoff(attempt, cause)
+            attempt += 1
+            if attempt > self.max_retries or delay >= deadline.remaining():
+                LLM_CALLS.inc(outcome=outcome)
+                raise failure from cause
+            LLM_CALLS.inc(outcome="retried")
+            logger.info("Retrying LLM call", extra={"attempt": attempt, "delay": round(delay, 2), "reason": outcome})
+            time.sleep(delay)
+
+    def complete(self, prompt, model, max_tokens, user_id=None, deadline=None):
+        """The whole answer as text; raises an LLMError subclass"""
+        deadline = deadline or Deadline(self.request_timeout)
+        with self._slot(user_id, deadline):
+            response = self._call(lambda timeout: openai.chat.completions.create(
+                model=model,
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=max_tokens,
+                timeout=timeout
+            ), deadline)
+        content = response.choices[0].message.content if response.choices else None
+        if not content:
+            raise LLMEmptyResponse("The LLM returned an empty answer")
+        return content
+
+    def stream(self, prompt, model, max_tokens, user_id=None, deadline=None):
+        """
+            Yields the answer as it is generated. Only opening the stream is
+            retried; a failure after text went out is raised as it is.
+        """
+        deadline = deadline or Deadline(self.request_timeout)
+        with self._slot(user_id, deadline):
+            stream = self._call(lambda timeout: openai.chat.completions.create(
+                model=model,
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=max_tokens,
+                stream=True,
+                timeout=timeout
+            ), deadline)
+            try:
+                for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        yield delta
+            except openai.APITimeoutError as error:
+                raise LLMTimeout(str(error)) from error
+            except openai.OpenAIError as error:
+                raise LLMUnavailable(str(error)) from error
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats, users_waiting_or_running=len(self._user_slots),
+                        max_concurrency=self.max_concurrency, max_per_user=self.max_per_user,
+                        breaker=self.breaker.state, consecutive_failures=self.breaker.failures)
+
+
+llm_client = LLMClient()
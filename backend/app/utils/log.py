@@ -0,0 +1,89 @@
+import json
+import logging
+import random
+import sys
+import time
+from flask import g, has_request_context, request
+
+"""
+    Logging setup for the app.
+    Modules log through `logging.getLogger(__name__)`, with any structured
+    fields passed as `extra={...}`; they come out as one JSON object per line
+    (LOG_FORMAT=text for a console-friendly line instead).
+    Below WARNING, request-path records are sampled: each request is kept or
+    dropped as a whole, with probability LOG_SAMPLE_RATE, so a sampled request
+    still tells its full story. Warnings, errors and anything logged outside a
+    request (startup, job workers) always get through.
+"""
+
+# Attributes every LogRecord has; anything else on a record came from extra={...}
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+_HANDLER_NAME = "studivio"
+
+
+def record_fields(record):
+    fields = {key: value for key, value in vars(record).items() if key not in _RESERVED}
+    if has_request_context():
+        fields.setdefault("method", request.method)
+        fields.setdefault("path", request.path)
+    return fields
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(record_fields(record))
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s: %(message)s")
+
+    def format(self, record):
+        line = super().format(record)
+        fields = record_fields(record)
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+
+class RequestSampler(logging.Filter):
+    def __init__(self, rate=1.0):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or self.rate >= 1.0 or not has_request_context():
+            return True
+        sampled = g.get("log_sampled")
+        if sampled is None:
+            sampled = g.log_sampled = random.random() < self.rate
+        return sampled
+
+
+def configure_logging(config):
+    """Attach one handler to the `app` logger; calling it again only updates level and rate"""
+    logger = logging.getLogger("app")
+    logger.setLevel(str(config.get("LOG_LEVEL", "INFO")).upper())
+    logger.propagate = False
+
+    handler = next((h for h in logger.handlers if h.get_name() == _HANDLER_NAME), None)
+    if handler is None:
+        handler = logging.StreamHandler(sys.stderr)
+        handler.set_name(_HANDLER_NAME)
+        handler.addFilter(RequestSampler())
+        logger.addHandler(handler)
+    handler.setFormatter(TextFormatter() if config.get("LOG_FORMAT", "json") == "text" else JSONFormatter())
+    for log_filter in handler.filters:
+        if isinstance(log_filter, RequestSampler):
+            log_filter.rate = float(config.get("LOG_SAMPLE_RATE", 1.0))
+    return logger
@@ -0,0 +1,171 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from flask import g, request
+
+"""
+    Request and per-stage latency histograms, exposed in the Prometheus text
+    format at /metrics.
+    Every request is timed from before_request until its body has been sent,
+    so streamed and SSE responses count in full. Inside a request (or a job)
+    `with stage_timer("pdf_extract"):` times one step: upload, PDF
+    extraction, transcription, LLM call, DB insert, serialisation.
+"""
+
+# Seconds; wide enough for sub-millisecond cache hits and minute-long summaries
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in list(zip(names, values)) + list(extra)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._series = {}   # label values -> [bucket counts..., sum, count]
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        position = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            if position < len(self.buckets):
+                series[position] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def samples(self):
+        with self._lock:
+            series = {key: list(values) for key, values in self._series.items()}
+        lines = []
+        for key, values in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_label_text(self.labelnames, key, [('le', repr(float(bound)))])} {cumulative}")
+            lines.append(f"{self.name}_bucket{_label_text(self.labelnames, key, [('le', '+Inf')])} {values[-1]}")
+            lines.append(f"{self.name}_sum{_label_text(self.labelnames, key)} {values[-2]}")
+            lines.append(f"{self.name}_count{_label_text(self.labelnames, key)} {values[-1]}")
+        return lines
+
+    def render(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"] + self.samples()
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"] + [
+            f"{self.name}{_label_text(self.labelnames, key)} {value}" for key, value in values
+        ]
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+
+REQUEST_SECONDS = Histogram(
+    "studivio_http_request_duration_seconds",
+    "Time from the start of a request until its response body was sent",
+    ("method", "endpoint", "status"),
+)
+STAGE_SECONDS = Histogram(
+    "studivio_stage_duration_seconds",
+    "Time spent in one processing stage (upload, pdf_extract, transcription, llm, db_insert, serialise...)",
+    ("stage",),
+)
+STAGE_ERRORS = Counter(
+    "studivio_stage_errors_total",
+    "Stages that ended with an exception",
+    ("stage",),
+)
+
+REGISTRY = [REQUEST_SECONDS, STAGE_SECONDS, STAGE_ERRORS]
+
+
+def register(metric):
+    """Add a metric defined elsewhere to /metrics"""
+    REGISTRY.append(metric)
+    return metric
+
+
+@contextmanager
+def stage_timer(stage):
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        STAGE_ERRORS.inc(stage=stage)
+        raise
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage=stage)
+
+
+def timed_stream(stage, chunks):
+    """Time a generator from its first to its last item, e.g. a streamed LLM answer"""
+    with stage_timer(stage):
+        yield from chunks
+
+
+def render():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def reset():
+    for metric in REGISTRY:
+        metric.reset()
+
+
+def init_app(app):
+    """Time every request; the observation is made once the body has been sent"""
+    if not app.config.get("METRICS_ENABLED", True):
+        return
+
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def observe_request(response):
+        started = g.get("request_started")
+        if started is None:
+            return response
+        # The route pattern, not the path, so note ids do not explode the label set
+        endpoint = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        method, status = request.method, response.status_code
+        response.call_on_close(lambda: REQUEST_SECONDS.observe(
+            time.perf_counter() - started, method=method, endpoint=endpoint, status=status))
+        return response
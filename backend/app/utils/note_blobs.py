@@ -0,0 +1,168 @@
+import hashlib
+import logging
+import zlib
+from datetime import datetime
+from bson.binary import Binary # type: ignore
+from bson.objectid import ObjectId # type: ignore
+from app.db.db_setup import get_collection
+from app.utils.metrics import stage_timer
+
+try:
+    import zstandard # type: ignore
+except ImportError:  # optional, zlib is used without it
+    zstandard = None
+
+"""
+    Large note fields (a long summary, a voice note's transcript) are kept
+    compressed in `note_blobs` instead of inline in `notes`, so listing a
+    user's notes does not drag megabytes of text through the working set.
+    The note keeps a short preview of the field plus a stub under
+    blobs.<field>: {blob_id, codec, chars, size, stored_size, sha256}.
+    Opening one note loads its blobs back (hydrate), checking the checksum.
+    Blobs are immutable: a new value is a new blob, and the old one is
+    pruned once the note points at the new one, so a failed or foreign
+    write never damages the blob a note already uses.
+    Every value stays far below MongoDB's 16MB document limit, so a plain
+    collection is enough, no GridFS chunking.
+"""
+
+logger = logging.getLogger(__name__)
+
+OFFLOADED_FIELDS = ("content", "transcript")
+
+# What the note keeps inline of an offloaded field
+PREVIEW_CHARS = 300
+
+
+class BlobIntegrityError(Exception):
+    pass
+
+
+# What reading a damaged blob can raise
+DECODE_ERRORS = (BlobIntegrityError, zlib.error, UnicodeDecodeError) + (
+    (zstandard.ZstdError,) if zstandard is not None else ())
+
+
+def compress(data, level=None):
+    """(codec, compressed bytes); zstd when the zstandard package is installed"""
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=level or 3).compress(data)
+    return "zlib", zlib.compress(data, level or 6)
+
+
+def decompress(codec, data):
+    if codec == "zstd":
+        if zstandard is None:
+            raise BlobIntegrityError("Blob is zstd compressed but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == "zlib":
+        return zlib.decompress(data)
+    if codec == "none":
+        return bytes(data)
+    raise BlobIntegrityError(f"Unknown blob codec {codec!r}")
+
+
+def preview(text):
+    return text if len(text) <= PREVIEW_CHARS else text[:PREVIEW_CHARS].rstrip() + "…"
+
+
+class NoteBlobStore:
+    def __init__(self, app):
+        self.blobs = get_collection(app, "note_blobs")
+        self.enabled = app.config.get("NOTE_BLOBS_ENABLED", True)
+        self.threshold = app.config.get("NOTE_BLOB_THRESHOLD_BYTES", 16 * 1024)
+        self.level = app.config.get("NOTE_BLOB_COMPRESSION_LEVEL")
+
+    def split(self, note_id, user_id, fields):
+        """
+            For a note about to be written: (fields as the note stores them,
+            {field: stub} for what was offloaded, blob documents to save).
+            Nothing is written here, see save().
+        """
+        stored, stubs, documents = dict(fields), {}, []
+        if not self.enabled:
+            return stored, stubs, documents
+        for field in OFFLOADED_FIELDS:
+            value = fields.get(field)
+            if not isinstance(value, str):
+                continue
+            raw = value.encode("utf-8")
+            if len(raw) < self.threshold:
+                continue
+            codec, data = compress(raw, self.level)
+            stub = {"codec": codec, "chars": len(value), "size": len(raw), "stored_size": len(data),
+                    "sha256": hashlib.sha256(raw).hexdigest()}
+            document = dict(stub, _id=ObjectId(), note_id=ObjectId(note_id), user_id=user_id, field=field,
+                            data=Binary(data), created_at=datetime.utcnow())
+            documents.append(document)
+            stubs[field] = dict(stub, blob_id=document["_id"])
+            stored[field] = preview(value)
+        return stored, stubs, documents
+
+    def save(self, documents):
+        if documents:
+            with stage_timer("blob_write"):
+                self.blobs.insert_many(documents, ordered=False)
+
+    def discard(self, documents):
+        """Blobs saved for a write that did not happen"""
+        if documents:
+            self.blobs.delete_many({"_id": {"$in": [document["_id"] for document in documents]}})
+
+    def prune(self, note_fields, keep=()):
+        """
+            Drop a note's superseded blobs. note_fields is [(note id, fields
+            that were written)], keep the blob ids the notes now point at.
+        """
+        clauses = [{"note_id": ObjectId(note_id), "field": {"$in": list(fields)}}
+                   for note_id, fields in note_fields if fields]
+        if not clauses:
+            return
+        query = {"$or": clauses}
+        if keep:
+            query["_id"] = {"$nin": list(keep)}
+        try:
+            self.blobs.delete_many(query)
+        except Exception as e:
+            # An orphan blob only costs space, the note no longer points at it
+            logger.warning("Error pruning note blobs", extra={"error": str(e)})
+
+    def remove_notes(self, note_ids):
+        if note_ids:
+            self.blobs.delete_many({"note_id": {"$in": [ObjectId(note_id) for note_id in note_ids]}})
+
+    def hydrate(self, note):
+        """
+            Put the full text of every offloaded field back into note, in
+            place, and drop the stubs. A missing or corrupt blob is logged and
+            leaves that field as its preview, with its stub.
+        """
+        stubs = note.get("blobs") if note else None
+        if not stubs:
+            if note is not None:
+                note.pop("blobs", None)
+            return note
+        with stage_timer("blob_read"):
+            found = {blob["_id"]: blob for blob in self.blobs.find(
+                {"_id": {"$in": [stub["blob_id"] for stub in stubs.values()]}})}
+        remaining = {}
+        for field, stub in stubs.items():
+            try:
+                note[field] = self._decode(found.get(stub["blob_id"]), stub)
+            except DECODE_ERRORS as e:
+                logger.error("Unreadable note blob", extra={"note_id": str(note.get("_id")), "field": field,
+                                                            "error": str(e)})
+                remaining[field] = stub
+        if remaining:
+            note["blobs"] = remaining
+        else:
+            note.pop("blobs", None)
+        return note
+
+    def _decode(self, blob, stub):
+        if blob is None:
+            raise BlobIntegrityError("Blob is missing")
+        raw = decompress(blob["codec"], blob["data"])
+        if hashlib.sha256(raw).hexdigest() != stub["sha256"]:
+            raise BlobIntegrityError("Blob checksum mismatch")
+        return raw.decode("utf-8")
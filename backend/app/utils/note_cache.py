@@ -0,0 +1,112 @@
+import hashlib
+import threading
+from app.utils.revocation_cache import TTLCache
+
+"""
+    Read caching for the notes list.
+    Every write to a user's notes bumps that user's version in the
+    note_versions collection (NoteModel does it, so the notes routes and the
+    summariser/whisper jobs are all covered). GET /notes reads only that one
+    small document: the version is the list's ETag, so a poll that already
+    has it gets a 304 without a single note being read, and anything else is
+    served from the serialised responses kept here until the version moves.
+    The whole, unpaginated list is still streamed off the cursor; record()
+    keeps a copy of the bytes as they go out and caches them once the list
+    is complete, unless it grew past NOTE_LIST_CACHE_MAX_BYTES.
+"""
+
+
+def list_etag(user_id, version, last_modified, query):
+    """ETag for one user's list at one version, for one set of query args"""
+    stamp = last_modified.isoformat() if last_modified else ""
+    raw = f"{user_id}\0{version}\0{stamp}\0{query}".encode("utf-8")
+    return hashlib.sha256(raw).hexdigest()[:32]
+
+
+class NoteListCache:
+    def __init__(self, enabled=True, size=2000, ttl=300, max_bytes=1024 * 1024):
+        self.enabled = enabled
+        self.max_bytes = max_bytes
+        self._entries = TTLCache(size, ttl, on_evict=self._forget)
+        # user id -> the query strings cached for that user, so invalidate() touches only those
+        self._keys = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "not_modified": 0, "invalidations": 0}
+
+    def configure(self, config):
+        self.enabled = config.get("NOTE_LIST_CACHE_ENABLED", self.enabled)
+        self.max_bytes = config.get("NOTE_LIST_CACHE_MAX_BYTES", self.max_bytes)
+        with self._lock:
+            self._entries = TTLCache(
+                config.get("NOTE_LIST_CACHE_SIZE", self._entries.max_size),
+                config.get("NOTE_LIST_CACHE_TTL_SECONDS", self._entries.ttl),
+                on_evict=self._forget,
+            )
+            self._keys = {}
+
+    def _forget(self, key):
+        # Called by the TTLCache with self._lock already held
+        user_id, query = key
+        queries = self._keys.get(user_id)
+        if queries is not None:
+            queries.discard(query)
+            if not queries:
+                del self._keys[user_id]
+
+    def get(self, user_id, query, version):
+        """The cached (body, headers) for this list, if it was built at this version"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get((user_id, query))
+        if entry is None or entry[0] != version:
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        return entry[1], entry[2]
+
+    def put(self, user_id, query, version, body, headers):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries.set((user_id, query), (version, body, dict(headers)))
+            self._keys.setdefault(user_id, set()).add(query)
+
+    def record(self, user_id, query, version, chunks):
+        """Pass a streamed list's chunks through, caching the whole body if it completes and is small enough"""
+        if not self.enabled:
+            yield from chunks
+            return
+        body, size = [], 0
+        for chunk in chunks:
+            yield chunk
+            if body is not None:
+                data = chunk if isinstance(chunk, bytes) else chunk.encode("utf-8")
+                size += len(data)
+                body.append(data)
+                if size > self.max_bytes:
+                    body = None
+        # Not reached when the client goes away mid-list, a partial body is never cached
+        if body is not None:
+            self.put(user_id, query, version, b"".join(body), {})
+
+    def invalidate(self, user_id):
+        """Drop this process's copies of a user's lists, other processes notice the new version"""
+        with self._lock:
+            for query in self._keys.pop(user_id, ()):
+                self._entries.pop((user_id, query))
+        self.stats["invalidations"] += 1
+
+    def not_modified(self):
+        self.stats["not_modified"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys = {}
+
+    def snapshot(self):
+        return dict(self.stats, entries=len(self._entries), enabled=self.enabled)
+
+
+note_list_cache = NoteListCache()
@@ -0,0 +1,88 @@
+"""
+    Edits to a note's text sent as changes rather than the whole text, so an
+    autosave costs as much as the edit. Two forms, both applied to the text as
+    it was at the revision the client started from:
+      - "delta": a Quill change delta, {"ops": [{"retain": n}, {"insert": "text"}, {"delete": n}]};
+        whatever the ops do not reach is kept, as in Quill
+      - "diff": splices [[offset, deleted, "inserted"], ...], sorted, each
+        offset counted in the original text
+    Offsets and lengths count UTF-16 code units, like JavaScript string
+    indices and Quill do (an emoji is 2). Formatting attributes are ignored,
+    notes are plain text.
+"""
+
+PATCH_FORMATS = ("delta", "diff")
+
+
+class PatchError(ValueError):
+    pass
+
+
+def utf16_length(text):
+    return len(text.encode("utf-16-le")) // 2
+
+
+def _decode(units):
+    try:
+        return bytes(units).decode("utf-16-le")
+    except UnicodeDecodeError:
+        raise PatchError("Patch splits a character in two")
+
+
+def _count(value, what):
+    if not isinstance(value, int) or isinstance(value, bool) or value < 0:
+        raise PatchError(f"{what} must be a non-negative integer")
+    return value
+
+
+def apply_delta(text, delta):
+    ops = delta.get("ops") if isinstance(delta, dict) else None
+    if not isinstance(ops, list):
+        raise PatchError('delta must be {"ops": [...]}')
+    source, result, position = text.encode("utf-16-le"), bytearray(), 0
+    for op in ops:
+        if not isinstance(op, dict):
+            raise PatchError("Every delta op must be an object")
+        if "insert" in op:
+            if not isinstance(op["insert"], str):
+                raise PatchError("Only text can be inserted")
+            result += op["insert"].encode("utf-16-le")
+        elif "retain" in op or "delete" in op:
+            kind = "retain" if "retain" in op else "delete"
+            end = position + 2 * _count(op[kind], kind)
+            if end > len(source):
+                raise PatchError("Delta reaches past the end of the note")
+            if kind == "retain":
+                result += source[position:end]
+            position = end
+        else:
+            raise PatchError("Delta ops are insert, retain or delete")
+    result += source[position:]
+    return _decode(result)
+
+
+def apply_diff(text, splices):
+    if not isinstance(splices, list):
+        raise PatchError("diff must be a list of [offset, deleted, inserted] splices")
+    source, result, position = text.encode("utf-16-le"), bytearray(), 0
+    for splice in splices:
+        if not isinstance(splice, list) or len(splice) != 3 or not isinstance(splice[2], str):
+            raise PatchError("Every splice must be [offset, deleted, inserted]")
+        start = 2 * _count(splice[0], "offset")
+        end = start + 2 * _count(splice[1], "deleted")
+        if start < position:
+            raise PatchError("Splices must be sorted and must not overlap")
+        if end > len(source):
+            raise PatchError("Diff reaches past the end of the note")
+        result += source[position:start] + splice[2].encode("utf-16-le")
+        position = end
+    result += source[position:]
+    return _decode(result)
+
+
+def apply_patch(text, patch_format, patch):
+    if patch_format == "delta":
+        return apply_delta(text, patch)
+    if patch_format == "diff":
+        return apply_diff(text, patch)
+    raise PatchError(f"Patch format must be one of {', '.join(PATCH_FORMATS)}")
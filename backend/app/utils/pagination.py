@@ -0,0 +1,85 @@
+import base64
+import json
+import re
+from bson.objectid import ObjectId # type: ignore
+
+"""
+    Helpers for keyset (cursor) pagination and field projection.
+    A cursor is an opaque, url-safe token that remembers the sort key and _id
+    of the last document on a page, so the next page is a range scan on the
+    index instead of a skip().
+"""
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+FIELD_NAME = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+
+class PaginationError(ValueError):
+    pass
+
+
+def encode_cursor(doc, sort_field="created_at"):
+    payload = json.dumps({"k": doc.get(sort_field), "i": str(doc["_id"])}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return payload["k"], ObjectId(payload["i"])
+    except Exception:
+        raise PaginationError("Invalid cursor")
+
+
+def encode_offset(offset):
+    """Cursor for ranked results (e.g. search), where there is no stable sort key to resume from"""
+    return base64.urlsafe_b64encode(json.dumps({"o": offset}).encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_offset(token):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        offset = int(json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))["o"])
+    except Exception:
+        raise PaginationError("Invalid cursor")
+    if offset < 0:
+        raise PaginationError("Invalid cursor")
+    return offset
+
+
+def keyset_filter(token, sort_field="created_at"):
+    """Filter for documents after the cursor, for a (sort_field desc, _id desc) sort"""
+    key, last_id = decode_cursor(token)
+    return {"$or": [
+        {sort_field: {"$lt": key}},
+        {sort_field: key, "_id": {"$lt": last_id}},
+    ]}
+
+
+def parse_limit(value, default=None):
+    if value is None or value == '':
+        return default
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        raise PaginationError("limit must be a number")
+    if limit < 1:
+        raise PaginationError("limit must be at least 1")
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def parse_fields(value, always=("_id",)):
+    """Turn ?fields=title,created_at into a projection, None means all fields"""
+    if not value:
+        return None
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    for field in fields:
+        if not FIELD_NAME.match(field):
+            raise PaginationError(f"Invalid field: {field}")
+    projection = {field: 1 for field in fields}
+    for field in always:
+        projection[field] = 1
+    return projection
@@ -0,0 +1,178 @@
+import logging
+import math
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+import bcrypt # type: ignore
+
+"""
+    bcrypt hashing and verification off the request thread.
+    Work goes to a small process pool, so a burst of sign-ups or logins keeps
+    those CPUs busy instead of the web workers. At most max_pending hashes
+    may be queued or running; past that HasherBusy is raised and the route
+    answers 503 instead of letting requests pile up. Hashes are the same
+    $2b$ strings flask_bcrypt wrote, so existing passwords keep working.
+    The cost is BCRYPT_LOG_ROUNDS if set, otherwise calibrated once per process
+    so one hash takes about BCRYPT_TARGET_MS on this machine. Calibration runs
+    on a background thread started by the first use of rounds in each process
+    (never by configure(), create_app() must start no thread before gunicorn
+    forks); hashes made before it finishes use BCRYPT_MIN_ROUNDS. Logins with a hash cheaper than the
+    current cost get it upgraded (see UserModel.check_password).
+"""
+
+
+logger = logging.getLogger(__name__)
+
+
+class HasherBusy(Exception):
+    pass
+
+
+def _hash(password, rounds):
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds)).decode("utf-8")
+
+
+def _verify(password, hashed):
+    return bcrypt.checkpw(password, hashed)
+
+
+def hash_rounds(hashed):
+    """The cost a stored hash was made with, e.g. 12 for $2b$12$..."""
+    try:
+        return int(hashed.split("$")[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+def calibrate(target_ms, min_rounds, max_rounds, samples=3):
+    """Highest cost whose hash stays under target_ms here; each extra round doubles the time"""
+    fastest = min(
+        _timed_hash(min_rounds) for _ in range(samples)
+    )
+    extra = math.floor(math.log2(max(target_ms / 1000.0, fastest) / fastest))
+    return max(min_rounds, min(max_rounds, min_rounds + extra))
+
+
+def _timed_hash(rounds):
+    started = time.perf_counter()
+    _hash(b"calibration", rounds)
+    return max(time.perf_counter() - started, 1e-6)
+
+
+class PasswordHasher:
+    def __init__(self):
+        self.workers = min(4, os.cpu_count() or 1)
+        self.max_pending = 64
+        self.timeout = 10.0
+        self.fixed_rounds = None
+        self.target_ms = 250.0
+        self.min_rounds = 10
+        self.max_rounds = 16
+        self._rounds = None
+        # Bumped by configure(), so a calibration started under older settings is discarded
+        self._generation = 0
+        self._calibrating_pid = None
+        self._pool = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.stats = {"hashed": 0, "verified": 0, "rejected_busy": 0, "rehashed": 0}
+
+    def configure(self, config):
+        self.workers = config.get("PASSWORD_HASH_WORKERS", self.workers)
+        self.max_pending = config.get("PASSWORD_HASH_MAX_PENDING", self.max_pending)
+        self.timeout = config.get("PASSWORD_HASH_TIMEOUT_SECONDS", self.timeout)
+        self.fixed_rounds = config.get("BCRYPT_LOG_ROUNDS", self.fixed_rounds)
+        self.target_ms = config.get("BCRYPT_TARGET_MS", self.target_ms)
+        self.min_rounds = config.get("BCRYPT_MIN_ROUNDS", self.min_rounds)
+        self.max_rounds = config.get("BCRYPT_MAX_ROUNDS", self.max_rounds)
+        with self._lock:
+            self._rounds = None
+            self._generation += 1
+            self._calibrating_pid = None
+
+    def _start_calibration(self):
+        # Called with self._lock held; once per process, a forked worker does not inherit the thread
+        if self._calibrating_pid == os.getpid():
+            return
+        self._calibrating_pid = os.getpid()
+        threading.Thread(target=self._calibrate, args=(self._generation,),
+                         name="bcrypt-calibrate", daemon=True).start()
+
+    def _calibrate(self, generation):
+        rounds = calibrate(self.target_ms, self.min_rounds, self.max_rounds)
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._rounds = rounds
+        logger.info("bcrypt cost calibrated", extra={"rounds": rounds, "target_ms": self.target_ms})
+
+    @property
+    def rounds(self):
+        """Cost used for new hashes, the floor until calibration is done"""
+        if self.fixed_rounds:
+            return self.fixed_rounds
+        if self._rounds is None:
+            with self._lock:
+                self._start_calibration()
+            return self._rounds or self.min_rounds
+        return self._rounds
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                # spawn: request threads are running, forking them is unsafe
+                self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+            return self._pool
+
+    def _run(self, function, *args):
+        if not self.workers:
+            return function(*args)
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.stats["rejected_busy"] += 1
+                raise HasherBusy()
+            self._pending += 1
+        try:
+            future = self._executor().submit(function, *args)
+        except BaseException:
+            self._release()
+            raise
+        # Released when the hash really finishes: after a timeout it still occupies a pool process
+        future.add_done_callback(self._release)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            raise HasherBusy()
+
+    def _release(self, future=None):
+        with self._lock:
+            self._pending -= 1
+
+    def hash(self, password):
+        hashed = self._run(_hash, password.encode("utf-8"), self.rounds)
+        self.stats["hashed"] += 1
+        return hashed
+
+    def verify(self, password, hashed):
+        if not password or not hashed:
+            return False
+        self.stats["verified"] += 1
+        try:
+            return self._run(_verify, password.encode("utf-8"), hashed.encode("utf-8"))
+        except ValueError:
+            # Not a bcrypt hash at all
+            return False
+
+    def needs_rehash(self, hashed):
+        current = hash_rounds(hashed)
+        return current is None or current < self.rounds
+
+    def snapshot(self):
+        return dict(self.stats, pending=self._pending, rounds=self._rounds or self.fixed_rounds,
+                    workers=self.workers, max_pending=self.max_pending)
+
+
+password_hasher = PasswordHasher()
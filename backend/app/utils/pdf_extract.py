@@ -0,0 +1,131 @@
+import multiprocessing
+import os
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from app.utils.uploads import mapped_file
+
+"""
+    PDF text extraction spread over a process pool.
+    Pages are split into contiguous ranges, each range is extracted in its
+    own process, and iter_pages() yields the results page by page in
+    document order as soon as each range is done. Small documents are
+    extracted inline, where starting processes would cost more than it saves.
+    PyPDF2 is imported by the first extraction, not when a worker boots.
+"""
+
+# index is 0-based, seconds is the time spent in extract_text for that page
+PageText = namedtuple("PageText", ["index", "text", "seconds", "error"])
+
+
+class PageRangeError(ValueError):
+    pass
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _process_pool(workers):
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: the job workers calling this are threads, forking them is unsafe
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def parse_page_range(value):
+    """
+        '1-20' or '1,3,5-8' (1-based, inclusive) to sorted, merged [start, end)
+        pairs of 0-based page indices. Kept as pairs until the page count is
+        known (see page_indices), so pages=1-200000000 costs no more than 1-20.
+    """
+    if not value:
+        return None
+    ranges = []
+    try:
+        for part in value.split(','):
+            part = part.strip()
+            if '-' in part:
+                start, end = (int(bound) for bound in part.split('-', 1))
+            else:
+                start = end = int(part)
+            if start < 1 or end < start:
+                raise ValueError
+            ranges.append((start - 1, end))
+    except ValueError:
+        raise PageRangeError("pages must look like 1-20 or 1,3,5-8")
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def page_indices(page_ranges, total_pages):
+    """The 0-based indices page_ranges selects in a document of total_pages, all of them without ranges"""
+    if not page_ranges:
+        return list(range(total_pages))
+    return [index for start, end in page_ranges for index in range(start, min(end, total_pages))]
+
+
+def _reader(source):
+    import PyPDF2 # type: ignore
+    return PyPDF2.PdfReader(source)
+
+
+def _extract_pages(reader, indices):
+    results = []
+    for index in indices:
+        started = time.perf_counter()
+        try:
+            text = reader.pages[index].extract_text() or ""
+            error = None
+        except Exception as extraction_error:
+            text, error = "", str(extraction_error)
+        results.append(PageText(index, text, time.perf_counter() - started, error))
+    return results
+
+
+def _extract_range(path, indices):
+    """Runs in a pool process, so it opens its own reader"""
+    with mapped_file(path) as view:
+        return _extract_pages(_reader(view), indices)
+
+
+def _split(indices, parts):
+    size = max(1, -(-len(indices) // parts))
+    return [indices[start:start + size] for start in range(0, len(indices), size)]
+
+
+def iter_pages(path, page_ranges=None, max_pages=None, workers=None, parallel_min_pages=16):
+    """
+        Yield PageText for each selected page, in order.
+        page_ranges (from parse_page_range) limits extraction to those pages,
+        max_pages caps the count.
+        Raises whatever PyPDF2 raises if the file itself cannot be opened.
+    """
+    # PdfReader(path) would read the whole file into memory, a mapping lets pages load lazily
+    with mapped_file(path) as view:
+        reader = _reader(view)
+        total_pages = len(reader.pages)
+        indices = page_indices(page_ranges, total_pages)
+        if max_pages:
+            indices = indices[:max_pages]
+
+        workers = workers or min(4, os.cpu_count() or 1)
+        if len(indices) < parallel_min_pages or workers < 2:
+            for page in _extract_pages(reader, indices):
+                yield page
+            return
+
+    # Several ranges per worker keeps the pool busy when some pages are slow
+    pool = _process_pool(workers)
+    futures = [pool.submit(_extract_range, path, chunk) for chunk in _split(indices, workers * 2)]
+    for future in futures:
+        for page in future.result():
+            yield page
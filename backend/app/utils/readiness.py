@@ -0,0 +1,85 @@
+import logging
+import threading
+import time
+from app.db.db_setup import warm_pool
+
+"""
+    Worker readiness, reported by GET /ready.
+    A worker can take requests as soon as it is forked, but its first ones
+    would pay for server selection and new MongoDB connections. start(app)
+    warms the pool in a background thread, retrying until
+    MONGO_WARM_TIMEOUT_SECONDS; /ready answers 503 until that has worked,
+    so a load balancer only sends traffic to warm workers.
+    Under gunicorn, start() runs in post_worker_init (see app/gunicorn.conf.py);
+    with the dev server the first /ready call starts it.
+"""
+
+COLD, WARMING, READY, FAILED = "cold", "warming", "ready", "failed"
+
+logger = logging.getLogger(__name__)
+
+
+class Readiness:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread = None
+        self.state = COLD
+        self.error = None
+        self.connections = 0
+        self.boot_seconds = None
+        self.warm_seconds = None
+
+    def record_boot(self, seconds):
+        """Time taken to import and build the app (see app/wsgi.py)"""
+        self.boot_seconds = round(seconds, 3)
+
+    def start(self, app):
+        """Warm up in the background; no-op while warming or once ready"""
+        with self._lock:
+            if self.state in (WARMING, READY):
+                return
+            self.state, self.error = WARMING, None
+            self._thread = threading.Thread(target=self._warm, args=(app,), name="readiness-warmup", daemon=True)
+            self._thread.start()
+
+    def wait(self, timeout=None):
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        return self.state == READY
+
+    def _warm(self, app):
+        started = time.perf_counter()
+        deadline = started + app.config.get("MONGO_WARM_TIMEOUT_SECONDS", 30)
+        delay = 0.5
+        while True:
+            try:
+                connections = warm_pool(app)
+            except Exception as e:
+                if time.perf_counter() + delay > deadline:
+                    logger.error("Worker warm-up failed", extra={"error": str(e)})
+                    with self._lock:
+                        self.state, self.error = FAILED, str(e)
+                    return
+                time.sleep(delay)
+                delay = min(delay * 2, 5.0)
+                continue
+            with self._lock:
+                self.state, self.connections = READY, connections
+                self.warm_seconds = round(time.perf_counter() - started, 3)
+            logger.info("Worker ready", extra={"connections": connections, "warm_seconds": self.warm_seconds,
+                                               "boot_seconds": self.boot_seconds})
+            return
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "status": self.state,
+                "error": self.error,
+                "mongo_connections": self.connections,
+                "boot_seconds": self.boot_seconds,
+                "warm_seconds": self.warm_seconds,
+            }
+
+
+readiness = Readiness()
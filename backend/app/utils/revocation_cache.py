@@ -0,0 +1,204 @@
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+"""
+    Per-process cache of revoked JWT ids (jti).
+    A Bloom filter holds every revoked jti seen so far, so the common case
+    (token not revoked) is answered without touching MongoDB. Only Bloom
+    hits are confirmed against the database, and those answers are kept in
+    a small TTL'd LRU. The filter is topped up from blacklisted_tokens every
+    REVOCATION_REFRESH_SECONDS, which bounds how long a logout done in
+    another worker can go unnoticed here.
+"""
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, int(round(self.size / capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class TTLCache:
+    """
+        Small LRU where every entry also expires after ttl seconds. Safe to
+        share between request threads: even get() reorders the entries.
+        on_evict(key) is called, under the lock, for every entry dropped
+        because it expired or the cache was full.
+    """
+
+    def __init__(self, max_size, ttl, on_evict=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < time.monotonic():
+                self._items.pop(key, None)
+                if self.on_evict:
+                    self.on_evict(key)
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._items[key] = (value, time.monotonic() + self.ttl)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                evicted, _ = self._items.popitem(last=False)
+                if self.on_evict:
+                    self.on_evict(evicted)
+
+    def pop(self, key):
+        with self._lock:
+            self._items.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+class RevocationCache:
+    # Re-read this many seconds before the last refresh, so rows written by
+    # other workers with a slightly older revoked_at are not missed
+    OVERLAP_SECONDS = 5
+
+    def __init__(self, refresh_seconds=5, rebuild_seconds=3600, lru_size=10000,
+                 lru_ttl=30, bloom_capacity=100000, bloom_error_rate=0.001):
+        self.refresh_seconds = refresh_seconds
+        self.rebuild_seconds = rebuild_seconds
+        self.bloom_capacity = bloom_capacity
+        self.bloom_error_rate = bloom_error_rate
+        self._lru = TTLCache(lru_size, lru_ttl)
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._bloom = None
+        self._last_seen = None
+        self._last_refresh = 0.0
+        self._last_rebuild = 0.0
+        self.stats = {"bloom_negative": 0, "lru_hit": 0, "db_lookup": 0, "refreshes": 0, "rebuilds": 0}
+
+    def configure(self, config):
+        self.refresh_seconds = config.get("REVOCATION_REFRESH_SECONDS", self.refresh_seconds)
+        self.rebuild_seconds = config.get("REVOCATION_REBUILD_SECONDS", self.rebuild_seconds)
+        self.bloom_capacity = config.get("REVOCATION_BLOOM_CAPACITY", self.bloom_capacity)
+        self.bloom_error_rate = config.get("REVOCATION_BLOOM_ERROR_RATE", self.bloom_error_rate)
+        self._lru = TTLCache(
+            config.get("REVOCATION_LRU_SIZE", self._lru.max_size),
+            config.get("REVOCATION_LRU_TTL_SECONDS", self._lru.ttl),
+        )
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._bloom = None
+            self._last_seen = None
+            self._last_refresh = 0.0
+            self._last_rebuild = 0.0
+            self._lru.clear()
+
+    def _rebuild(self, collection):
+        bloom = BloomFilter(self.bloom_capacity, self.bloom_error_rate)
+        last_seen = None
+        now = datetime.utcnow()
+        live = {"$or": [{"expires_at": None}, {"expires_at": {"$gt": now}}]}
+        for row in collection.find(live, {"jti": 1, "revoked_at": 1, "_id": 0}):
+            bloom.add(row["jti"])
+            revoked_at = row.get("revoked_at")
+            if revoked_at and (last_seen is None or revoked_at > last_seen):
+                last_seen = revoked_at
+        with self._lock:
+            self._bloom = bloom
+            self._last_seen = last_seen or now
+            self._lru.clear()
+        self._last_rebuild = time.monotonic()
+        self.stats["rebuilds"] += 1
+
+    def _refresh_incremental(self, collection):
+        since = self._last_seen - timedelta(seconds=self.OVERLAP_SECONDS)
+        rows = collection.find({"revoked_at": {"$gte": since}}, {"jti": 1, "revoked_at": 1, "_id": 0})
+        with self._lock:
+            for row in rows:
+                self._bloom.add(row["jti"])
+                # A cached "not revoked" answer for this jti is now wrong
+                self._lru.pop(row["jti"])
+                if row["revoked_at"] > self._last_seen:
+                    self._last_seen = row["revoked_at"]
+
+    def refresh(self, collection):
+        # Only one thread refreshes, the others keep answering from the current filter
+        if not self._refresh_lock.acquire(blocking=self._bloom is None):
+            return
+        try:
+            now = time.monotonic()
+            if self._bloom is None or self._bloom.count > self.bloom_capacity \
+                    or now - self._last_rebuild >= self.rebuild_seconds:
+                self._rebuild(collection)
+            elif now - self._last_refresh >= self.refresh_seconds:
+                self._refresh_incremental(collection)
+            else:
+                return
+            self._last_refresh = now
+            self.stats["refreshes"] += 1
+        finally:
+            self._refresh_lock.release()
+
+    def is_revoked(self, jti, collection):
+        if self._bloom is None or time.monotonic() - self._last_refresh >= self.refresh_seconds:
+            self.refresh(collection)
+
+        if jti not in self._bloom:
+            self.stats["bloom_negative"] += 1
+            return False
+
+        cached = self._lru.get(jti)
+        if cached is not None:
+            self.stats["lru_hit"] += 1
+            return cached
+
+        # Bloom hit: either really revoked or a false positive, ask MongoDB
+        self.stats["db_lookup"] += 1
+        revoked = collection.find_one({"jti": jti}, {"_id": 1}) is not None
+        with self._lock:
+            self._lru.set(jti, revoked)
+        return revoked
+
+    def add(self, jti):
+        """Record a revocation made by this worker straight away"""
+        with self._lock:
+            if self._bloom is not None:
+                self._bloom.add(jti)
+            self._lru.set(jti, True)
+
+
+revocation_cache = RevocationCache()
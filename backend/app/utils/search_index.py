@@ -0,0 +1,148 @@
+import math
+import re
+from collections import Counter, defaultdict
+from bson.objectid import ObjectId # type: ignore
+from pymongo import DeleteMany, UpdateOne # type: ignore
+from app.db.db_setup import get_collection
+from app.utils.note_blobs import NoteBlobStore
+
+"""
+    Per-user inverted index over note title, content and transcript.
+    Every (user, note, term) pair is one posting in `search_postings` with a
+    precomputed field-weighted term frequency. A query only touches the
+    postings of its own terms, through the {user_id, term} index, so search
+    cost grows with the number of matches, not with the number of notes.
+    NoteModel keeps the index up to date on create, update and delete, and
+    an update only rewrites the postings whose weight actually changed.
+"""
+
+# Title words count more than body words, transcript words count less
+FIELD_WEIGHTS = {"title": 3.0, "content": 1.0, "transcript": 0.5}
+INDEXED_FIELDS = tuple(FIELD_WEIGHTS)
+
+# Huge transcripts keep only their strongest terms
+MAX_TERMS_PER_NOTE = 2000
+# A prefix match is worth a little less than the exact word
+PREFIX_DISCOUNT = 0.8
+
+TOKEN = re.compile(r"[^\W_]+", re.UNICODE)
+STOPWORDS = frozenset("""
+    a an and are as at be but by for from has have in is it its of on or that the this to was were
+    will with not no so if then than there their they them these those you your we our i he she
+""".split())
+
+
+def tokenize(text):
+    if not text or not isinstance(text, str):
+        return []
+    return [
+        token for token in (match.group(0).lower() for match in TOKEN.finditer(text))
+        if 1 < len(token) <= 40 and token not in STOPWORDS
+    ]
+
+
+def term_weights(note):
+    """Field-weighted, log-scaled term frequencies for one note"""
+    weights = defaultdict(float)
+    for field, field_weight in FIELD_WEIGHTS.items():
+        for term, count in Counter(tokenize(note.get(field))).items():
+            weights[term] += field_weight * (1 + math.log(count))
+    if len(weights) > MAX_TERMS_PER_NOTE:
+        strongest = sorted(weights.items(), key=lambda item: item[1], reverse=True)[:MAX_TERMS_PER_NOTE]
+        weights = dict(strongest)
+    return {term: round(weight, 4) for term, weight in weights.items()}
+
+
+class NoteSearchIndex:
+    def __init__(self, app):
+        self.postings = get_collection(app, "search_postings")
+        self.notes = get_collection(app, "notes")
+        self.blobs = NoteBlobStore(app)
+
+    def index_note(self, note_id, user_id, note, new=False):
+        """
+            (Re)index one note, only writing postings that changed.
+            new=True is for a note that was just inserted: it cannot have postings
+            yet, so they are plain inserts instead of a lookup plus upserts.
+        """
+        note_id = ObjectId(note_id)
+        wanted = term_weights(note)
+        if new:
+            if wanted:
+                self.postings.insert_many([{"note_id": note_id, "term": term, "user_id": user_id, "w": weight}
+                                           for term, weight in wanted.items()], ordered=False)
+            return len(wanted)
+        existing = {
+            posting["term"]: posting["w"]
+            for posting in self.postings.find({"note_id": note_id}, {"term": 1, "w": 1, "_id": 0})
+        }
+
+        operations = []
+        removed = [term for term in existing if term not in wanted]
+        if removed:
+            operations.append(DeleteMany({"note_id": note_id, "term": {"$in": removed}}))
+        for term, weight in wanted.items():
+            if existing.get(term) != weight:
+                operations.append(UpdateOne(
+                    {"note_id": note_id, "term": term},
+                    {"$set": {"user_id": user_id, "w": weight}},
+                    upsert=True,
+                ))
+        if operations:
+            self.postings.bulk_write(operations, ordered=False)
+        return len(operations)
+
+    def remove_note(self, note_id):
+        self.postings.delete_many({"note_id": ObjectId(note_id)})
+
+    def remove_notes(self, note_ids):
+        if note_ids:
+            self.postings.delete_many({"note_id": {"$in": [ObjectId(note_id) for note_id in note_ids]}})
+
+    def search(self, user_id, query, limit=20, offset=0):
+        """
+            Rank the user's notes for the query. Every query word must match;
+            the last word also matches as a prefix, for search-as-you-type.
+            Returns (ranked [(note_id, score)], total matches).
+        """
+        words = tokenize(query)
+        if not words:
+            return [], 0
+        exact_words = list(dict.fromkeys(words[:-1]))
+        prefix = words[-1]
+
+        conditions = [{"term": {"$gte": prefix, "$lt": prefix + "\uffff"}}]
+        if exact_words:
+            conditions.append({"term": {"$in": exact_words}})
+        grouped = self.postings.aggregate([
+            {"$match": {"user_id": user_id, "$or": conditions}},
+            {"$group": {"_id": "$term", "postings": {"$push": {"n": "$note_id", "w": "$w"}}}},
+        ])
+
+        total_notes = max(1, self.notes.count_documents({"user_id": user_id}))
+        scores = defaultdict(float)
+        matched = defaultdict(set)
+        for group in grouped:
+            term = group["_id"]
+            idf = math.log(1 + total_notes / len(group["postings"]))
+            for word in ([term] if term in exact_words else []) + ([prefix] if term.startswith(prefix) else []):
+                discount = 1.0 if term == word else PREFIX_DISCOUNT
+                for posting in group["postings"]:
+                    scores[posting["n"]] += posting["w"] * idf * discount
+                    matched[posting["n"]].add(word)
+
+        needed = set(exact_words) | {prefix}
+        ranked = sorted(
+            ((note_id, score) for note_id, score in scores.items() if matched[note_id] >= needed),
+            key=lambda item: (-item[1], str(item[0])),
+        )
+        return ranked[offset:offset + limit], len(ranked)
+
+    def rebuild(self, user_id=None):
+        """Index every note (of one user, or of everyone), used by the backfill migration"""
+        query = {} if user_id is None else {"user_id": user_id}
+        count = 0
+        for note in self.notes.find(query, {field: 1 for field in INDEXED_FIELDS + ("user_id", "blobs")}):
+            self.index_note(note["_id"], note.get("user_id"), self.blobs.hydrate(note))
+            count += 1
+        return count
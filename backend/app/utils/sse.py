@@ -0,0 +1,34 @@
+import json
+from flask import Response, request, stream_with_context
+
+"""
+    Server-sent events for the summarise endpoints.
+    Each event is `event: <name>` plus one JSON `data:` line. A client opts in
+    with `Accept: text/event-stream` or `?stream=1`; everyone else keeps the
+    202 + job flow.
+"""
+
+
+def wants_stream():
+    if request.args.get('stream', '').lower() in ('1', 'true', 'yes'):
+        return True
+    return 'text/event-stream' in request.headers.get('Accept', '')
+
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+def sse_response(events, on_close=None):
+    """
+        events is a generator of sse_event strings, run with the request
+        context kept alive. on_close runs when the server closes the response,
+        even if the client went away before the generator ever started.
+    """
+    response = Response(stream_with_context(events), mimetype='text/event-stream')
+    if on_close:
+        response.call_on_close(on_close)
+    response.headers['Cache-Control'] = 'no-cache'
+    # Stop nginx and friends from buffering the stream into one late response
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
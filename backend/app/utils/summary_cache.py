@@ -0,0 +1,158 @@
+import hashlib
+import logging
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime
+from flask import current_app, has_app_context
+from app.db.db_setup import get_collection
+
+"""
+    Content-addressed cache for gpt_summarise results.
+    The key is a hash of the normalised input text, the content type and the
+    model, so the same lecture PDF uploaded by a whole class is summarised
+    once. Lookups go to a small in-process LRU first, then to the
+    summary_cache collection shared by every worker.
+    Old entries expire through a TTL index (see app/db/indexes.py) and the
+    collection is trimmed back to SUMMARY_CACHE_MAX_BYTES, least recently
+    used first.
+"""
+
+logger = logging.getLogger(__name__)
+
+WHITESPACE = re.compile(r'\s+')
+
+
+def normalise_text(text):
+    return WHITESPACE.sub(' ', unicodedata.normalize('NFC', text)).strip()
+
+
+def cache_key(text, content_type, model):
+    digest = hashlib.sha256()
+    for part in (model, content_type, normalise_text(text)):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class SummaryCache:
+    def __init__(self, lru_size=256, max_bytes=256 * 1024 * 1024, trim_every=50):
+        self.lru_size = lru_size
+        self.max_bytes = max_bytes
+        self.trim_every = trim_every
+        self.enabled = True
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._stores_since_trim = 0
+        self.stats = {"memory_hits": 0, "db_hits": 0, "misses": 0, "stores": 0, "evictions": 0, "errors": 0}
+
+    def configure(self, config):
+        self.enabled = config.get("SUMMARY_CACHE_ENABLED", True)
+        self.lru_size = config.get("SUMMARY_CACHE_LRU_SIZE", self.lru_size)
+        self.max_bytes = config.get("SUMMARY_CACHE_MAX_BYTES", self.max_bytes)
+
+    def _collection(self):
+        # The shared tier is only reachable inside an app context (requests and job workers)
+        if not has_app_context():
+            return None
+        return get_collection(current_app._get_current_object(), "summary_cache")
+
+    def _remember(self, key, summary):
+        with self._lock:
+            self._lru[key] = summary
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.lru_size:
+                self._lru.popitem(last=False)
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        with self._lock:
+            summary = self._lru.get(key)
+            if summary is not None:
+                self._lru.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return summary
+
+        collection = self._collection()
+        if collection is not None:
+            try:
+                entry = collection.find_one_and_update(
+                    {"_id": key},
+                    {"$set": {"last_used_at": datetime.utcnow()}, "$inc": {"hits": 1}},
+                    projection={"summary": 1},
+                )
+            except Exception as e:
+                logger.warning("Summary cache lookup failed", extra={"error": str(e)})
+                self.stats["errors"] += 1
+                entry = None
+            if entry:
+                self._remember(key, entry["summary"])
+                self.stats["db_hits"] += 1
+                return entry["summary"]
+
+        self.stats["misses"] += 1
+        return None
+
+    def put(self, key, summary, content_type, model):
+        if not self.enabled:
+            return
+        self._remember(key, summary)
+        self.stats["stores"] += 1
+
+        collection = self._collection()
+        if collection is None:
+            return
+        now = datetime.utcnow()
+        try:
+            collection.update_one(
+                {"_id": key},
+                {"$set": {
+                    "summary": summary,
+                    "content_type": content_type,
+                    "model": model,
+                    "size": len(summary.encode('utf-8')),
+                    "last_used_at": now,
+                }, "$setOnInsert": {"created_at": now, "hits": 0}},
+                upsert=True,
+            )
+            self._stores_since_trim += 1
+            if self._stores_since_trim >= self.trim_every:
+                self._stores_since_trim = 0
+                self.trim(collection)
+        except Exception as e:
+            logger.warning("Summary cache store failed", extra={"error": str(e)})
+            self.stats["errors"] += 1
+
+    def trim(self, collection):
+        """Delete least recently used entries until the collection fits in max_bytes"""
+        totals = list(collection.aggregate([{"$group": {"_id": None, "bytes": {"$sum": "$size"}}}]))
+        excess = (totals[0]["bytes"] if totals else 0) - self.max_bytes
+        if excess <= 0:
+            return 0
+        victims = []
+        for entry in collection.find({}, {"size": 1}).sort("last_used_at", 1):
+            victims.append(entry["_id"])
+            excess -= entry.get("size", 0)
+            if excess <= 0:
+                break
+        collection.delete_many({"_id": {"$in": victims}})
+        with self._lock:
+            for key in victims:
+                self._lru.pop(key, None)
+        self.stats["evictions"] += len(victims)
+        return len(victims)
+
+    def clear_memory(self):
+        with self._lock:
+            self._lru.clear()
+
+    def snapshot(self):
+        lookups = self.stats["memory_hits"] + self.stats["db_hits"] + self.stats["misses"]
+        hits = self.stats["memory_hits"] + self.stats["db_hits"]
+        return dict(self.stats, memory_entries=len(self._lru),
+                    hit_ratio=round(hits / lookups, 3) if lookups else None)
+
+
+summary_cache = SummaryCache()
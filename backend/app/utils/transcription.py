@@ -0,0 +1,152 @@
+import logging
+import math
+import re
+import threading
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from difflib import SequenceMatcher
+from app.utils.metrics import stage_timer
+
+"""
+    Speech to text for the segments made by app/utils/audio.py.
+    A transcriber is any object with transcribe(segment) -> text; which one
+    is used comes from TRANSCRIBER_BACKEND ("assemblyai", or "fake" to run
+    offline). Segments are transcribed concurrently by a bounded pool, at
+    most TRANSCRIBE_CONCURRENCY provider calls per recording, and stitch()
+    joins the texts back together, dropping the words each overlap repeats.
+"""
+
+logger = logging.getLogger(__name__)
+
+# How far into each side of a seam stitch() looks for the repeated words
+OVERLAP_WORDS = 40
+# Fewer shared words than this is more likely a coincidence ("of the") than the overlap
+MIN_OVERLAP_WORDS = 2
+# Words either side of the repeated run that may be halves of a word cut at the seam
+SEAM_SLACK_WORDS = 3
+
+
+class TranscriptionError(Exception):
+    """The provider answered, but could not transcribe the audio"""
+
+
+class AssemblyAITranscriber:
+    name = "assemblyai"
+
+    def __init__(self, config):
+        # Imported by the first transcription rather than at boot
+        import assemblyai as aai # type: ignore
+        aai.settings.api_key = config.get("ASSEMBLY_API_KEY")
+        self.aai = aai
+
+    def transcribe(self, segment):
+        result = self.aai.Transcriber().transcribe(segment.path)
+        if result.status == self.aai.TranscriptStatus.error:
+            raise TranscriptionError(getattr(result, "error", None) or "Transcription failed")
+        return result.text or ""
+
+
+class FakeTranscriber:
+    """
+        Offline transcriber for tests and local development. By default each
+        second of audio "says" one word naming that second (s0 s1 s2 ...), so
+        a stitched transcript shows exactly which audio was lost or repeated;
+        words=[(seconds, word)] scripts what is said when instead.
+    """
+    name = "fake"
+
+    def __init__(self, config=None, words=None):
+        self.words = words
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def transcribe(self, segment):
+        with self._lock:
+            self.calls += 1
+        end = segment.end
+        if end is None:
+            try:
+                with wave.open(segment.path, "rb") as reader:
+                    end = segment.start + reader.getnframes() / reader.getframerate()
+            except (wave.Error, EOFError):
+                end = segment.start
+        if self.words is not None:
+            return " ".join(word for at, word in self.words if segment.start <= at < end)
+        return " ".join(f"s{second}" for second in range(math.ceil(segment.start), math.ceil(end)))
+
+
+TRANSCRIBERS = {
+    AssemblyAITranscriber.name: AssemblyAITranscriber,
+    FakeTranscriber.name: FakeTranscriber,
+}
+
+
+def transcriber_for(config):
+    backend = config.get("TRANSCRIBER_BACKEND", "assemblyai")
+    if backend not in TRANSCRIBERS:
+        raise ValueError(f"Unknown TRANSCRIBER_BACKEND {backend!r}, expected one of {', '.join(TRANSCRIBERS)}")
+    return TRANSCRIBERS[backend](config)
+
+
+def transcribe_segments(segments, transcriber, concurrency=4, retries=1, progress=None):
+    """
+        Transcript text of every segment, in segment order. A failed segment is
+        retried `retries` times; if it still fails the error is raised and the
+        segments not started yet are cancelled. progress(done, total) is
+        called from the pool threads as segments finish.
+    """
+    total, done = len(segments), [0]
+    lock = threading.Lock()
+
+    def run(segment):
+        for attempt in range(retries + 1):
+            try:
+                with stage_timer("transcription_segment"):
+                    text = transcriber.transcribe(segment)
+                break
+            except Exception as error:
+                if attempt == retries:
+                    raise
+                logger.warning("Retrying segment transcription", extra={"segment": segment.index,
+                                                                         "error": str(error)})
+        with lock:
+            done[0] += 1
+            finished = done[0]
+        if progress:
+            progress(finished, total)
+        return text
+
+    if total <= 1 or concurrency <= 1:
+        return [run(segment) for segment in segments]
+    executor = ThreadPoolExecutor(max_workers=min(concurrency, total), thread_name_prefix="transcribe")
+    try:
+        return list(executor.map(run, segments))
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _normalise(word):
+    return re.sub(r"[^\w']+", "", word.lower())
+
+
+def stitch(texts):
+    """
+        Join segment transcripts into one. The longest run of words shared by
+        the end of the text so far and the start of the next one is what the
+        overlapping audio produced twice, and is kept once; the few words
+        around it on either side are mis-heard halves of a word cut at the
+        seam and are dropped. Without such a run the texts are just joined.
+    """
+    words = []
+    for text in texts:
+        following = (text or "").split()
+        if words and following:
+            tail = [_normalise(word) for word in words[-OVERLAP_WORDS:]]
+            head = [_normalise(word) for word in following[:OVERLAP_WORDS]]
+            match = SequenceMatcher(None, tail, head, autojunk=False).find_longest_match(0, len(tail), 0, len(head))
+            if (match.size >= MIN_OVERLAP_WORDS and match.b <= SEAM_SLACK_WORDS
+                    and len(tail) - (match.a + match.size) <= SEAM_SLACK_WORDS):
+                del words[len(words) - len(tail) + match.a + match.size:]
+                following = following[match.b + match.size:]
+        words.extend(following)
+    return " ".join(words)
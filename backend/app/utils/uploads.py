@@ -0,0 +1,139 @@
+import hashlib
+import mmap
+import os
+import tempfile
+from contextlib import contextmanager
+from flask import Request, request, current_app
+from werkzeug.exceptions import RequestEntityTooLarge # type: ignore
+from app.utils.metrics import stage_timer
+
+"""
+    Streaming upload handling shared by the PDF and audio endpoints.
+    Werkzeug hands every multipart file part to Request._get_file_stream, so
+    UploadRequest returns an UploadSpool there: each chunk is written straight
+    to a uniquely named temp file while it is hashed and counted. An upload
+    that goes over its limit (or has the wrong extension) is rejected while
+    the body is still arriving, and spools nobody claimed are deleted when
+    the request closes.
+"""
+
+# Room for the multipart boundaries and headers around the file itself
+FORM_OVERHEAD_BYTES = 64 * 1024
+
+
+class UploadRejected(Exception):
+    """reason is 'too_large' or 'bad_type'"""
+
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
+
+
+def file_extension(filename):
+    return filename.lower().split('.')[-1] if filename and '.' in filename else ''
+
+
+def discard_file(path):
+    """Delete a kept upload, if it is still there"""
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class UploadSpool:
+    def __init__(self, directory=None, max_bytes=None, suffix=''):
+        file_descriptor, self.path = tempfile.mkstemp(prefix="studivio-upload-", suffix=suffix, dir=directory)
+        self._file = os.fdopen(file_descriptor, 'w+b')
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.kept = False
+        self._hash = hashlib.sha256()
+
+    def write(self, data):
+        self.size += len(data)
+        if self.max_bytes is not None and self.size > self.max_bytes:
+            self.discard()
+            raise UploadRejected('too_large')
+        self._hash.update(data)
+        return self._file.write(data)
+
+    @property
+    def sha256(self):
+        return self._hash.hexdigest()
+
+    def keep(self):
+        """Hand the file over to someone else (e.g. a job), it will no longer be deleted here"""
+        self._file.flush()
+        self._file.close()
+        self.kept = True
+        return self.path
+
+    def discard(self):
+        if not self._file.closed:
+            self._file.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def close(self):
+        if self.kept:
+            return
+        self.discard()
+
+    @property
+    def closed(self):
+        return self._file.closed
+
+    def __getattr__(self, attr):
+        # read, seek, tell, readline... go to the underlying file
+        if attr == '_file':
+            raise AttributeError(attr)
+        return getattr(self._file, attr)
+
+
+class UploadRequest(Request):
+    upload_max_bytes = None
+    upload_extensions = None
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        extension = file_extension(filename)
+        if self.upload_extensions is not None and extension and extension not in self.upload_extensions:
+            raise UploadRejected('bad_type')
+        directory = current_app.config.get("UPLOAD_TMP_DIR") or None
+        spool = UploadSpool(directory, self.upload_max_bytes, f".{extension}" if extension else '')
+        self.__dict__.setdefault('_upload_spools', []).append(spool)
+        return spool
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            for spool in self.__dict__.get('_upload_spools', []):
+                spool.close()
+
+
+def receive_upload(field_name, max_bytes, allowed_extensions):
+    """
+        Parse the multipart body with the limits applied while streaming.
+        Returns the FileStorage for field_name (or None), its .stream is the
+        UploadSpool. Raises UploadRejected.
+    """
+    request.upload_max_bytes = max_bytes
+    request.upload_extensions = set(allowed_extensions)
+    # Rejects from the Content-Length header before a single byte is read
+    request.max_content_length = max_bytes + FORM_OVERHEAD_BYTES
+    try:
+        with stage_timer("upload"):
+            return request.files.get(field_name)
+    except RequestEntityTooLarge:
+        raise UploadRejected('too_large')
+
+
+@contextmanager
+def mapped_file(path):
+    """Read-only memory map of a file, so readers page it in instead of copying it"""
+    with open(path, 'rb') as source:
+        with mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            yield view
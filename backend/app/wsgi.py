@@ -0,0 +1,14 @@
+import time
+_started = time.perf_counter()
+
+from app import create_app
+from app.utils.readiness import readiness
+
+"""
+    Production entry point, served by gunicorn (settings in app/gunicorn.conf.py):
+        cd backend
+        gunicorn -c app/gunicorn.conf.py app.wsgi:app
+"""
+
+app = create_app()
+readiness.record_boot(time.perf_counter() - _started)
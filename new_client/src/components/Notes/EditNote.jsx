@@ -1,6 +1,10 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef, useCallback } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
 import Sidebar from '../Sidebar';
+import { textDiff } from './noteDiff';
+
+// Autosave waits for a pause in typing this long
+const AUTOSAVE_DELAY_MS = 1500;
 
 export default function EditNote() {
     const { id } = useParams(); // Get note ID from URL
@@ -14,6 +18,14 @@ export default function EditNote() {
     const [isSaving, setIsSaving] = useState(false);
     const [message, setMessage] = useState('');
     const [error, setError] = useState('');
+    const [autosaveStatus, setAutosaveStatus] = useState('');
+    const [conflict, setConflict] = useState(false);
+
+    // What the server has (revision and text) and what the editor shows now
+    const saved = useRef({ revision: 0, title: '', content: '' });
+    const latest = useRef({ title: '', content: '' });
+    const saving = useRef(false);
+    latest.current = { title, content };
 
     // Load note data when component mounts
     useEffect(() => {
@@ -45,6 +57,11 @@ export default function EditNote() {
                     setNote(noteData);
                     setTitle(noteData.title || '');
                     setContent(noteData.content || '');
+                    saved.current = {
+                        revision: noteData.revision || 0,
+                        title: noteData.title || '',
+                        content: noteData.content || ''
+                    };
                     setError('');
                 } else {
                     const errorData = await response.json();
@@ -61,6 +78,66 @@ export default function EditNote() {
         loadNote();
     }, [id, navigate]);
 
+    // Sends only the edit since the last save, against the revision it was made on
+    const autosave = useCallback(async () => {
+        const { title: draftTitle, content: draftContent } = latest.current;
+        const diff = textDiff(saved.current.content, draftContent);
+        const titleChanged = draftTitle.trim() && draftTitle !== saved.current.title;
+        if (saving.current || (!diff.length && !titleChanged)) {
+            return;
+        }
+
+        const body = { base_revision: saved.current.revision };
+        if (diff.length) {
+            body.diff = diff;
+        }
+        if (titleChanged) {
+            body.title = draftTitle;
+        }
+
+        saving.current = true;
+        setAutosaveStatus('Saving…');
+        try {
+            const response = await fetch(`http://127.0.0.1:5000/notes/${id}`, {
+                method: 'PATCH',
+                headers: {
+                    'Authorization': `Bearer ${localStorage.getItem('token')}`,
+                    'Content-Type': 'application/json'
+                },
+                body: JSON.stringify(body)
+            });
+            const result = await response.json();
+            if (response.ok) {
+                saved.current = {
+                    revision: result.revision,
+                    title: titleChanged ? draftTitle : saved.current.title,
+                    content: draftContent
+                };
+                setAutosaveStatus('All changes saved');
+            } else if (response.status === 409) {
+                setConflict(true);
+                setAutosaveStatus('');
+                setMessage('❌ This note was changed somewhere else. Reload the page to get the latest version.');
+            } else {
+                setAutosaveStatus(`Autosave failed: ${result.message || 'unknown error'}`);
+            }
+        } catch (error) {
+            setAutosaveStatus('Autosave failed: connection error');
+            console.error('Error autosaving note:', error);
+        } finally {
+            saving.current = false;
+        }
+    }, [id]);
+
+    // autosaveStatus is a dependency so that edits made while a save was in flight go out after it
+    useEffect(() => {
+        if (isLoading || conflict || !note) {
+            return;
+        }
+        const timer = setTimeout(autosave, AUTOSAVE_DELAY_MS);
+        return () => clearTimeout(timer);
+    }, [title, content, autosaveStatus, isLoading, conflict, note, autosave]);
+
     const handleSave = async () => {
         if (!title.trim() || !content.trim()) {
             setMessage('Title and content cannot be empty');
@@ -89,6 +166,8 @@ export default function EditNote() {
             });
 
             if (response.ok) {
+                const result = await response.json();
+                saved.current = { revision: result.revision, title: updateData.title, content: updateData.content };
                 setMessage('✅ Note saved successfully!');
                 
                 // Auto-redirect after 2 seconds
@@ -204,6 +283,7 @@ export default function EditNote() {
                             />
                             <div className="text-xs text-gray-500 mt-1">
                                 Characters: {content.length}
+                                {autosaveStatus && <span className="ml-3">{autosaveStatus}</span>}
                             </div>
                         </div>
 
@@ -77,6 +77,8 @@ export default function NotesList() {
                     _id: note._id,
                     title: note.title,
                     content: note.content,
+                    // Long notes come with a preview only, the stub knows the full length
+                    content_chars: note.blobs?.content?.chars ?? (note.content || '').length,
                     content_type: note.content_type || 'manual',
                     format: note.format || 'text',
                     created_at: note.created_at || new Date().toISOString(),
@@ -340,7 +342,7 @@ export default function NotesList() {
                                                             <div className="flex justify-between items-center text-xs text-gray-500">
                                                                 <div className="flex space-x-4">
                                                                     {note.content && (
-                                                                        <span>📝 {note.content.length} characters</span>
+                                                                        <span>📝 {note.content_chars} characters</span>
                                                                     )}
                                                                     {note.content_type === 'voice_transcription' && (
                                                                         <span>🎙️ Voice Note</span>
@@ -1,6 +1,7 @@
 import React, { useState } from 'react';
 import { useNavigate } from 'react-router-dom';
 import Sidebar from '../Sidebar';
+import { streamSummary } from './streamSummary';
 
 export default function SummaryNote() {
     // Upload states for PDF's
@@ -80,28 +81,21 @@ export default function SummaryNote() {
             const documentForm = new FormData();
             documentForm.append('file', selectedFile);
             
-            const apiResponse = await fetch('http://127.0.0.1:5000/summariser/pdf', {
-                method: 'POST',
-                headers: {
-                    'Authorization': `Bearer ${authToken}`,
-                },
-                body: documentForm
+            // Streamed: stage updates first, then the summary appears as it is written
+            const responseData = await streamSummary('/summariser/pdf', documentForm, authToken, {
+                onStage: (stage) => setProcessingMessage(`Processing document: ${stage}...`),
+                onText: (text) => setSummary(text),
             });
+            setSummary(responseData.content);
+            setMessage(' Summary generated successfully! Saved as a note.');
             
-            if (apiResponse.ok) {
-                const responseData = await apiResponse.json();
-                setSummary(responseData.content);
-                setMessage(' Summary generated successfully! Saved as a note.');
-                
-                setTimeout(() => {
-                    navigate('/notes');
-                }, 3000);
-            } else {
-                const errorResponse = await apiResponse.json();
-                setMessage(`⚠️ ${errorResponse.error || 'Processing failed'}`);
-            }
+            setTimeout(() => {
+                navigate('/notes');
+            }, 3000);
         } catch (processingError) {
-            setMessage(' Connection error. Please verify backend is running.');
+            setMessage(processingError.name === 'TypeError'
+                ? ' Connection error. Please verify backend is running.'
+                : `⚠️ ${processingError.message}`);
             console.error('Processing error:', processingError);
         } finally {
             setIsProcessing(false);
@@ -1,6 +1,7 @@
 import React, { useState } from 'react';
 import { useNavigate } from 'react-router-dom';
 import Sidebar from '../Sidebar';
+import { streamSummary } from './streamSummary';
 
 export default function VoiceNote() {
     // Audio file states
@@ -147,34 +148,24 @@ export default function VoiceNote() {
             
             console.log('Sending to backend:', audioFile.name, audioFile.size, audioFile.type);
             
-            const response = await fetch('http://127.0.0.1:5000/whisper/audio', {
-                method: 'POST',
-                headers: {
-                    'Authorization': `Bearer ${authToken}`,
-                },
-                body: formData
+            // Streamed: stage updates first, then the summary appears as it is written
+            const data = await streamSummary('/whisper/audio', formData, authToken, {
+                onStage: (stage) => setProcessingMessage(`Processing audio: ${stage}...`),
+                onText: (text) => setSummary(text),
             });
+            console.log('Backend response data:', data);
             
-            console.log('Backend response status:', response.status);
+            setSummary(data.content);
+            setMessage('✅ Audio processed successfully! Summary saved as a note.');
             
-            if (response.ok) {
-                const data = await response.json();
-                console.log('Backend response data:', data);
-                
-                setSummary(data.content);
-                setMessage('✅ Audio processed successfully! Summary saved as a note.');
-                
-                setTimeout(() => {
-                    navigate('/notes');
-                }, 3000);
-            } else {
-                const error = await response.json();
-                console.error('Backend error:', error);
-                setMessage(`⚠️ ${error.error || 'Audio processing failed'}`);
-            }
+            setTimeout(() => {
+                navigate('/notes');
+            }, 3000);
         } catch (error) {
             console.error('Network error:', error);
-            setMessage('❌ Connection error. Please verify backend is running.');
+            setMessage(error.name === 'TypeError'
+                ? '❌ Connection error. Please verify backend is running.'
+                : `⚠️ ${error.message}`);
         } finally {
             setIsProcessing(false);
             setProcessingMessage('');
@@ -0,0 +1,35 @@
+// The change between two versions of a note as PATCH /notes/<id> splices:
+// [[offset, deleted, inserted]], offsets in UTF-16 code units (plain JS string
+// indices). Typing touches one place at a time, so one splice around the
+// common prefix and suffix is enough. [] when nothing changed.
+export function textDiff(before, after) {
+    if (before === after) {
+        return [];
+    }
+    let prefix = 0;
+    const shortest = Math.min(before.length, after.length);
+    while (prefix < shortest && before[prefix] === after[prefix]) {
+        prefix++;
+    }
+    let suffix = 0;
+    while (suffix < shortest - prefix
+           && before[before.length - 1 - suffix] === after[after.length - 1 - suffix]) {
+        suffix++;
+    }
+    // Never cut a surrogate pair (emoji) in half
+    if (prefix > 0 && isHighSurrogate(before.charCodeAt(prefix - 1))) {
+        prefix--;
+    }
+    if (suffix > 0 && isLowSurrogate(before.charCodeAt(before.length - suffix))) {
+        suffix--;
+    }
+    return [[prefix, before.length - prefix - suffix, after.slice(prefix, after.length - suffix)]];
+}
+
+function isHighSurrogate(code) {
+    return code >= 0xd800 && code <= 0xdbff;
+}
+
+function isLowSurrogate(code) {
+    return code >= 0xdc00 && code <= 0xdfff;
+}
@@ -0,0 +1,62 @@
+// Uploads a file to a summarise endpoint in streaming mode and reads the
+// server-sent events as they arrive. onStage gets each stage name, onText
+// gets the summary written so far. Resolves with the `done` event's data.
+export async function streamSummary(path, formData, authToken, { onStage, onText } = {}) {
+    const response = await fetch(`http://127.0.0.1:5000${path}`, {
+        method: 'POST',
+        headers: {
+            'Authorization': `Bearer ${authToken}`,
+            'Accept': 'text/event-stream',
+        },
+        body: formData,
+    });
+
+    if (!response.ok) {
+        const errorResponse = await response.json();
+        throw new Error(errorResponse.error || 'Processing failed');
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let text = '';
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) {
+            break;
+        }
+        buffer += decoder.decode(value, { stream: true });
+
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const block = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+
+            let event = 'message';
+            let data = '';
+            for (const line of block.split('\n')) {
+                if (line.startsWith('event: ')) {
+                    event = line.slice(7);
+                } else if (line.startsWith('data: ')) {
+                    data += line.slice(6);
+                }
+            }
+            const payload = data ? JSON.parse(data) : {};
+
+            if (event === 'stage' && onStage) {
+                onStage(payload.stage);
+            } else if (event === 'token') {
+                text += payload.text;
+                if (onText) {
+                    onText(text);
+                }
+            } else if (event === 'error') {
+                throw new Error(payload.error || 'Processing failed');
+            } else if (event === 'done') {
+                return payload;
+            }
+        }
+    }
+    throw new Error('The connection closed before the summary was finished');
+}